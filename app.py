@@ -1,7 +1,16 @@
+import os
+
 import dash
-from dash import html, dcc, callback
+from dash import html, dcc, clientside_callback
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output
+from flask import Response, request
+from components import static_assets
+from components.compression import COMPRESSION_ENABLED, response_compressor
+from components.explorer_export import explorer_export
+from components.instrumentation import instrumentation
+from components.lazy_pages import page_loader
+from components.utility_functions import get_api_base_url
 from components.left_navbar import create_left_navbar
 
 navbar = dbc.NavbarSimple(
@@ -38,8 +47,8 @@ layout = html.Div([
     navbar,
     # Content wrapper
     html.Div([
-        # Left Navbar container
-        html.Div(id='left-navbar-container'),
+        # Left navbar, built once and shown or hidden in the browser by toggle_left_navbar
+        html.Div(create_left_navbar(), id='left-navbar-container', style={'display': 'none'}),
         # Page content
         html.Div(
             dash.page_container,
@@ -49,35 +58,63 @@ layout = html.Div([
 ], style={'padding': '0', 'margin': '0', 'width': '100%', 'height': '100vh'})
 
 # Initialize the Dash app with use_pages=True
+# Dash includes assets/css itself (bulma, our styles, Font Awesome, Materials Project icons,
+# scrollspy); with STATIC_BUNDLE they are replaced by one prebuilt bundle, see static_assets.py
 app = dash.Dash(__name__, 
-                external_stylesheets=[
-                    dbc.themes.BOOTSTRAP,
-                    "/assets/css/bulma.css",     # Base styles
-                    "/assets/css/styles.css",     # Our custom styles (overrides)
-                    "/assets/css/all.min.css",     # Font Awesome
-                    "/assets/css/materials_project_icons.css",     # Materials Project Icons
-                    "/assets/css/scrollspy.css"     # Scrollspy
-                ],
+                external_stylesheets=static_assets.bundle_stylesheets(dbc.themes.BOOTSTRAP),
+                assets_ignore=static_assets.ASSETS_IGNORE,
                 use_pages=True, prevent_initial_callbacks=True,
+                # Page components are not in the initial layout, and with LAZY_PAGES
+                # neither are the material page's
+                suppress_callback_exceptions=True,
                 )
+static_assets.init_app(app)
+# Import the pages deferred with LAZY_PAGES when first needed, see lazy_pages.py
+page_loader.init_app(app)
+
+# WSGI entry point for production servers, see gunicorn.conf.py and wsgi.py
+server = app.server
+
+# Compress callback, layout and dependency responses, see compression.py
+if COMPRESSION_ENABLED:
+    response_compressor.init_app(server)
+
+# Time every callback and measure its payload before compression, see instrumentation.py
+instrumentation.init_app(app)
+
+# Debug tooling only when DASH_DEBUG is set
+debug = os.environ.get('DASH_DEBUG', '').lower() in ('1', 'true', 'yes')
 
 # Set the favicon
 app.title = "Materials Project"
 app._favicon = "/assets/img/favicon.ico"  
 app.layout = layout
-# Callback to show/hide left navbar based on URL
-@callback(
-    Output('left-navbar-container', 'children'),
-    Input('url', 'pathname')
+# Show/hide the left navbar based on URL, in the browser so navigation needs no server callback
+clientside_callback(
+    """
+    function toggle_left_navbar(pathname) {
+        return (pathname === '/' || pathname === '') ? {'display': 'none'} : {};
+    }
+    """,
+    Output('left-navbar-container', 'style'),
+    Input('url', 'pathname'),
+    prevent_initial_call=False,
 )
-def toggle_left_navbar(pathname):
-    if pathname == '/' or pathname == '':
-        return None
-    return create_left_navbar()
 
-# Run the app
+# Streaming CSV / JSON lines / Parquet download of explorer search results, see explorer_export.py
+@server.route('/export/materials.<export_format>')
+def export_materials(export_format):
+    return explorer_export.response(export_format, request.args.to_dict(), get_api_base_url())
+
+# Callback timings, payload sizes, cache lookups and component counters of this worker,
+# in the Prometheus text format
+@server.route('/metrics')
+def metrics():
+    return Response(instrumentation.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Run the development server; use gunicorn or waitress in production (see wsgi.py)
 if __name__ == '__main__':
     app.run_server(
         host='0.0.0.0', # Accepts connections from any IP
         port=8050,       # You can change this port
-        debug=True)
+        debug=debug)
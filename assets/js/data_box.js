@@ -0,0 +1,48 @@
+/*
+ * Browser renderer of compact DataBoxes (components/data_box.py).
+ *
+ * The server sends only the row data of a box to a dcc.Store; render turns it into the
+ * table here, styled by the data-box-* classes of styles.css instead of inline styles.
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    data_box: {
+        render: function (payload) {
+            if (!payload) {
+                return null;
+            }
+            function element(type, className, children) {
+                return {
+                    type: type,
+                    namespace: 'dash_html_components',
+                    props: {className: className, children: children}
+                };
+            }
+            function text(value) {
+                return value === null || value === undefined ? '' : value;
+            }
+
+            if (payload.variant === 'table') {
+                var header = element('Tr', null, payload.columns.map(function (column) {
+                    return element('Th', 'data-box-column', column);
+                }));
+                var rows = payload.rows.map(function (row) {
+                    return element('Tr', null, row.map(function (value) {
+                        return element('Td', 'data-box-cell', text(value));
+                    }));
+                });
+                return element('Table', 'data-box-table', [
+                    element('Thead', null, header),
+                    element('Tbody', null, rows)
+                ]);
+            }
+
+            var pairs = payload.rows.map(function (row) {
+                return element('Tr', null, [
+                    element('Th', 'data-box-key', row[0]),
+                    element('Td', 'data-box-value', text(row[1]))
+                ]);
+            });
+            return element('Table', 'data-box-table', element('Tbody', null, pairs));
+        }
+    }
+});
@@ -0,0 +1,310 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from components.instrumentation import instrumentation
+from components.utility_functions import get_api_base_url
+
+# Environment variables used to tune the summary API client
+CONNECT_TIMEOUT_ENV = "SUMMARY_API_CONNECT_TIMEOUT"
+READ_TIMEOUT_ENV = "SUMMARY_API_READ_TIMEOUT"
+MAX_RETRIES_ENV = "SUMMARY_API_MAX_RETRIES"
+BACKOFF_ENV = "SUMMARY_API_BACKOFF"
+POOL_SIZE_ENV = "SUMMARY_API_POOL_SIZE"
+BREAKER_THRESHOLD_ENV = "SUMMARY_API_BREAKER_THRESHOLD"
+BREAKER_RESET_ENV = "SUMMARY_API_BREAKER_RESET"
+
+# Upstream status codes that are worth retrying
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+# Materials requested at a time by get_summaries, keeping URLs short
+SUMMARY_BATCH_SIZE = 100
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without contacting the upstream while its circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream host.
+
+    After failure_threshold consecutive failures the breaker opens and calls fail
+    fast for reset_timeout seconds. The first call after that is let through as a
+    trial: success closes the breaker again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "half-open":
+                # Let a single trial request through and keep the rest failing fast
+                self.opened_at = time.monotonic()
+                return True
+            return state == "closed"
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LatencyStats:
+    """Request counters and a window of recent latencies for one endpoint"""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, error: bool = False):
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.recent.append(seconds)
+            if error:
+                self.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self.recent)
+            count, errors, total_seconds = self.count, self.errors, self.total_seconds
+
+        def percentile(p):
+            if not recent:
+                return None
+            return recent[min(len(recent) - 1, int(p * len(recent)))]
+
+        return {
+            "count": count,
+            "errors": errors,
+            "total_seconds": total_seconds,
+            "mean_seconds": total_seconds / count if count else None,
+            "p50_seconds": percentile(0.50),
+            "p95_seconds": percentile(0.95),
+            "p99_seconds": percentile(0.99),
+        }
+
+
+class SummaryAPIClient:
+    """
+    HTTP client for the materials summary API shared by all pages.
+
+    Each worker process keeps its own pooled keep-alive requests.Session; the session
+    is recreated after a fork so connections are never shared between processes.
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        max_retries: int = 2,
+        backoff: float = 0.2,
+        backoff_max: float = 2.0,
+        pool_size: int = 10,
+        breaker_threshold: int = 5,
+        breaker_reset: float = 30.0,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            connect_timeout: Seconds to wait for a TCP connection
+            read_timeout: Seconds to wait for the upstream response
+            max_retries: Retries after the first attempt for connection errors, timeouts and 5xx
+            backoff: Base delay in seconds of the jittered exponential backoff
+            backoff_max: Upper bound of a single backoff delay
+            pool_size: Keep-alive connections kept per upstream host
+            breaker_threshold: Consecutive failures that open the circuit breaker
+            breaker_reset: Seconds the breaker stays open before a trial request
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self._session = None
+        self._session_pid = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyStats] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SummaryAPIClient":
+        """Create a client configured from the SUMMARY_API_* environment variables"""
+        return cls(
+            connect_timeout=float(os.environ.get(CONNECT_TIMEOUT_ENV, 3.05)),
+            read_timeout=float(os.environ.get(READ_TIMEOUT_ENV, 10.0)),
+            max_retries=int(os.environ.get(MAX_RETRIES_ENV, 2)),
+            backoff=float(os.environ.get(BACKOFF_ENV, 0.2)),
+            pool_size=int(os.environ.get(POOL_SIZE_ENV, 10)),
+            breaker_threshold=int(os.environ.get(BREAKER_THRESHOLD_ENV, 5)),
+            breaker_reset=float(os.environ.get(BREAKER_RESET_ENV, 30.0)),
+        )
+
+    @property
+    def session(self) -> requests.Session:
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._lock:
+                if self._session is None or self._session_pid != pid:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+                    self._session_pid = pid
+        return self._session
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Circuit breaker of the upstream host of a URL, shared by every client of that host"""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+            return self._breakers[host]
+
+    def _stats(self, endpoint: str) -> LatencyStats:
+        with self._lock:
+            if endpoint not in self._latency:
+                self._latency[endpoint] = LatencyStats()
+            return self._latency[endpoint]
+
+    def _sleep_before_retry(self, attempt: int):
+        # Full jitter keeps workers that failed together from retrying together
+        time.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, endpoint: str = "default") -> Any:
+        """
+        GET a JSON document with timeouts, retries and the circuit breaker applied.
+
+        Args:
+            url: Absolute URL to request
+            params: Optional query parameters
+            endpoint: Name the latency metrics are recorded under
+
+        Returns:
+            The decoded JSON body
+
+        Raises:
+            CircuitOpenError: The upstream is considered down and was not contacted
+            requests.RequestException: The request failed after all retries
+        """
+        breaker = self.breaker(url)
+        stats = self._stats(endpoint)
+        attempt = 0
+        while True:
+            if not breaker.allow_request():
+                raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}, not contacting upstream")
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                stats.record(time.perf_counter() - start, error=True)
+                breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                server_error = response.status_code in RETRY_STATUS_CODES
+                stats.record(time.perf_counter() - start, error=response.status_code >= 400)
+                if not server_error:
+                    # Client errors (e.g. unknown material_id) say nothing about upstream health
+                    breaker.record_success()
+                    response.raise_for_status()
+                    return response.json()
+                breaker.record_failure()
+                if attempt >= self.max_retries:
+                    response.raise_for_status()
+            self._sleep_before_retry(attempt)
+            attempt += 1
+
+    def get_summary(self, material_id: str, base_url: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fetch the summary document of a material.
+
+        Args:
+            material_id: Material ID, e.g. "mp-149"
+            base_url: Summary endpoint; defaults to get_api_base_url() for the current request
+        """
+        base_url = base_url or get_api_base_url()
+        return self.get_json(f"{base_url}/{material_id}", endpoint="summary")
+
+    def get_summaries(self, material_ids: List[str], base_url: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch the summary documents of several materials with the search endpoint,
+        SUMMARY_BATCH_SIZE materials per request.
+
+        Args:
+            material_ids: Material IDs, e.g. ["mp-149", "mp-1"]
+            base_url: Summary endpoint; defaults to get_api_base_url() for the current request
+
+        Returns:
+            dict: {material_id: document} of the materials the upstream knows
+        """
+        base_url = base_url or get_api_base_url()
+        documents = {}
+        for start in range(0, len(material_ids), SUMMARY_BATCH_SIZE):
+            batch = material_ids[start:start + SUMMARY_BATCH_SIZE]
+            params = {"material_ids": ",".join(batch), "_all_fields": "true", "_limit": len(batch)}
+            response = self.get_json(f"{base_url}/", params=params, endpoint="summary_batch")
+            for document in response.get("data", []):
+                documents[document["material_id"]] = document
+        return documents
+
+    def metrics(self) -> Dict[str, Any]:
+        """Latency metrics per endpoint and circuit breaker state per upstream host"""
+        with self._lock:
+            latency = dict(self._latency)
+            breakers = dict(self._breakers)
+        return {
+            "latency": {endpoint: stats.snapshot() for endpoint, stats in latency.items()},
+            "circuit_breakers": {
+                host: {"state": breaker.state, "consecutive_failures": breaker.failures}
+                for host, breaker in breakers.items()
+            },
+        }
+
+
+# Shared client used by the pages
+api_client = SummaryAPIClient.from_env()
+instrumentation.register_stats("api_client", lambda: api_client.metrics()["latency"], label="endpoint")
+instrumentation.register_stats(
+    "api_client_circuit_breaker",
+    lambda: {
+        host: {"open": breaker["state"] == "open", "consecutive_failures": breaker["consecutive_failures"]}
+        for host, breaker in api_client.metrics()["circuit_breakers"].items()
+    },
+    label="host",
+)
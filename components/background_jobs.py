@@ -0,0 +1,320 @@
+"""
+Background execution of the material page's heavy callbacks.
+
+Callbacks declared with background_jobs.callback() run as Dash background callbacks: the
+web worker answers at once with a job id, the job runs on a fixed pool of threads of the
+worker process and the browser polls for its progress and result, so parsing and rendering
+no longer hold a request thread. Running in the worker process itself, the jobs fill its
+caches (parsed references, summaries) and record their spans and cache lookups under their
+callback, and no process is forked per job. The manager extends Dash's DiskcacheManager,
+whose diskcache directory all worker processes share, with:
+    - a bound on the jobs running at once in each worker; further jobs wait in its queue
+    - deduplication: a request for the same callback and inputs (e.g. the same material)
+      while a job for them is queued or running joins that job, in whichever worker;
+      finished results are reused for BACKGROUND_JOBS_RESULT_TTL seconds after the job
+      finished, without starting a job. Failed jobs are not reused.
+    - cancellation when the callback's cancel inputs change (the page's url.pathname) or
+      the browser starts a newer job for the same outputs: a queued job no request waits
+      for any more is dropped; a running one finishes and its result is kept for reuse
+    - the Flask request context of the request that started the job, so helpers such as
+      get_api_base_url() work inside it
+
+With BACKGROUND_JOBS=0 the callbacks run inline, as regular callbacks.
+
+Environment:
+    BACKGROUND_JOBS: Set to 0 to run the callbacks inline (default on)
+    BACKGROUND_JOBS_MAX_WORKERS: Jobs running at once per worker process (default 2)
+    BACKGROUND_JOBS_DIR: diskcache directory shared by the workers
+    BACKGROUND_JOBS_RESULT_TTL: Seconds a finished result is reused (default 600)
+"""
+import functools
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import diskcache
+import flask
+import psutil
+from dash import DiskcacheManager, callback
+
+from components.instrumentation import RequestTrace, instrumentation
+from components.page_snapshots import SNAPSHOT_VERSION
+
+ENABLED_ENV = "BACKGROUND_JOBS"
+MAX_WORKERS_ENV = "BACKGROUND_JOBS_MAX_WORKERS"
+DIR_ENV = "BACKGROUND_JOBS_DIR"
+RESULT_TTL_ENV = "BACKGROUND_JOBS_RESULT_TTL"
+
+DEFAULT_DIR = os.path.join(tempfile.gettempdir(), "dash-mp-app", "background-jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def _parse_job(job: Any) -> Tuple[Optional[str], Optional[str]]:
+    # Job ids handed to the browser are "<pid>.<job token>-<waiter token>": the worker
+    # running the job, the job, and one waiter token per request waiting for it
+    if not job or job == "None":
+        return None, None
+    job_id, _, waiter = str(job).partition("-")
+    return job_id, waiter or None
+
+
+def _failed(result: Any) -> bool:
+    # Markers Dash's job function stores for an exception or PreventUpdate
+    return isinstance(result, dict) and ("long_callback_error" in result or "_dash_no_update" in result)
+
+
+def _owner_alive(job_id: str) -> bool:
+    # A job whose worker died is not running, whatever its state in the cache says
+    return psutil.pid_exists(int(job_id.split(".")[0]))
+
+
+class BoundedDiskcacheManager(DiskcacheManager):
+    """
+    DiskcacheManager running deduplicated jobs on a bounded thread pool per worker process.
+
+    Args:
+        cache: diskcache.Cache shared by the worker processes
+        max_workers: Jobs running at once in each worker process
+        result_ttl: Seconds a finished result is reused for the same inputs
+    """
+
+    def __init__(self, cache: diskcache.Cache, max_workers: int = 2, result_ttl: float = 600):
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.stats = {"started": 0, "joined": 0, "reused": 0, "cancelled": 0}
+        self._stats_lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        self._running = 0
+        # Results stay in the cache, keyed by the inputs, for result_ttl after the job
+        # finished. The snapshot version is part of the key, so a deploy changing the
+        # section builders does not serve results of the previous ones.
+        super().__init__(cache, cache_by=[lambda: SNAPSHOT_VERSION], expire=result_ttl)
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        # Created on first use in each process: threads do not survive gunicorn's fork
+        pid = os.getpid()
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != pid:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="background-job")
+                self._pool_pid = pid
+                self._running = 0
+            return self._pool
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[stat] += amount
+
+    @staticmethod
+    def _job_key(key: str) -> str:
+        return f"{key}-job"
+
+    @staticmethod
+    def _state_key(job_id: str) -> str:
+        # {"key": result key, "state": QUEUED or RUNNING, "waiters": tokens}, removed once done
+        return f"background-job-{job_id}"
+
+    def call_job_fn(self, key, job_fn, args, context):
+        if self.result_ready(key):
+            # The first poll returns the finished result of the same inputs
+            self._count("reused")
+            return None
+        waiter = uuid.uuid4().hex[:12]
+        # The check and the reservation are one transaction, so concurrent requests for the
+        # same inputs start one job between them
+        with self.handle.transact():
+            job_id = self.handle.get(self._job_key(key))
+            job = self.handle.get(self._state_key(job_id)) if job_id else None
+            if job is not None and _owner_alive(job_id):
+                job["waiters"].add(waiter)
+                self.handle.set(self._state_key(job_id), job, expire=self.result_ttl)
+                self._count("joined")
+                return f"{job_id}-{waiter}"
+            job_id = f"{os.getpid()}.{uuid.uuid4().hex[:12]}"
+            self.handle.set(self._job_key(key), job_id, expire=self.result_ttl)
+            self.handle.set(self._state_key(job_id), {"key": key, "state": QUEUED, "waiters": {waiter}},
+                            expire=self.result_ttl)
+
+        trace = flask.g.get("instrumentation")
+        self.pool.submit(
+            self._run_job, job_id, flask.current_app._get_current_object(), flask.request.host_url,
+            trace.callback if trace is not None else "background_job", job_fn, key, args, context,
+        )
+        self._count("started")
+        return f"{job_id}-{waiter}"
+
+    def _run_job(self, job_id, server, host_url, callback_name, job_fn, key, args, context):
+        # Runs on a pool thread; the job may have been cancelled while it was queued
+        with self.handle.transact():
+            job = self.handle.get(self._state_key(job_id))
+            if job is None:
+                return
+            job["state"] = RUNNING
+            self.handle.set(self._state_key(job_id), job, expire=self.result_ttl)
+        with self._pool_lock:
+            self._running += 1
+        try:
+            with server.test_request_context(base_url=host_url):
+                # Spans and cache lookups of the job are recorded under its callback
+                flask.g.instrumentation = RequestTrace(callback_name)
+                with instrumentation.span("background_job"):
+                    job_fn(key, self._make_progress_key(key), args, context)
+            if _failed(self.handle.get(key)):
+                # An error (e.g. an upstream timeout) or PreventUpdate is not reused: the
+                # next request for the same inputs runs the job again
+                self.clear_cache_entry(key)
+            else:
+                self.handle.touch(key, expire=self.result_ttl)
+        finally:
+            with self._pool_lock:
+                self._running -= 1
+            with self.handle.transact():
+                self.handle.delete(self._state_key(job_id))
+                if self.handle.get(self._job_key(key)) == job_id:
+                    self.handle.delete(self._job_key(key))
+
+    def _remove_waiter(self, job) -> Optional[dict]:
+        """Drop the request's token from the job's waiters; the job if it was the last one"""
+        job_id, waiter = _parse_job(job)
+        if job_id is None:
+            return None
+        with self.handle.transact():
+            state = self.handle.get(self._state_key(job_id))
+            if not state or waiter not in state["waiters"]:
+                return None
+            state["waiters"].discard(waiter)
+            if state["waiters"] or state["state"] == RUNNING:
+                # A running job cannot be stopped; it finishes and its result is reused
+                self.handle.set(self._state_key(job_id), state, expire=self.result_ttl)
+                return None
+            # Nobody waits for the queued job any more: it is skipped when its turn comes
+            self.handle.delete(self._state_key(job_id))
+            if self.handle.get(self._job_key(state["key"])) == job_id:
+                self.handle.delete(self._job_key(state["key"]))
+            return state
+
+    def terminate_job(self, job):
+        # Called when the browser cancels the job or replaces it with a newer one. A job
+        # joined by other requests keeps going for them.
+        if self._remove_waiter(job) is not None:
+            self._count("cancelled")
+
+    def get_result(self, key, job):
+        # Unlike DiskcacheManager, reading a result does not extend its expiry: it is reused
+        # for result_ttl after the job finished. Other waiters may still poll for it.
+        result = self.handle.get(key, self.UNDEFINED)
+        if result is not self.UNDEFINED:
+            self.clear_cache_entry(self._make_progress_key(key))
+            self._remove_waiter(job)
+        return result
+
+    def terminate_unhealthy_job(self, job):
+        job_id, _ = _parse_job(job)
+        if job_id is None or _owner_alive(job_id):
+            return False
+        self.handle.delete(self._state_key(job_id))
+        return True
+
+    def job_running(self, job):
+        job_id, _ = _parse_job(job)
+        return job_id is not None and self.handle.get(self._state_key(job_id)) is not None and _owner_alive(job_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        with self._pool_lock:
+            running = self._running if self._pool_pid == os.getpid() else 0
+        return dict(stats, running=running, max_workers=self.max_workers)
+
+
+class BackgroundJobs:
+    """
+    Declares the app's background callbacks.
+
+    Args:
+        enabled: Run the callbacks as background jobs; inline when False
+        max_workers: Jobs running at once per worker process
+        directory: diskcache directory shared by the workers
+        result_ttl: Seconds a finished result is reused
+    """
+
+    def __init__(self, enabled: bool = True, max_workers: int = 2, directory: str = DEFAULT_DIR,
+                 result_ttl: float = 600):
+        self.enabled = enabled
+        self.manager = None
+        if enabled:
+            cache = diskcache.Cache(directory)
+            # Reopened on first use by each process: workers forked from a preloading master
+            # must not share its sqlite connection
+            cache.close()
+            self.manager = BoundedDiskcacheManager(cache, max_workers, result_ttl)
+
+    @classmethod
+    def from_env(cls) -> "BackgroundJobs":
+        """Create the background jobs configured from the BACKGROUND_JOBS* environment variables"""
+        return cls(
+            enabled=_env_flag(ENABLED_ENV, True),
+            max_workers=int(os.environ.get(MAX_WORKERS_ENV, 2)),
+            directory=os.environ.get(DIR_ENV, DEFAULT_DIR),
+            result_ttl=float(os.environ.get(RESULT_TTL_ENV, 600)),
+        )
+
+    def callback(self, *dependencies, progress: Optional[List] = None, progress_default: Optional[List] = None,
+                 running: Optional[List] = None, cancel: Optional[List] = None, interval: int = 500):
+        """
+        dash.callback running the function as a background job. As with Dash's background
+        callbacks, the function receives set_progress before the callback arguments.
+
+        Args:
+            dependencies: Outputs and inputs, as for dash.callback
+            progress: Outputs set by set_progress
+            progress_default: Values of the progress outputs when no job runs
+            running: (output, value while running, value after) triples
+            cancel: Inputs whose change cancels the job
+            interval: Milliseconds between the browser's polls
+        """
+        if self.enabled:
+            return callback(
+                *dependencies,
+                background=True,
+                manager=self.manager,
+                progress=progress,
+                progress_default=progress_default,
+                running=running,
+                cancel=cancel,
+                interval=interval,
+            )
+
+        def decorator(function):
+            @functools.wraps(function)
+            def inline(*args):
+                return function(lambda *_: None, *args)
+
+            callback(*dependencies, running=running)(inline)
+            return function
+
+        return decorator
+
+    def metrics(self) -> Dict[str, Any]:
+        if self.manager is None:
+            return {"enabled": False}
+        return dict(self.manager.metrics(), enabled=True)
+
+
+# Shared background jobs used by the page modules
+background_jobs = BackgroundJobs.from_env()
+instrumentation.register_stats("background_jobs", background_jobs.metrics)
@@ -1,7 +1,68 @@
 from dash import html
 import dash_bootstrap_components as dbc
+import hashlib
+import os
+import threading
+from collections import OrderedDict
 from typing import Dict, Optional, Union, List
-from pybtex.database import parse_string
+from components.instrumentation import instrumentation
+from components.utility_functions import stable_component_id
+
+# Upper bound, in bytes, of the formatted references kept in memory
+REFERENCE_CACHE_MAX_BYTES = int(os.environ.get("BIBTEX_CACHE_MAX_BYTES", 8 * 1024 * 1024))
+
+class ReferenceCache:
+    """
+    LRU cache of formatted reference dicts keyed by a digest of the BibTeX string.
+
+    Shared by every BibList in the process and bounded by the approximate size of
+    the cached strings rather than by the number of entries.
+    """
+
+    def __init__(self, max_bytes: int = REFERENCE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(bib_str: str) -> str:
+        return hashlib.sha1(bib_str.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _sizeof(ref_data: dict) -> int:
+        return 100 + sum(len(str(value)) for value in ref_data.values())
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, ref_data: dict):
+        size = self._sizeof(ref_data)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (ref_data, size)
+            self.size += size
+            while self.size > self.max_bytes and self._entries:
+                self.size -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+reference_cache = ReferenceCache()
+
+def parse_string(bib_str: str, bib_format: str):
+    # pybtex loads its plugin registry on import; pages served from snapshots or the
+    # reference cache never parse, so it is imported on the first parse
+    from pybtex.database import parse_string as pybtex_parse_string
+    return pybtex_parse_string(bib_str, bib_format)
 
 class BibList(html.Div):
     """A Dash component to display formatted bibliography references"""
@@ -11,6 +72,8 @@ class BibList(html.Div):
         data: Union[str, List[str]],
         className: str = "",
         id: Optional[str] = None,
+        slot: Optional[str] = None,
+        content_key: Optional[object] = None,
     ):
         """
         Initialize BibList component
@@ -18,7 +81,10 @@ class BibList(html.Div):
         Args:
             data: Single BibTeX string or list of BibTeX strings
             className: Additional CSS classes
-            id: Component ID
+            id: Component ID, by default derived from slot and content_key
+            slot: Name of the page section the list fills, used for its default id
+            content_key: Raw data whose digest is added to the default id, see
+                stable_component_id
         """
         # Convert single string to list
         if isinstance(data, str):
@@ -30,10 +96,11 @@ class BibList(html.Div):
         children = self._process_references()
         
         # Initialize parent div with processed children
+        id = id or stable_component_id("bib-list", slot, content_key)
         super().__init__(
             children=children,
             className=f"bibliography-list {className}".strip(),
-            id=id if id else f"bib-list-{hash(str(data))}",
+            **({"id": id} if id else {}),
             style={
                 'max-width': '1000px',
                 'margin': '20px auto',
@@ -41,7 +108,8 @@ class BibList(html.Div):
             }
         )
 
-    def _format_reference(self, entry, index: int) -> dict:
+    @staticmethod
+    def _format_reference(entry) -> dict:
         """Format a single reference entry into component parts"""
         try:
             entry_type = entry.type.lower()
@@ -71,12 +139,12 @@ class BibList(html.Div):
                 'url': url
             }
         except Exception as e:
-            return {'error': f"Error formatting reference {index}: {str(e)}"}
+            return {'error': str(e), 'error_context': 'formatting'}
 
     def _create_reference_component(self, ref_data: dict, index: int) -> html.Div:
         """Create a formatted reference component"""
         if 'error' in ref_data:
-            return html.Div(ref_data['error'], 
+            return html.Div(f"Error {ref_data['error_context']} reference {index}: {ref_data['error']}", 
                           style={'color': 'red', 'padding': '1em'})
         if ref_data['type'] == 'misc':
             return html.Div([
@@ -146,31 +214,78 @@ class BibList(html.Div):
             'line-height': '1.6'
         })
 
-    def _process_references(self) -> List[html.Div]:
-        """Process all BibTeX entries and create components"""
+    @classmethod
+    def parse_references(cls, bib_strings: List[str]) -> List[dict]:
+        """
+        Parse and format a list of BibTeX strings, reusing cached results.
+
+        Uncached strings are parsed together in a single pybtex pass. If that pass
+        fails (e.g. one malformed entry or repeated keys), they are parsed one by one
+        so a bad entry only affects its own result.
+
+        Args:
+            bib_strings: BibTeX strings, one entry each
+
+        Returns:
+            list: Formatted reference dicts in the same order as bib_strings.
+                  Entries that could not be processed hold an 'error' key.
+        """
+        keys = [reference_cache.key(bib_str) for bib_str in bib_strings]
+        results = {}
+        missing = OrderedDict()
+        for key, bib_str in zip(keys, bib_strings):
+            ref_data = reference_cache.get(key)
+            instrumentation.cache_lookup("bibtex", ref_data is not None)
+            if ref_data is None:
+                missing[key] = bib_str
+            else:
+                results[key] = ref_data
+
+        if missing:
+            entries = cls._parse_batch(list(missing.values()))
+            for key, bib_str in missing.items():
+                if entries is not None:
+                    ref_data = cls._format_reference(entries.pop(0))
+                else:
+                    ref_data = cls._parse_single(bib_str)
+                reference_cache.set(key, ref_data)
+                results[key] = ref_data
+
+        return [results[key] for key in keys]
+
+    @staticmethod
+    def _parse_batch(bib_strings: List[str]) -> Optional[list]:
+        """Parse all strings in one pass; None if they can't be matched back one to one"""
+        if len(bib_strings) < 2:
+            return None
         try:
-            references = []
-            
-            # Process each reference
-            for i, bib_str in enumerate(self.data, 1):
-                # Parse BibTeX string
-                bib_data = parse_string(bib_str, 'bibtex')
-                
-                # Get the first (and should be only) entry
-                key, entry = next(iter(bib_data.entries.items()))
-                
-                # Format and create component
-                ref_data = self._format_reference(entry, i)
-                ref_component = self._create_reference_component(ref_data, i)
-                references.append(ref_component)
-
-            return references
+            entries = list(parse_string("\n".join(bib_strings), 'bibtex').entries.values())
+        except Exception:
+            return None
+        if len(entries) != len(bib_strings):
+            return None
+        if not all(entry.key in bib_str for entry, bib_str in zip(entries, bib_strings)):
+            return None
+        return entries
 
+    @classmethod
+    def _parse_single(cls, bib_str: str) -> dict:
+        try:
+            bib_data = parse_string(bib_str, 'bibtex')
+            # Get the first (and should be only) entry
+            key, entry = next(iter(bib_data.entries.items()))
+        except StopIteration:
+            return {'error': "no BibTeX entry found", 'error_context': 'processing'}
         except Exception as e:
-            return [html.Div(
-                f"Error processing references: {str(e)}",
-                style={'color': 'red', 'padding': '1em'}
-            )]
+            return {'error': str(e), 'error_context': 'processing'}
+        return cls._format_reference(entry)
+
+    def _process_references(self) -> List[html.Div]:
+        """Process all BibTeX entries and create components"""
+        return [
+            self._create_reference_component(ref_data, i)
+            for i, ref_data in enumerate(self.parse_references(self.data), 1)
+        ]
 
 # Example usage:
 if __name__ == "__main__":
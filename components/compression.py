@@ -0,0 +1,207 @@
+"""
+Compression and ETag validation of Dash's own responses.
+
+Callback responses carry full structure JSON and _dash-layout the whole crystal_toolkit layout,
+so they are compressed (Brotli when the brotli package is installed and the client accepts it,
+gzip otherwise) above a size threshold, with a level per route. Cacheable GETs get a strong
+ETag per content coding and are answered with 304 Not Modified when the client already has
+them; their compressed bodies are cached, so slow maximum levels cost nothing after the first
+request.
+
+Environment:
+    RESPONSE_COMPRESSION: Set to 0 to disable (default on)
+    RESPONSE_COMPRESSION_MIN_BYTES: Smallest body worth compressing (default 1024)
+    RESPONSE_COMPRESSION_LEVELS: Per-route overrides as route=gzip_level:brotli_quality,
+        e.g. "_dash-update-component=6:5,_dash-layout=9:11"
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from flask import request
+
+from components.instrumentation import instrumentation
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENABLED_ENV = "RESPONSE_COMPRESSION"
+MIN_BYTES_ENV = "RESPONSE_COMPRESSION_MIN_BYTES"
+LEVELS_ENV = "RESPONSE_COMPRESSION_LEVELS"
+
+COMPRESSION_ENABLED = os.environ.get(ENABLED_ENV, "1").lower() not in ("0", "false", "no")
+
+# (gzip level, brotli quality) per route. Callback responses differ per request and are
+# compressed on every response, so their levels trade ratio for speed.
+DEFAULT_LEVELS: Dict[str, Tuple[int, int]] = {
+    "_dash-update-component": (6, 5),
+    "_dash-layout": (9, 11),
+    "_dash-dependencies": (9, 11),
+}
+# Routes answered with ETags and 304s
+CACHEABLE_ROUTES = {"_dash-layout", "_dash-dependencies"}
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html", "text/css", "application/javascript", "text/plain"}
+COMPRESSED_BODY_CACHE_SIZE = 32
+
+
+def parse_levels(value: str) -> Dict[str, Tuple[int, int]]:
+    """Parse RESPONSE_COMPRESSION_LEVELS, e.g. "_dash-layout=9:11,_dash-update-component=4:4" """
+    levels = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        route, _, level = item.partition("=")
+        gzip_level, _, brotli_quality = level.partition(":")
+        levels[route.strip()] = (int(gzip_level), int(brotli_quality or 5))
+    return levels
+
+
+class RouteStats:
+    """Byte and latency counters of one route"""
+
+    def __init__(self):
+        self.responses = 0
+        self.compressed = 0
+        self.not_modified = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_seconds = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "responses": self.responses,
+            "compressed": self.compressed,
+            "not_modified": self.not_modified,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+            "compress_ms_total": round(self.compress_seconds * 1000, 3),
+            "compress_ms_mean": round(self.compress_seconds * 1000 / self.compressed, 3) if self.compressed else None,
+        }
+
+
+class ResponseCompressor:
+    """
+    Flask after_request hook compressing the responses of the configured routes.
+
+    Args:
+        levels: (gzip level, brotli quality) per route name
+        min_bytes: Smallest body worth compressing
+    """
+
+    def __init__(self, levels: Optional[Dict[str, Tuple[int, int]]] = None, min_bytes: int = 1024):
+        self.levels = dict(DEFAULT_LEVELS if levels is None else levels)
+        self.min_bytes = min_bytes
+        self.stats: Dict[str, RouteStats] = {route: RouteStats() for route in self.levels}
+        self._bodies: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ResponseCompressor":
+        levels = dict(DEFAULT_LEVELS)
+        levels.update(parse_levels(os.environ.get(LEVELS_ENV, "")))
+        return cls(levels=levels, min_bytes=int(os.environ.get(MIN_BYTES_ENV, 1024)))
+
+    def init_app(self, server):
+        server.after_request(self.after_request)
+
+    @staticmethod
+    def choose_encoding() -> Optional[str]:
+        accepted = request.accept_encodings
+        if brotli is not None and accepted.quality("br") > 0:
+            return "br"
+        if accepted.quality("gzip") > 0:
+            return "gzip"
+        return None
+
+    def _compress(self, body: bytes, encoding: str, route: str) -> bytes:
+        gzip_level, brotli_quality = self.levels[route]
+        if encoding == "br":
+            return brotli.compress(body, quality=brotli_quality)
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+    def _cached_compress(self, key: Tuple[str, str], body: bytes, encoding: str, route: str) -> bytes:
+        with self._lock:
+            compressed = self._bodies.get(key)
+            if compressed is not None:
+                self._bodies.move_to_end(key)
+                return compressed
+        compressed = self._compress(body, encoding, route)
+        with self._lock:
+            self._bodies[key] = compressed
+            while len(self._bodies) > COMPRESSED_BODY_CACHE_SIZE:
+                self._bodies.popitem(last=False)
+        return compressed
+
+    def after_request(self, response):
+        route = request.path.rstrip("/").rsplit("/", 1)[-1]
+        if route not in self.levels:
+            return response
+        if (
+            response.status_code != 200
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        stats = self.stats[route]
+        body = response.get_data()
+        encoding = self.choose_encoding() if len(body) >= self.min_bytes else None
+        cacheable = request.method == "GET" and route in CACHEABLE_ROUTES
+        response.vary.add("Accept-Encoding")
+
+        if cacheable:
+            # Strong ETags must differ between content codings of the same body
+            digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+            etag = f"{digest}-{encoding}" if encoding else digest
+            response.set_etag(etag)
+            # Stored, but revalidated with the ETag before every use
+            response.cache_control.no_cache = True
+            if etag in request.if_none_match:
+                with self._lock:
+                    stats.not_modified += 1
+                response.status_code = 304
+                response.set_data(b"")
+                return response
+
+        if encoding is None:
+            with self._lock:
+                stats.responses += 1
+                stats.bytes_in += len(body)
+                stats.bytes_out += len(body)
+            return response
+
+        start = time.perf_counter()
+        if cacheable:
+            compressed = self._cached_compress((etag, encoding), body, encoding, route)
+        else:
+            compressed = self._compress(body, encoding, route)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stats.responses += 1
+            stats.compressed += 1
+            stats.bytes_in += len(body)
+            stats.bytes_out += len(compressed)
+            stats.compress_seconds += elapsed
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def metrics(self) -> dict:
+        return {
+            "brotli_available": brotli is not None,
+            "min_bytes": self.min_bytes,
+            "routes": {route: stats.snapshot() for route, stats in self.stats.items()},
+        }
+
+
+response_compressor = ResponseCompressor.from_env()
+instrumentation.register_stats("compression", lambda: response_compressor.metrics()["routes"], label="route")
@@ -1,7 +1,36 @@
-from dash import html
+from dash import html, dcc, clientside_callback, ClientsideFunction, Input, Output, MATCH
 import dash_bootstrap_components as dbc
 from typing import Dict, Optional, Union, List, Any
 from dash.development.base_component import Component
+from components.utility_functions import content_digest, stable_component_id
+
+# Pattern-matching ids of compact boxes: the row data and the element assets/js/data_box.js renders it into
+COMPACT_DATA_TYPE = "data-box-data"
+COMPACT_TABLE_TYPE = "data-box-table"
+
+def compact_payload(data: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Row data of a compact DataBox: {"variant": "table", "columns": [...], "rows": [[...], ...]}
+    for a list of dictionaries, {"variant": "key_value", "rows": [[key, value], ...]} otherwise.
+
+    Returns None when a value is a Dash component, which only the default mode can display.
+    Booleans are sent as "True" / "False", as the default mode shows them; React renders
+    nothing for a boolean child.
+    """
+    if isinstance(data, list) and len(data) > 0:
+        columns = list(data[0].keys())
+        rows = [[item.get(column, '') for column in columns] for item in data]
+        payload = {"variant": "table", "columns": columns, "rows": rows}
+    else:
+        rows = [[key, value] for key, value in (data if isinstance(data, dict) else {}).items()]
+        payload = {"variant": "key_value", "rows": rows}
+    for row in rows:
+        for index, value in enumerate(row):
+            if isinstance(value, bool):
+                row[index] = str(value)
+            elif value is not None and not isinstance(value, (str, int, float)):
+                return None
+    return payload
 
 class DataBox(html.Div):
     """A component for displaying data in a table format."""
@@ -12,7 +41,9 @@ class DataBox(html.Div):
         title: Optional[str] = None,
         className: str = "",
         id: Optional[str] = None,
-        
+        compact: bool = False,
+        slot: Optional[str] = None,
+        content_key: Any = None,
     ):
         """
         Initialize a DataBox component.
@@ -21,9 +52,22 @@ class DataBox(html.Div):
             data: Either a dictionary for key-value pairs or a list of dictionaries for table format
             title: Optional title for the box
             className: Additional CSS classes
-            id: Component ID
-            variant: "key_value" for dict display or "table" for list of dicts display
+            id: Component ID, by default derived from slot and content_key
+            compact: Send only the row data and render the table in the browser
+                (assets/js/data_box.js), styled by the data-box-* classes of styles.css.
+                Much smaller callback responses for long tables; values must be strings or
+                numbers, otherwise the box falls back to the default mode.
+            slot: Name of the page section the box fills, used for its default id
+            content_key: Raw data whose digest is added to the default id, see
+                stable_component_id
         """
+        id = id or stable_component_id("data-box", slot, content_key)
+        payload = compact_payload(data) if compact else None
+        if payload is not None:
+            # Compact boxes need an id for their Store; the payload is plain data
+            self._create_compact_variant(payload, title, className, id or f"data-box-{content_digest(payload)}")
+            return
+
         if isinstance(data, list) and len(data) > 0:
             table = self._create_table_variant(data)
         else:
@@ -62,7 +106,50 @@ class DataBox(html.Div):
         super().__init__(
             children=card,
             className=f"data-box {className}",
-            id=id if id else f"data-box-{hash(str(data))}"
+            **({"id": id} if id else {})
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: Dict[str, List[Union[str, int, float, None]]],
+        title: Optional[str] = None,
+        className: str = "",
+        slot: Optional[str] = None,
+        content_key: Any = None,
+    ) -> "DataBox":
+        """
+        Compact table box from columnar data, {header: [value per row]}, without building a
+        dictionary or component per row. Values must be strings, numbers or None.
+
+        Args:
+            columns: Column values by header, all of the same length
+            title: Optional title for the box
+            className: Additional CSS classes
+            slot: Name of the page section the box fills, used for its id
+            content_key: Raw data whose digest is added to the id, see stable_component_id
+        """
+        payload = {
+            "variant": "table",
+            "columns": list(columns),
+            "rows": [list(row) for row in zip(*columns.values())],
+        }
+        box = cls.__new__(cls)
+        id = stable_component_id("data-box", slot, content_key) or f"data-box-{content_digest(payload)}"
+        box._create_compact_variant(payload, title, className, id)
+        return box
+
+    def _create_compact_variant(self, payload: Dict[str, Any], title: Optional[str], className: str, id: str):
+        """Card holding the row data in a Store and an empty container the browser renders it into."""
+        children = []
+        if title:
+            children.append(html.Div(html.Span(title), className="data-box-title data-box-heading mb-3"))
+        children.append(html.Div(id={"type": COMPACT_TABLE_TYPE, "index": id}))
+        children.append(dcc.Store(id={"type": COMPACT_DATA_TYPE, "index": id}, data=payload))
+        super().__init__(
+            children=html.Div(children, className="card p-3 data-box-card"),
+            className=f"data-box {className}",
+            id=id
         )
 
     def _create_key_value_variant(self, data: Dict[str, Any]) -> html.Table:
@@ -161,6 +248,15 @@ class DataBox(html.Div):
         else:
             self.children.children = [table]
 
+# Render compact boxes when their data arrives. Boxes are usually added by callbacks, so the
+# render must also run for newly mounted components despite prevent_initial_callbacks.
+clientside_callback(
+    ClientsideFunction(namespace="data_box", function_name="render"),
+    Output({"type": COMPACT_TABLE_TYPE, "index": MATCH}, "children"),
+    Input({"type": COMPACT_DATA_TYPE, "index": MATCH}, "data"),
+    prevent_initial_call=False,
+)
+
 if __name__ == "__main__":
     # Test data for key-value variant
     kv_data = {
@@ -201,6 +297,15 @@ if __name__ == "__main__":
             className="mb-4"
         ),
         
+        # Compact variant, rendered in the browser
+        DataBox(
+            data=table_data,
+            title="Employee List (compact)",
+            className="mb-4",
+            id="employee-table-compact",
+            compact=True
+        ),
+
         # Empty data handling
         DataBox(
             data={},
@@ -211,9 +316,12 @@ if __name__ == "__main__":
 
     # If you want to run this as a standalone app
     from dash import Dash
+    import os
     import webbrowser
     
-    app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+    # The app's assets hold the compact renderer and its styles
+    assets_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+    app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], assets_folder=assets_folder)
     app.layout = html.Div(test_layout, className="container p-4")
     
     if __name__ == "__main__":
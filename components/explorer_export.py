@@ -0,0 +1,329 @@
+"""
+Streaming export of the materials explorer's search results.
+
+GET /export/materials.<format> takes the explorer's search parameters (the query string of
+the explorer page, e.g. elements=Li,Fe&energy_above_hull_max=0.1&_sort_fields=-band_gap)
+or material_ids=mp-149,mp-1 for the selected rows, and streams every matching material as
+CSV, JSON lines or Parquet. The rows are read from the summary API page by page and each
+page is encoded and sent before the next is requested, so an export of 100k rows holds one
+page in memory. The columns are the selectors of columns.json, dotted ones such as
+symmetry.crystal_system included.
+
+Parquet export requires pyarrow; the file is written one row group per page, with column
+types fixed up front from the formatTypes of columns.json.
+
+Environment:
+    EXPORT_PAGE_SIZE: Rows requested from the summary API at a time (default 500)
+    EXPORT_MAX_ROWS: Rows an export stops at (default 200000)
+"""
+import csv
+import io
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from flask import Response, jsonify
+
+from components.api_client import api_client
+from components.instrumentation import instrumentation
+from pages.apps.materials_explorer.explorer_config import SORT_FIELDS, get_columns
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE_ENV = "EXPORT_PAGE_SIZE"
+MAX_ROWS_ENV = "EXPORT_MAX_ROWS"
+
+# Search parameters set by the export itself rather than taken from the explorer
+PAGING_PARAMS = {"_skip", "_limit", "_page", "_per_page", "_fields", "_all_fields"}
+# Selected rows are requested this many material_ids at a time, keeping URLs short
+IDS_PER_REQUEST = 100
+
+# format -> (mimetype, file extension)
+FORMATS: Dict[str, Tuple[str, str]] = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# formatTypes of columns.json exported as float64 and bool columns in Parquet
+NUMERIC_FORMATS = {"FIXED_DECIMAL", "SIGNIFICANT_FIGURES"}
+BOOLEAN_FORMATS = {"BOOLEAN", "BOOLEAN_CLASS"}
+
+
+def get_field(document: dict, selector: str) -> Any:
+    """Value of a dotted selector such as "symmetry.crystal_system", or None"""
+    value = document
+    for part in selector.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def parse_material_ids(params: Dict[str, str]) -> Optional[List[str]]:
+    """Selected rows of material_ids=mp-149,mp-1, or None for a search export"""
+    if "material_ids" not in params:
+        return None
+    return [mid.strip() for mid in params["material_ids"].split(",") if mid.strip()]
+
+
+def csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return ",".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+def parquet_value(value: Any, column_type: str) -> Any:
+    """Value converted to a column type of ExplorerExport.column_types, None if it has none"""
+    if value is None:
+        return None
+    if column_type == "float":
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if column_type == "bool":
+        return bool(value)
+    return value if isinstance(value, str) else str(csv_value(value))
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file collecting the bytes written since the last drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ExplorerExport:
+    """
+    Streams explorer search results from the summary API.
+
+    Args:
+        page_size: Rows requested from the summary API at a time
+        max_rows: Rows an export stops at
+    """
+
+    def __init__(self, page_size: int = 500, max_rows: int = 200000):
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ExplorerExport":
+        """Create an exporter configured from the EXPORT_* environment variables"""
+        return cls(
+            page_size=int(os.environ.get(PAGE_SIZE_ENV, 500)),
+            max_rows=int(os.environ.get(MAX_ROWS_ENV, 200000)),
+        )
+
+    @staticmethod
+    def selectors() -> List[str]:
+        """Export columns: the selectors of columns.json, material_id first"""
+        selectors = [column["selector"] for column in get_columns()]
+        return ["material_id"] + [selector for selector in selectors if selector != "material_id"]
+
+    def _count(self, export_format: str, key: str, amount: int = 1):
+        with self._lock:
+            counts = self.stats.setdefault(export_format, {"exports": 0, "rows": 0, "errors": 0})
+            counts[key] += amount
+
+    def _requests(self, params: Dict[str, str], selectors: List[str],
+                  material_ids: Optional[List[str]]) -> Iterator[Dict[str, str]]:
+        # Search parameters of the summary API requests, one per page of results
+        params = {key: value for key, value in params.items()
+                  if key not in PAGING_PARAMS and key != "material_ids" and value != ""}
+        params.setdefault("_sort_fields", ",".join(SORT_FIELDS))
+        params["_fields"] = ",".join(dict.fromkeys(selector.split(".")[0] for selector in selectors))
+        if material_ids is not None:
+            for start in range(0, len(material_ids), IDS_PER_REQUEST):
+                chunk = material_ids[start:start + IDS_PER_REQUEST]
+                yield dict(params, material_ids=",".join(chunk), _skip="0", _limit=str(len(chunk)))
+            return
+        skip = 0
+        while True:
+            yield dict(params, _skip=str(skip), _limit=str(self.page_size))
+            skip += self.page_size
+
+    def iter_pages(self, base_url: str, params: Dict[str, str], selectors: List[str]) -> Iterator[List[dict]]:
+        """
+        Pages of matching summary documents, requested one at a time.
+
+        Args:
+            base_url: Summary endpoint, as returned by get_api_base_url()
+            params: The explorer's search parameters, or material_ids of the selected rows
+            selectors: Columns to request
+
+        Raises:
+            requests.RequestException: A page could not be fetched
+        """
+        rows = 0
+        material_ids = parse_material_ids(params)
+        paged = material_ids is None
+        for page_params in self._requests(params, selectors, material_ids):
+            response = api_client.get_json(f"{base_url}/", params=page_params, endpoint="export")
+            data = response.get("data", [])
+            if not data and paged:
+                # Whatever the upstream's paging, an empty page ends the export
+                return
+            documents = data[:self.max_rows - rows]
+            if documents:
+                yield documents
+            rows += len(documents)
+            if rows >= self.max_rows or (paged and len(data) < self.page_size):
+                return
+
+    @staticmethod
+    def _csv_chunks(pages: Iterator[List[dict]], selectors: List[str]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(selectors)
+        for documents in pages:
+            writer.writerows([csv_value(get_field(document, selector)) for selector in selectors]
+                             for document in documents)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # No results: the header only
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _jsonl_chunks(pages: Iterator[List[dict]], selectors: List[str]) -> Iterator[bytes]:
+        for documents in pages:
+            yield "".join(
+                json.dumps({selector: get_field(document, selector) for selector in selectors}) + "\n"
+                for document in documents
+            ).encode("utf-8")
+
+    @staticmethod
+    def column_types(selectors: List[str]) -> Dict[str, str]:
+        """
+        Parquet type of each export column, from its formatType in columns.json: "float" for
+        the numeric formats and right-aligned columns without one (space group number,
+        sites), "bool" for the boolean formats and "string" otherwise. Fixed up front, so
+        every row group has the same schema whichever values the first page holds.
+        """
+        types = {}
+        for column in get_columns():
+            format_type = column.get("formatType")
+            if format_type in NUMERIC_FORMATS or (format_type is None and column.get("right")):
+                types[column["selector"]] = "float"
+            elif format_type in BOOLEAN_FORMATS:
+                types[column["selector"]] = "bool"
+        return {selector: types.get(selector, "string") for selector in selectors}
+
+    @staticmethod
+    def _parquet_chunks(pages: Iterator[List[dict]], selectors: List[str]) -> Iterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = ExplorerExport.column_types(selectors)
+        arrow_types = {"float": pa.float64(), "bool": pa.bool_(), "string": pa.string()}
+        schema = pa.schema([pa.field(selector, arrow_types[types[selector]]) for selector in selectors])
+        sink = ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        for documents in pages:
+            columns = [
+                [parquet_value(get_field(document, selector), types[selector]) for document in documents]
+                for selector in selectors
+            ]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    def response(self, export_format: str, params: Dict[str, str], base_url: str) -> Response:
+        """
+        Streaming response of an export. The first page is fetched before the response
+        starts, so an invalid search or an unavailable upstream is reported with its status.
+
+        Args:
+            export_format: "csv", "jsonl" or "parquet"
+            params: Query parameters of the export request
+            base_url: Summary endpoint, as returned by get_api_base_url()
+        """
+        if export_format not in FORMATS:
+            return jsonify({"detail": f"Unknown format {export_format}, use one of {', '.join(FORMATS)}"}), 404
+        if export_format == "parquet":
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                return jsonify({"detail": "Parquet export requires pyarrow"}), 501
+
+        if parse_material_ids(params) == []:
+            return jsonify({"detail": "material_ids is empty, select at least one material"}), 400
+
+        selectors = self.selectors()
+        pages = self.iter_pages(base_url, params, selectors)
+        try:
+            first_page = next(pages, [])
+        except requests.HTTPError as e:
+            self._count(export_format, "errors")
+            if e.response is not None and e.response.status_code == 400:
+                # An invalid search: pass on the summary API's explanation
+                return jsonify({"detail": e.response.json().get("detail", "Invalid search")}), 400
+            return jsonify({"detail": f"Summary API error: {e}"}), 502
+        except requests.RequestException as e:
+            self._count(export_format, "errors")
+            return jsonify({"detail": f"Summary API unavailable: {e}"}), 502
+        self._count(export_format, "exports")
+
+        def counted_pages():
+            if first_page:
+                self._count(export_format, "rows", len(first_page))
+                yield first_page
+            try:
+                for documents in pages:
+                    self._count(export_format, "rows", len(documents))
+                    yield documents
+            except requests.RequestException:
+                # The status is sent already; a truncated download is all that can be reported
+                self._count(export_format, "errors")
+                logger.exception("Export stopped: a page of results could not be fetched")
+                raise
+
+        chunks = getattr(self, f"_{export_format}_chunks")(counted_pages(), selectors)
+        mimetype, extension = FORMATS[export_format]
+        return Response(
+            chunks,
+            mimetype=mimetype,
+            headers={"Content-Disposition": f'attachment; filename="materials.{extension}"'},
+        )
+
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {export_format: dict(counts) for export_format, counts in self.stats.items()}
+
+
+# Shared exporter used by app.py
+explorer_export = ExplorerExport.from_env()
+instrumentation.register_stats("explorer_export", explorer_export.metrics, label="format")
@@ -0,0 +1,312 @@
+"""
+Per-callback timing, payload size and cache instrumentation, served in the Prometheus text
+format.
+
+Every Dash callback request (_dash-update-component) is recorded under the name of its
+callback function:
+    - wall time of the request, and the spans inside it: upstream fetches, the material
+      page's section builders, serialization of the outputs to JSON
+    - size of the JSON payload, before compression
+    - hits and misses of the caches it consulted (summary documents, page snapshots,
+      structure scenes, BibTeX references)
+Spans and cache lookups outside a callback request (prefetch threads, scripts) are recorded
+under the callback name "none". Components register their own counters with
+register_stats(); GET /metrics renders those and the callback metrics. With SERVER_TIMING,
+callback responses also carry a Server-Timing header listing the request's spans, which
+the browser's network panel shows per request.
+
+Clientside callbacks (e.g. toggle_left_navbar) run in the browser and are not recorded.
+
+Environment:
+    INSTRUMENTATION: Set to 0 to disable (default on)
+    SERVER_TIMING: Set to 1 to add Server-Timing headers to callback responses (default off)
+"""
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dash import _callback
+from flask import g, has_request_context, request
+
+ENABLED_ENV = "INSTRUMENTATION"
+SERVER_TIMING_ENV = "SERVER_TIMING"
+
+METRIC_PREFIX = "dash_mp"
+CALLBACK_ROUTE = "_dash-update-component"
+# Callback name of spans and cache lookups made outside a callback request
+NO_CALLBACK = "none"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PAYLOAD_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+class Histogram:
+    """Cumulative bucket counts, count and sum of observed values"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class RequestTrace:
+    """Spans and cache lookups of one callback request, kept on flask.g"""
+
+    def __init__(self, callback: str):
+        self.callback = callback
+        self.start = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+        self.cache_events: List[Tuple[str, bool]] = []
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def _metric_name(*parts: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(parts))
+
+
+class Instrumentation:
+    """
+    Metrics registry of a worker process.
+
+    Args:
+        enabled: Record callbacks, spans and cache lookups; /metrics still serves the
+            registered component stats when disabled
+        server_timing: Add Server-Timing headers to callback responses
+    """
+
+    def __init__(self, enabled: bool = True, server_timing: bool = False):
+        self.enabled = enabled
+        self.server_timing = server_timing
+        self.app = None
+        # callback -> histogram of request wall time / payload bytes
+        self.durations: Dict[str, Histogram] = {}
+        self.payloads: Dict[str, Histogram] = {}
+        self.errors: Dict[str, int] = {}
+        # (callback, span) -> histogram of span durations
+        self.spans: Dict[Tuple[str, str], Histogram] = {}
+        # (callback, cache, "hit" or "miss") -> lookups
+        self.cache_lookups: Dict[Tuple[str, str, str], int] = {}
+        # name -> (stats getter, label of the outer keys or None)
+        self.stats: Dict[str, Tuple[Callable[[], Dict[str, Any]], Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Instrumentation":
+        """Create a registry configured from the INSTRUMENTATION and SERVER_TIMING environment variables"""
+        return cls(enabled=_env_flag(ENABLED_ENV, True), server_timing=_env_flag(SERVER_TIMING_ENV, False))
+
+    def init_app(self, app):
+        """
+        Record the app's callback requests. Call after response compression is set up, so
+        payloads are measured before they are compressed.
+        """
+        self.app = app
+        if not self.enabled:
+            return
+        app.server.before_request(self.before_request)
+        app.server.after_request(self.after_request)
+        self._time_serialization()
+
+    def _time_serialization(self):
+        # Dash serializes callback outputs with dash._callback.to_json; time it as a span
+        to_json = _callback.to_json
+        if getattr(to_json, "instrumented", False):
+            return
+
+        @functools.wraps(to_json)
+        def timed_to_json(value):
+            with self.span("serialize"):
+                return to_json(value)
+
+        timed_to_json.instrumented = True
+        _callback.to_json = timed_to_json
+
+    @staticmethod
+    def _is_callback_request() -> bool:
+        return request.method == "POST" and request.path.rstrip("/").endswith(CALLBACK_ROUTE)
+
+    def before_request(self):
+        if not self._is_callback_request():
+            return
+        body = request.get_json(silent=True) or {}
+        callback = self.app.callback_map.get(body.get("output"), {}).get("callback")
+        g.instrumentation = RequestTrace(getattr(callback, "__name__", None) or "unknown")
+
+    def after_request(self, response):
+        trace: Optional[RequestTrace] = g.pop("instrumentation", None)
+        if trace is None:
+            return response
+        elapsed = time.perf_counter() - trace.start
+        payload_bytes = 0 if response.direct_passthrough else len(response.get_data())
+        with self._lock:
+            self.durations.setdefault(trace.callback, Histogram(DURATION_BUCKETS)).observe(elapsed)
+            self.payloads.setdefault(trace.callback, Histogram(PAYLOAD_BUCKETS)).observe(payload_bytes)
+            if response.status_code >= 400:
+                self.errors[trace.callback] = self.errors.get(trace.callback, 0) + 1
+        if self.server_timing:
+            response.headers["Server-Timing"] = self._server_timing(trace, elapsed)
+        return response
+
+    @staticmethod
+    def _server_timing(trace: RequestTrace, elapsed: float) -> str:
+        entries = [f'callback;desc="{trace.callback}";dur={elapsed * 1000:.1f}']
+        for index, (name, seconds) in enumerate(trace.spans):
+            # Names must be unique tokens; a builder may run more than once per request
+            entries.append(f'span{index};desc="{name}";dur={seconds * 1000:.1f}')
+        lookups: Dict[str, List[int]] = {}
+        for cache, hit in trace.cache_events:
+            lookups.setdefault(cache, [0, 0])[0 if hit else 1] += 1
+        for cache, (hits, misses) in lookups.items():
+            entries.append(f'cache-{cache};desc="{hits} hit, {misses} miss"')
+        return ", ".join(entries)
+
+    @staticmethod
+    def _current_trace() -> Optional[RequestTrace]:
+        return g.get("instrumentation") if has_request_context() else None
+
+    @contextmanager
+    def span(self, name: str):
+        """Time the enclosed block under name, in the current callback request if any"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - start)
+
+    def record_span(self, name: str, seconds: float):
+        """Record a span timed elsewhere, e.g. on another thread, in the current callback request if any"""
+        if not self.enabled:
+            return
+        trace = self._current_trace()
+        callback = trace.callback if trace is not None else NO_CALLBACK
+        if trace is not None:
+            trace.spans.append((name, seconds))
+        with self._lock:
+            self.spans.setdefault((callback, name), Histogram(DURATION_BUCKETS)).observe(seconds)
+
+    def timed(self, name: Optional[str] = None):
+        """Decorator recording each call of a function as a span named after it"""
+        def decorator(function):
+            span_name = name or function.__name__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+        return decorator
+
+    def cache_lookup(self, cache: str, hit: bool):
+        """Count a lookup of a cache, in the current callback request if any"""
+        if not self.enabled:
+            return
+        trace = self._current_trace()
+        callback = trace.callback if trace is not None else NO_CALLBACK
+        if trace is not None:
+            trace.cache_events.append((cache, hit))
+        key = (callback, cache, "hit" if hit else "miss")
+        with self._lock:
+            self.cache_lookups[key] = self.cache_lookups.get(key, 0) + 1
+
+    def register_stats(self, name: str, getter: Callable[[], Dict[str, Any]], label: Optional[str] = None):
+        """
+        Export a component's counters on /metrics as gauges named <prefix>_<name>_<key>.
+
+        Args:
+            name: Component name, e.g. "summary_cache"
+            getter: Returns {key: number}, or {label value: {key: number}} with label
+            label: Label name of the outer keys, e.g. "route"
+        """
+        self.stats[name] = (getter, label)
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            self._render_histograms(lines, "callback_duration_seconds", "Wall time of Dash callback requests",
+                                    {(callback,): h for callback, h in self.durations.items()}, ("callback",))
+            self._render_histograms(lines, "callback_payload_bytes", "JSON payload of callback responses before compression",
+                                    {(callback,): h for callback, h in self.payloads.items()}, ("callback",))
+            self._render_histograms(lines, "callback_span_seconds", "Duration of spans inside callbacks",
+                                    self.spans, ("callback", "span"))
+            errors = dict(self.errors)
+            cache_lookups = dict(self.cache_lookups)
+        self._render_counter(lines, "callback_errors_total", "Callback requests answered with an error status",
+                             {(callback,): count for callback, count in errors.items()}, ("callback",))
+        self._render_counter(lines, "callback_cache_lookups_total", "Cache lookups made by callbacks",
+                             cache_lookups, ("callback", "cache", "result"))
+        for name, (getter, label) in self.stats.items():
+            self._render_stats(lines, name, getter(), label)
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(lines: List[str], metric: str, help_text: str,
+                           histograms: Dict[tuple, Histogram], label_names: Tuple[str, ...]):
+        name = f"{METRIC_PREFIX}_{metric}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for label_values, histogram in sorted(histograms.items()):
+            labels = dict(zip(label_names, label_values))
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f"{name}_bucket{_labels(**labels, le=repr(float(bound)))} {count}")
+            lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {histogram.count}')
+            lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+    @staticmethod
+    def _render_counter(lines: List[str], metric: str, help_text: str,
+                        counts: Dict[tuple, int], label_names: Tuple[str, ...]):
+        name = f"{METRIC_PREFIX}_{metric}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for label_values, count in sorted(counts.items()):
+            lines.append(f"{name}{_labels(**dict(zip(label_names, label_values)))} {count}")
+
+    @staticmethod
+    def _render_stats(lines: List[str], component: str, stats: Dict[str, Any], label: Optional[str]):
+        samples: Dict[str, List[str]] = {}
+        rows = stats.items() if label else [(None, stats)]
+        for label_value, values in rows:
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = _metric_name(METRIC_PREFIX, component, key)
+                labels = _labels(**{label: label_value}) if label else ""
+                samples.setdefault(name, []).append(f"{name}{labels} {value}")
+        for name, name_samples in samples.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines += name_samples
+
+
+# Shared registry used by the components and app.py
+instrumentation = Instrumentation.from_env()
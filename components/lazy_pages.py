@@ -0,0 +1,220 @@
+"""
+Deferred import of the pages that need crystal_toolkit.
+
+Dash imports every page when the app is created, and the material detail page brings in
+crystal_toolkit, pymatgen and their dependencies: most of the app's import time. A page
+registers its layout through page_loader.page_layout() and keeps its body (layout,
+callbacks) in a module Dash does not discover. By default that module is imported right
+away, as before. With LAZY_PAGES it is imported:
+    - in a background thread once the worker is up (gunicorn's post_worker_init hook in
+      gunicorn.conf.py, wsgi.py's waitress entry point) or when the first request for one
+      of the deferred pages arrives
+    - at the latest, by the first request for the callback graph (_dash-dependencies) or a
+      callback: the browser fetches the graph once per page load, so it must already hold
+      the callbacks of every page the user may navigate to
+
+The worker then starts serving page shells, assets and metrics without waiting for
+crystal_toolkit. Callbacks registered with dash.callback after Dash's first-request setup
+are merged into the app here, since Dash copies them only once, along with the callbacks
+cancelling their background jobs.
+
+This relies on Dash internals with no public equivalent: _callback.GLOBAL_CALLBACK_MAP and
+GLOBAL_CALLBACK_LIST, Dash._setup_server, Dash._got_first_request, _callback.context_value
+and _pages._path_to_page, which even a patch release may change. requirements.txt pins
+dash exactly (2.18.2) for that reason; check them again before upgrading.
+
+Environment:
+    LAZY_PAGES: Set to 1 to defer the heavy pages (default off). With gunicorn's preload_app
+        the eager default loads them once in the master and the workers share the memory.
+    LAZY_PAGES_WARMUP: Set to 0 to load only on demand, without the warm-up thread (default on)
+"""
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from dash import Output, _callback, no_update
+from dash._pages import _path_to_page
+from flask import request
+
+from components.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+LAZY_ENV = "LAZY_PAGES"
+WARMUP_ENV = "LAZY_PAGES_WARMUP"
+
+# Dash routes that need the callbacks of every page: the callback graph and the callbacks
+CALLBACK_ROUTES = {"_dash-dependencies", "_dash-update-component"}
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def _cancel_jobs(*_):
+    # Body of the cancel callbacks Dash's _setup_server registers
+    executor = _callback.context_value.get().background_callback_manager
+    for job_id in request.args.getlist("cancelJob"):
+        executor.terminate_job(job_id)
+    return no_update
+
+
+class PageLoader:
+    """
+    Imports the bodies of the registered pages, at registration or on first use.
+
+    Args:
+        lazy: Defer the imports to the first request needing them or the warm-up thread
+        warmup: Allow start_warmup() to load in a background thread
+    """
+
+    def __init__(self, lazy: bool = False, warmup: bool = True):
+        self.lazy = lazy
+        self.warmup = warmup
+        self.app = None
+        self.loaded = False
+        # Page module registered with Dash -> module with its body
+        self.pages: Dict[str, str] = {}
+        self.stats: Dict[str, Any] = {"load_seconds": None, "loaded_by": None, "errors": 0}
+        self._lock = threading.Lock()
+        self._warmup_lock = threading.Lock()
+        self._warmup_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls) -> "PageLoader":
+        """Create a loader configured from the LAZY_PAGES* environment variables"""
+        return cls(lazy=_env_flag(LAZY_ENV, False), warmup=_env_flag(WARMUP_ENV, True))
+
+    def page_layout(self, page_module: str, body_module: str) -> Any:
+        """
+        Layout to register a page with: the body's layout, or a function importing the body
+        when the page is first rendered.
+
+        Args:
+            page_module: Module calling dash.register_page, i.e. its __name__
+            body_module: Module defining the page's layout and callbacks
+        """
+        if not self.lazy:
+            return importlib.import_module(body_module).layout
+        self.pages[page_module] = body_module
+
+        def layout(**kwargs):
+            self.ensure_loaded("page")
+            return importlib.import_module(body_module).layout
+
+        return layout
+
+    def init_app(self, app):
+        """Hook the loader into the app's requests. Call after the pages are imported."""
+        self.app = app
+        if self.lazy:
+            # Run before Dash's own hooks, so a first request for the callback graph finds
+            # the deferred callbacks already registered
+            app.server.before_request_funcs.setdefault(None, []).insert(0, self.before_request)
+
+    def before_request(self):
+        if not self.app._got_first_request["setup_server"]:
+            self._setup_server()
+        if self.loaded:
+            return
+        route = request.path.rstrip("/").rsplit("/", 1)[-1]
+        if route in CALLBACK_ROUTES:
+            self.ensure_loaded(route)
+        elif request.method == "GET" and self._is_deferred_page(request.path):
+            self.start_warmup(force=True)
+
+    def _is_deferred_page(self, path: str) -> bool:
+        page, _ = _path_to_page(self.app.strip_relative_path(path))
+        return page.get("module") in self.pages
+
+    def ensure_loaded(self, loaded_by: str = "ensure_loaded"):
+        """Import the deferred page bodies if they are not yet; blocks while another thread does"""
+        if self.loaded or not self.lazy:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            start = time.perf_counter()
+            try:
+                for body_module in self.pages.values():
+                    importlib.import_module(body_module)
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+            if self.app is not None and self.app._got_first_request["setup_server"]:
+                self._merge_callbacks()
+            self.loaded = True
+            self.stats.update(load_seconds=round(time.perf_counter() - start, 3), loaded_by=loaded_by)
+        logger.info("Loaded deferred pages in %.1f s (%s)", self.stats["load_seconds"], loaded_by)
+
+    def _setup_server(self):
+        # Dash's first-request setup copies the callbacks registered with dash.callback; it
+        # must not run while a page import adds to them
+        with self._lock:
+            self.app._setup_server()
+
+    def _merge_callbacks(self):
+        # What Dash's _setup_server does with dash.callback registrations on the first request
+        merged = []
+        for key in list(_callback.GLOBAL_CALLBACK_MAP):
+            merged.append(_callback.GLOBAL_CALLBACK_MAP.pop(key))
+            self.app.callback_map[key] = merged[-1]
+        self.app._callback_list.extend(_callback.GLOBAL_CALLBACK_LIST)
+        _callback.GLOBAL_CALLBACK_LIST.clear()
+        self._register_cancel_callbacks(merged)
+
+    def _register_cancel_callbacks(self, callbacks):
+        # _setup_server also adds, per cancel input of the background callbacks, a callback
+        # terminating their jobs; do the same for the ones merged late
+        cancels = {}
+        for callback in callbacks:
+            long = callback.get("long")
+            if long and "cancel_inputs" in long:
+                for cancel_input in long.pop("cancel_inputs"):
+                    cancels[cancel_input] = long.get("manager")
+        for cancel_input, manager in cancels.items():
+            if f"{cancel_input.component_id}.id" in self.app.callback_map:
+                continue
+            self.app.callback(
+                Output(cancel_input.component_id, "id"),
+                cancel_input,
+                prevent_initial_call=True,
+                manager=manager,
+            )(_cancel_jobs)
+
+    def start_warmup(self, force: bool = False):
+        """
+        Import the deferred pages in a background thread. Returns immediately.
+
+        Args:
+            force: Start even with LAZY_PAGES_WARMUP=0, for a request of a deferred page
+        """
+        if self.loaded or not self.lazy or not (self.warmup or force):
+            return
+        with self._warmup_lock:
+            if self._warmup_thread is not None and self._warmup_thread.is_alive():
+                return
+            if self.app is not None:
+                self._setup_server()
+            self._warmup_thread = threading.Thread(target=self._warm, name="lazy-pages-warmup", daemon=True)
+            self._warmup_thread.start()
+
+    def _warm(self):
+        try:
+            self.ensure_loaded("warmup")
+        except Exception:
+            logger.exception("Loading the deferred pages failed; retrying on the next request")
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self.stats, lazy=self.lazy, loaded=self.loaded or not self.lazy, pages=list(self.pages))
+
+
+# Shared loader used by the page modules and app.py
+page_loader = PageLoader.from_env()
+instrumentation.register_stats("lazy_pages", page_loader.metrics)
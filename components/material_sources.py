@@ -0,0 +1,237 @@
+"""
+Concurrent fetch of the data sources of the material detail page.
+
+Besides the summary document, the page's property tabs read documents from separate
+endpoints of the materials API (electronic structure, magnetism, ...). Fetched one after
+another, the page would wait for the sum of their latencies. SourceFetcher requests them
+concurrently with httpx's async client, each with its own timeout, so the wait approaches
+the slowest single source:
+    - the coroutines run on an event loop in a daemon thread of each worker process; Dash
+      callbacks are synchronous and block on the futures of the sources they need
+    - the page's first callback starts the sources, then fetches the summary itself with
+      api_client (its one path, with retries); the tab callbacks find their documents in
+      the summary cache, or join the fetch still in flight instead of issuing another
+    - a source that fails or times out is reported with its error and the page renders
+      what arrived (partial results); it is fetched again on the next request
+    - the sources share api_client's circuit breaker for their host, so once the upstream
+      is known to be down they fail at once instead of waiting for their timeouts
+
+Environment:
+    MATERIAL_SOURCE_TIMEOUTS: Per-source timeouts in seconds as source=seconds,
+        e.g. "electronic_structure=5,magnetism=2"
+    MATERIAL_SOURCES_POOL_SIZE: Connections kept open by the async client (default 20)
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from components.api_client import RETRY_STATUS_CODES, LatencyStats, api_client
+from components.instrumentation import instrumentation
+from components.summary_cache import summary_cache
+
+TIMEOUTS_ENV = "MATERIAL_SOURCE_TIMEOUTS"
+POOL_SIZE_ENV = "MATERIAL_SOURCES_POOL_SIZE"
+
+# Source -> (endpoint below the API root, default timeout in seconds)
+SOURCES: Dict[str, Tuple[str, float]] = {
+    "thermo": ("materials/thermo/{material_id}", 3.0),
+    "electronic_structure": ("materials/electronic_structure/{material_id}", 3.0),
+    "magnetism": ("materials/magnetism/{material_id}", 3.0),
+    "provenance": ("materials/provenance/{material_id}", 3.0),
+}
+# Sources of the material detail page's property tabs
+TAB_SOURCES = ("electronic_structure", "magnetism")
+
+
+def parse_timeouts(value: str) -> Dict[str, float]:
+    """Parse MATERIAL_SOURCE_TIMEOUTS, e.g. "electronic_structure=5,magnetism=2" """
+    timeouts = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        source, _, seconds = item.partition("=")
+        timeouts[source.strip()] = float(seconds)
+    return timeouts
+
+
+class SourceResults:
+    """Documents of the sources that arrived and errors of those that did not"""
+
+    def __init__(self):
+        self.documents: Dict[str, dict] = {}
+        self.errors: Dict[str, str] = {}
+
+
+class SourceFetcher:
+    """
+    Fetches the sources of a material concurrently on a per-process event loop.
+
+    The loop, its thread and the HTTP client are created on first use in each process,
+    so workers forked by gunicorn after the app was preloaded get their own.
+
+    Args:
+        timeouts: Seconds allowed per source, overriding the defaults in SOURCES
+        pool_size: Connections kept open by the async client
+    """
+
+    def __init__(self, timeouts: Optional[Dict[str, float]] = None, pool_size: int = 20):
+        self.timeouts = {source: timeout for source, (_, timeout) in SOURCES.items()}
+        self.timeouts.update(timeouts or {})
+        self.pool_size = pool_size
+        self.stats: Dict[str, LatencyStats] = {source: LatencyStats() for source in SOURCES}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_pid = None
+        self._client: Optional[httpx.AsyncClient] = None
+        # Cache key -> fetch in flight, joined by concurrent callers
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls) -> "SourceFetcher":
+        """Create a fetcher configured from the MATERIAL_SOURCE* environment variables"""
+        return cls(
+            timeouts=parse_timeouts(os.environ.get(TIMEOUTS_ENV, "")),
+            pool_size=int(os.environ.get(POOL_SIZE_ENV, 20)),
+        )
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        pid = os.getpid()
+        with self._lock:
+            if self._loop is None or self._loop_pid != pid:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="material-sources", daemon=True).start()
+                self._loop = loop
+                self._loop_pid = pid
+                self._client = None
+                self._in_flight = {}
+            return self._loop
+
+    def _http_client(self) -> httpx.AsyncClient:
+        # Only used from the loop's thread, so no lock
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            self._client = httpx.AsyncClient(limits=limits)
+        return self._client
+
+    @staticmethod
+    def source_url(base_url: str, source: str, material_id: str) -> str:
+        """
+        Endpoint of a source. The sources live next to the summary endpoint.
+
+        Args:
+            base_url: Summary endpoint, as returned by get_api_base_url()
+            source: Source name, see SOURCES
+            material_id: Material ID, e.g. "mp-149"
+        """
+        root = base_url.rstrip("/").rsplit("/", 1)[0]
+        return f"{root}/{SOURCES[source][0].format(material_id=material_id)}"
+
+    async def _fetch_source(self, url: str, timeout: float) -> Tuple[Optional[dict], Optional[str], float]:
+        # The same breaker as api_client: while it is open the source fails at once, and
+        # timeouts, connection errors and 5xx here count towards opening it
+        breaker = api_client.breaker(url)
+        if not breaker.allow_request():
+            return None, f"circuit open for {urlparse(url).netloc}", 0.0
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self._http_client().get(url, timeout=timeout), timeout)
+            if response.status_code in RETRY_STATUS_CODES:
+                breaker.record_failure()
+            else:
+                # Client errors (e.g. unknown material_id) say nothing about upstream health
+                breaker.record_success()
+            response.raise_for_status()
+            return response.json(), None, time.perf_counter() - start
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            breaker.record_failure()
+            return None, f"timed out after {timeout:g} s", time.perf_counter() - start
+        except httpx.TransportError as e:
+            breaker.record_failure()
+            return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+    def _submit(self, material_id: str, base_url: str, source: str) -> Future:
+        key = self.cache_key(source, material_id)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                url = self.source_url(base_url, source, material_id)
+                future = asyncio.run_coroutine_threadsafe(self._fetch_source(url, self.timeouts[source]), self.loop)
+                self._in_flight[key] = future
+                future.add_done_callback(functools.partial(self._fetched, source, key))
+        return future
+
+    def _fetched(self, source: str, key: str, future: Future):
+        # Runs once per fetch, on the loop's thread
+        document, error, seconds = future.result()
+        self.stats[source].record(seconds, error=error is not None)
+        if error is None:
+            summary_cache.set(key, document)
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    @staticmethod
+    def cache_key(source: str, material_id: str) -> str:
+        # Prefixed, apart from the summaries' plain material_id keys
+        return f"{source}/{material_id}"
+
+    def prefetch(self, material_id: str, base_url: str, sources: Iterable[str] = TAB_SOURCES):
+        """Start fetching the sources that are neither cached nor in flight. Returns immediately."""
+        for source in sources:
+            if summary_cache.get(self.cache_key(source, material_id)) is None:
+                self._submit(material_id, base_url, source)
+
+    def get_all(self, material_id: str, base_url: str, sources: Iterable[str] = TAB_SOURCES) -> SourceResults:
+        """
+        Documents of the sources of a material: cached ones, and the others fetched
+        concurrently, joining fetches already in flight. Fetched documents are cached;
+        failed sources are reported in errors and retried on the next call.
+
+        Args:
+            material_id: Material ID, e.g. "mp-149"
+            base_url: Summary endpoint, as returned by get_api_base_url()
+            sources: Source names, see SOURCES
+        """
+        results = SourceResults()
+        futures: Dict[str, Future] = {}
+        for source in sources:
+            document = summary_cache.get(self.cache_key(source, material_id))
+            instrumentation.cache_lookup("material_source", document is not None)
+            if document is None:
+                futures[source] = self._submit(material_id, base_url, source)
+            else:
+                results.documents[source] = document
+        for source, future in futures.items():
+            start = time.perf_counter()
+            try:
+                # Every fetch is bounded by its source's timeout; this only guards against a stuck loop
+                document, error, _ = future.result(timeout=self.timeouts[source] + 5)
+            except FutureTimeoutError:
+                document, error = None, "event loop did not respond"
+            instrumentation.record_span(f"source_{source}", time.perf_counter() - start)
+            if error is None:
+                results.documents[source] = document
+            else:
+                results.errors[source] = error
+        return results
+
+    def get(self, material_id: str, source: str, base_url: str) -> Optional[dict]:
+        """Document of one source, from the cache or fetched; None if it is not available"""
+        return self.get_all(material_id, base_url, [source]).documents.get(source)
+
+    def metrics(self) -> Dict[str, dict]:
+        return {source: stats.snapshot() for source, stats in self.stats.items()}
+
+
+# Shared fetcher used by the material page
+material_sources = SourceFetcher.from_env()
+instrumentation.register_stats("material_sources", material_sources.metrics, label="source")
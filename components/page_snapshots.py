@@ -0,0 +1,223 @@
+"""
+Pre-rendered section outputs of the material detail page.
+
+scripts/prerender_materials.py runs the page's section builders for a hot set of materials
+and writes their serialized callback outputs here, one JSON file per material. The page
+callbacks serve a snapshot when one exists, without fetching the summary document or
+parsing BibTeX.
+
+Snapshots live under a directory per SNAPSHOT_VERSION, so a deploy that changes the
+builders or the layout ignores the old ones. Each snapshot records a digest of the
+upstream document it was built from: the prerender job rebuilds it when the document
+changes and skips it otherwise. Snapshots older than the maximum age are not served, in
+case the job stops running.
+
+Environment:
+    MATERIAL_SNAPSHOTS: Set to 0 to always render live (default on)
+    MATERIAL_SNAPSHOT_DIR: Snapshot directory (default snapshots/ in the repo)
+    MATERIAL_SNAPSHOT_MAX_AGE: Seconds a snapshot is served after it was built (default 7 days)
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from plotly.utils import PlotlyJSONEncoder
+
+from components.instrumentation import instrumentation
+
+logger = logging.getLogger(__name__)
+
+ENABLED_ENV = "MATERIAL_SNAPSHOTS"
+DIR_ENV = "MATERIAL_SNAPSHOT_DIR"
+MAX_AGE_ENV = "MATERIAL_SNAPSHOT_MAX_AGE"
+
+# Bump when a section builder or the page layout changes the outputs
+SNAPSHOT_VERSION = 3
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "snapshots")
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+# Snapshots kept decoded in memory per worker
+LOADED_SNAPSHOTS = 64
+
+_MATERIAL_ID_RE = re.compile(r"^[A-Za-z0-9][\w.-]*$")
+
+
+class SnapshotStore:
+    """
+    Versioned on-disk store of pre-rendered page sections keyed by material_id.
+
+    Files are written with an atomic rename, so workers never read partial snapshots.
+    Decoded snapshots are kept in a small per-process LRU, revalidated against the
+    file's modification time.
+
+    Args:
+        directory: Root directory; snapshots go to its v<version> subdirectory
+        version: Snapshot format version
+        max_age: Seconds a snapshot is served after it was built, 0 for no limit
+        enabled: Serve snapshots; saving works either way
+    """
+
+    def __init__(self, directory: str = DEFAULT_SNAPSHOT_DIR, version: int = SNAPSHOT_VERSION,
+                 max_age: float = DEFAULT_MAX_AGE, enabled: bool = True):
+        self.root = directory
+        self.version = version
+        self.directory = os.path.join(directory, f"v{version}")
+        self.max_age = max_age
+        self.enabled = enabled
+        self.stats = {"hits": 0, "misses": 0, "expired": 0}
+        self._loaded: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SnapshotStore":
+        """Create a store configured from the MATERIAL_SNAPSHOT* environment variables"""
+        return cls(
+            directory=os.environ.get(DIR_ENV, DEFAULT_SNAPSHOT_DIR),
+            max_age=float(os.environ.get(MAX_AGE_ENV, DEFAULT_MAX_AGE)),
+            enabled=os.environ.get(ENABLED_ENV, "1").lower() not in ("0", "false", "no"),
+        )
+
+    def _path(self, material_id: str) -> Optional[str]:
+        # material_id comes from the URL; anything that is not a plain id has no snapshot
+        if not _MATERIAL_ID_RE.match(material_id):
+            return None
+        return os.path.join(self.directory, f"{material_id}.json")
+
+    def read(self, material_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored snapshot, expired or not, or None"""
+        path = self._path(material_id)
+        if path is None:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        with self._lock:
+            loaded = self._loaded.get(material_id)
+            if loaded is not None and loaded[0] == mtime:
+                self._loaded.move_to_end(material_id)
+                return loaded[1]
+        try:
+            with open(path, "r", encoding="utf-8") as fp:
+                snapshot = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._loaded[material_id] = (mtime, snapshot)
+            while len(self._loaded) > LOADED_SNAPSHOTS:
+                self._loaded.popitem(last=False)
+        return snapshot
+
+    def get_section(self, material_id: str, section: str) -> Optional[Any]:
+        """
+        Serialized outputs of one page section, or None when the page must be rendered live.
+
+        Args:
+            material_id: Material ID of the page
+            section: Section name, see SECTION_BUILDERS in material_summary.py
+        """
+        if not self.enabled:
+            return None
+        snapshot = self.read(material_id)
+        if snapshot is None or section not in snapshot["sections"]:
+            self.stats["misses"] += 1
+            instrumentation.cache_lookup("snapshot", False)
+            return None
+        if self.max_age and time.time() - snapshot["created"] > self.max_age:
+            self.stats["expired"] += 1
+            instrumentation.cache_lookup("snapshot", False)
+            return None
+        self.stats["hits"] += 1
+        instrumentation.cache_lookup("snapshot", True)
+        return snapshot["sections"][section]
+
+    def save(self, material_id: str, document_digest: str, sections: Dict[str, Any]):
+        """
+        Serialize and store the section outputs of a material.
+
+        Args:
+            material_id: Material ID of the page
+            document_digest: Digest of the upstream document the sections were built from
+            sections: Section name -> callback outputs (Dash components are serialized)
+        """
+        path = self._path(material_id)
+        if path is None:
+            raise ValueError(f"Invalid material_id {material_id!r}")
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot = {
+            "version": self.version,
+            "material_id": material_id,
+            "document_digest": document_digest,
+            "created": time.time(),
+            "sections": sections,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                json.dump(snapshot, fp, cls=PlotlyJSONEncoder, separators=(",", ":"))
+            # mkstemp creates the file readable by its owner only; the app may run as another user
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+
+    def delete(self, material_id: str):
+        path = self._path(material_id)
+        if path is not None:
+            self._remove(path)
+        with self._lock:
+            self._loaded.pop(material_id, None)
+
+    def material_ids(self) -> Iterable[str]:
+        """Material IDs with a snapshot of the current version"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [name[:-len(".json")] for name in names if name.endswith(".json")]
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """
+        Delete the snapshots of materials outside keep and the directories of other versions.
+
+        Returns:
+            int: Number of snapshots deleted from the current version
+        """
+        keep = set(keep)
+        removed = 0
+        for material_id in self.material_ids():
+            if material_id not in keep:
+                self.delete(material_id)
+                removed += 1
+        try:
+            versions = os.listdir(self.root)
+        except OSError:
+            versions = []
+        for name in versions:
+            path = os.path.join(self.root, name)
+            if re.match(r"^v\d+$", name) and path != self.directory and os.path.isdir(path):
+                for stale in os.listdir(path):
+                    self._remove(os.path.join(path, stale))
+                try:
+                    os.rmdir(path)
+                except OSError:
+                    logger.warning("Could not remove old snapshot directory %s", path)
+        return removed
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# Shared store used by the material page
+material_snapshots = SnapshotStore.from_env()
+instrumentation.register_stats("material_snapshots", lambda: material_snapshots.stats)
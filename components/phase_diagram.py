@@ -0,0 +1,277 @@
+"""
+Convex hull engine of the phase diagram app.
+
+For a chemical system such as Fe-Li-O, PhaseDiagramEngine reads the formation energies of
+every material in it and in its subsystems (Fe, Li, O, Fe-Li, ..., Fe-Li-O) from the summary
+API and builds the lower convex hull of the points (composition, formation energy per atom)
+with a single scipy.spatial.ConvexHull call. Everything else is derived for all entries at
+once with NumPy:
+    - the hull energy at each entry's composition: the lower hull is the maximum of the
+      planes of its lower facets, so it is one matrix product and a max over the facets
+    - the energy above hull, and the stable phases: the hull's vertices at 0 eV/atom
+    - the decomposition products: the vertices of the facet under the entry, weighted by
+      its barycentric coordinates, solved as one batch of small linear systems
+A quaternary system with thousands of entries takes tens of milliseconds. Results are kept
+per (chemsys, functional) in an LRU bounded store, so returning to a system costs nothing.
+
+The summary API carries the formation energies of one functional mixing scheme, GGA/GGA+U;
+FUNCTIONALS maps each functional to the summary field holding its formation energies.
+
+Environment:
+    PHASE_DIAGRAM_CACHE_MAX_ENTRIES: Phase diagrams kept per worker (default 64)
+    PHASE_DIAGRAM_CACHE_TTL: Seconds a phase diagram is reused (default 3600)
+"""
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import ConvexHull
+
+from components.api_client import api_client
+from components.instrumentation import instrumentation
+from components.summary_cache import MemoryBackend
+
+CACHE_MAX_ENTRIES_ENV = "PHASE_DIAGRAM_CACHE_MAX_ENTRIES"
+CACHE_TTL_ENV = "PHASE_DIAGRAM_CACHE_TTL"
+
+# Functional mixing scheme -> summary field with its formation energy per atom
+FUNCTIONALS = {"GGA_GGA+U": "formation_energy_per_atom"}
+DEFAULT_FUNCTIONAL = "GGA_GGA+U"
+
+# Elements a chemical system may have; the subsystems queried grow as 2^n
+MAX_ELEMENTS = 6
+# Entries requested from the summary API at a time
+PAGE_SIZE = 1000
+# eV/atom below which an entry counts as on the hull
+HULL_TOLERANCE = 1e-6
+
+
+def parse_chemsys(chemsys: str) -> Tuple[str, ...]:
+    """
+    Sorted elements of a chemical system such as "Li-Fe-O".
+
+    Raises:
+        ValueError: The system is empty, repeats an element or has too many
+    """
+    elements = [element.strip() for element in chemsys.split("-") if element.strip()]
+    if not elements:
+        raise ValueError("Enter a chemical system, e.g. Li-Fe-O")
+    if len(set(elements)) != len(elements):
+        raise ValueError(f"Chemical system {chemsys} repeats an element")
+    if len(elements) > MAX_ELEMENTS:
+        raise ValueError(f"Chemical systems have at most {MAX_ELEMENTS} elements")
+    return tuple(sorted(elements))
+
+
+def subsystems(elements: Tuple[str, ...]) -> List[str]:
+    """Every chemical system made of some of the elements, e.g. Fe, O and Fe-O for Fe-O"""
+    return [
+        "-".join(element for bit, element in enumerate(elements) if mask >> bit & 1)
+        for mask in range(1, 2 ** len(elements))
+    ]
+
+
+class PhaseDiagram:
+    """
+    Lower convex hull of a chemical system. The entries are held as columns, one row per
+    entry; entries with material_id None are the elemental references at 0 eV/atom added
+    for elements without a material.
+
+    Attributes:
+        elements: Sorted elements of the system
+        material_ids, formulas: Per entry
+        fractions: (entries, elements) atomic fractions
+        formation_energies, e_above_hull: (entries,) in eV/atom
+        stable: (entries,) whether the entry is a vertex of the hull
+        decompositions: Per entry, [(entry index, atomic fraction)] of the products,
+            the entry itself when stable
+        facets: (facets, elements) entry indices of the lower hull's facets
+    """
+
+    def __init__(self, chemsys: str, functional: str, elements: Tuple[str, ...], material_ids: List[Optional[str]],
+                 formulas: List[str], fractions: np.ndarray, formation_energies: np.ndarray,
+                 e_above_hull: np.ndarray, stable: np.ndarray,
+                 decompositions: List[List[Tuple[int, float]]], facets: np.ndarray):
+        self.chemsys = chemsys
+        self.functional = functional
+        self.elements = elements
+        self.material_ids = material_ids
+        self.formulas = formulas
+        self.fractions = fractions
+        self.formation_energies = formation_energies
+        self.e_above_hull = e_above_hull
+        self.stable = stable
+        self.decompositions = decompositions
+        self.facets = facets
+
+    def tie_lines(self) -> np.ndarray:
+        """(lines, 2) entry indices of the distinct edges of the hull's facets"""
+        if len(self.facets) == 0:
+            return np.empty((0, 2), dtype=int)
+        n = self.facets.shape[1]
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+        edges = np.concatenate([self.facets[:, pair] for pair in pairs])
+        return np.unique(np.sort(edges, axis=1), axis=0)
+
+
+def build_phase_diagram(chemsys: str, functional: str, documents: List[Dict[str, Any]]) -> PhaseDiagram:
+    """
+    Hull of the entries of a chemical system.
+
+    Args:
+        chemsys: Chemical system, e.g. "Fe-Li-O"
+        functional: Key of FUNCTIONALS whose formation energies to use
+        documents: Summary documents with material_id, formula_pretty, composition_reduced
+            and the functional's formation energy field
+    """
+    elements = parse_chemsys(chemsys)
+    energy_field = FUNCTIONALS[functional]
+    documents = [
+        document for document in documents
+        if document.get(energy_field) is not None and document.get("composition_reduced")
+        and set(document["composition_reduced"]) <= set(elements)
+    ]
+    material_ids: List[Optional[str]] = [document["material_id"] for document in documents]
+    formulas = [document.get("formula_pretty", "") for document in documents]
+    amounts = np.array([[document["composition_reduced"].get(element, 0) for element in elements]
+                        for document in documents], dtype=float).reshape(-1, len(elements))
+    energies = np.array([document[energy_field] for document in documents], dtype=float)
+
+    # Elemental references for the elements without a material
+    for index, element in enumerate(elements):
+        if not np.any(amounts[:, index] == amounts.sum(axis=1)):
+            reference = np.zeros((1, len(elements)))
+            reference[0, index] = 1
+            amounts = np.vstack([amounts, reference])
+            energies = np.append(energies, 0.0)
+            material_ids.append(None)
+            formulas.append(element)
+
+    fractions = amounts / amounts.sum(axis=1, keepdims=True)
+    count, n = fractions.shape
+    if n == 1:
+        ground = int(np.argmin(energies))
+        hull_energy = np.full(count, energies[ground])
+        facets = np.array([[ground]])
+        facet_of_entry = np.zeros(count, dtype=int)
+    else:
+        points = np.column_stack([fractions[:, :-1], energies])
+        # A point high above the centre of the composition simplex makes the hull
+        # full-dimensional even when the entries are not (e.g. only the elements); the
+        # facets through it are not part of the lower hull
+        top = np.append(np.full(n - 1, 1 / n), max(energies.max(), 0) + 1)
+        hull = ConvexHull(np.vstack([points, top]))
+        lower = (hull.equations[:, -2] < -1e-9) & ~np.any(hull.simplices == count, axis=1)
+        equations = hull.equations[lower]
+        facets = hull.simplices[lower]
+        # Energy of every facet's plane at every entry's composition: (entries, facets)
+        planes = -(fractions[:, :-1] @ equations[:, :-2].T + equations[:, -1]) / equations[:, -2]
+        facet_of_entry = planes.argmax(axis=1)
+        hull_energy = planes[np.arange(count), facet_of_entry]
+
+    e_above_hull = np.maximum(energies - hull_energy, 0)
+    stable = np.zeros(count, dtype=bool)
+    stable[np.unique(facets)] = True
+    stable &= e_above_hull < HULL_TOLERANCE
+
+    # Barycentric coordinates of each entry in the facet under it: solve
+    # fractions[vertices].T @ weights = fractions for all entries at once
+    vertices = facets[facet_of_entry]
+    if n == 1:
+        weights = np.ones((count, 1))
+    else:
+        weights = np.linalg.solve(fractions[vertices].transpose(0, 2, 1), fractions[:, :, None])[:, :, 0]
+    decompositions = [
+        [(index, 1.0)] if stable[index] else [
+            (int(vertex), float(weight)) for vertex, weight in zip(vertices[index], weights[index])
+            if weight > HULL_TOLERANCE
+        ]
+        for index in range(count)
+    ]
+    return PhaseDiagram("-".join(elements), functional, elements, material_ids, formulas, fractions,
+                        energies, e_above_hull, stable, decompositions, facets)
+
+
+class PhaseDiagramEngine:
+    """
+    Builds phase diagrams from the summary API and keeps them per (chemsys, functional).
+
+    Args:
+        max_entries: Phase diagrams kept, least recently used dropped first
+        ttl: Seconds a phase diagram is reused
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: float = 3600):
+        self.cache = MemoryBackend(max_entries)
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "entries": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "PhaseDiagramEngine":
+        """Create an engine configured from the PHASE_DIAGRAM_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.environ.get(CACHE_MAX_ENTRIES_ENV, 64)),
+            ttl=float(os.environ.get(CACHE_TTL_ENV, 3600)),
+        )
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    @staticmethod
+    def fetch_entries(elements: Tuple[str, ...], functional: str, base_url: str) -> List[Dict[str, Any]]:
+        """Summary documents of the materials of a system and its subsystems, PAGE_SIZE at a time"""
+        params = {
+            "chemsys": ",".join(subsystems(elements)),
+            "_fields": f"material_id,formula_pretty,composition_reduced,{FUNCTIONALS[functional]}",
+            "_limit": PAGE_SIZE,
+        }
+        documents = []
+        while True:
+            page = api_client.get_json(f"{base_url}/", params=dict(params, _skip=len(documents)),
+                                       endpoint="phase_diagram").get("data", [])
+            documents += page
+            if len(page) < PAGE_SIZE:
+                return documents
+
+    def get(self, chemsys: str, base_url: str, functional: str = DEFAULT_FUNCTIONAL) -> PhaseDiagram:
+        """
+        Phase diagram of a chemical system, cached or built.
+
+        Args:
+            chemsys: Chemical system in any element order, e.g. "Li-Fe-O"
+            base_url: Summary endpoint, as returned by get_api_base_url()
+            functional: Key of FUNCTIONALS
+
+        Raises:
+            ValueError: Invalid chemical system or unknown functional
+            requests.RequestException: The entries could not be fetched
+        """
+        if functional not in FUNCTIONALS:
+            raise ValueError(f"Unknown functional {functional}, use one of {', '.join(FUNCTIONALS)}")
+        elements = parse_chemsys(chemsys)
+        key = f"{'-'.join(elements)}/{functional}"
+        diagram = self.cache.get(key)
+        instrumentation.cache_lookup("phase_diagram", diagram is not None)
+        if diagram is not None:
+            self._count("hits")
+            return diagram
+        self._count("misses")
+        with instrumentation.span("phase_diagram_entries"):
+            documents = self.fetch_entries(elements, functional, base_url)
+        with instrumentation.span("convex_hull"):
+            diagram = build_phase_diagram(key.split("/")[0], functional, documents)
+        self._count("entries", len(documents))
+        self.cache.set(key, diagram, self.ttl)
+        return diagram
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+
+# Shared engine used by the phase diagram page
+phase_diagrams = PhaseDiagramEngine.from_env()
+instrumentation.register_stats("phase_diagram", phase_diagrams.metrics)
@@ -0,0 +1,156 @@
+"""
+Background prefetch of summary documents the user is likely to open next.
+
+After a material page is served, the materials its phase stability box links to (the
+decomposition products) are fetched into the summary cache; the explorer does the same
+for the rows of the result page on screen. The fetches run on a small thread pool behind a
+token-bucket rate limit, so prefetching never competes with page requests for more than a
+few upstream connections. Materials already cached or already queued are skipped, and
+requests beyond the queue bound are dropped rather than delayed.
+
+Environment:
+    PREFETCH: Set to 0 to disable (default on)
+    PREFETCH_WORKERS: Prefetch threads per worker process (default 2)
+    PREFETCH_RATE: Upstream fetches per second per worker process (default 5)
+    PREFETCH_MAX_PENDING: Queued materials before new ones are dropped (default 64)
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
+
+from components.api_client import api_client
+from components.instrumentation import instrumentation
+from components.summary_cache import summary_cache
+
+logger = logging.getLogger(__name__)
+
+ENABLED_ENV = "PREFETCH"
+WORKERS_ENV = "PREFETCH_WORKERS"
+RATE_ENV = "PREFETCH_RATE"
+MAX_PENDING_ENV = "PREFETCH_MAX_PENDING"
+
+
+class RateLimiter:
+    """
+    Token bucket shared by the prefetch threads.
+
+    Args:
+        rate: Tokens added per second
+        burst: Bucket size, the number of calls allowed back to back
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class Prefetcher:
+    """
+    Bounded, rate-limited pool warming the summary cache.
+
+    The thread pool is created on first use in each process, so workers forked by
+    gunicorn after the app was preloaded get their own threads.
+
+    Args:
+        max_workers: Prefetch threads
+        rate: Upstream fetches per second
+        max_pending: Materials queued or in flight before new ones are dropped
+        enabled: Set to False to make prefetch() a no-op
+    """
+
+    def __init__(self, max_workers: int = 2, rate: float = 5.0, max_pending: int = 64, enabled: bool = True):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.enabled = enabled
+        self.limiter = RateLimiter(rate, burst=max_workers)
+        self.stats = {"queued": 0, "cached": 0, "duplicate": 0, "dropped": 0, "fetched": 0, "errors": 0}
+        self._pending = set()
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Prefetcher":
+        """Create a prefetcher configured from the PREFETCH* environment variables"""
+        return cls(
+            max_workers=int(os.environ.get(WORKERS_ENV, 2)),
+            rate=float(os.environ.get(RATE_ENV, 5.0)),
+            max_pending=int(os.environ.get(MAX_PENDING_ENV, 64)),
+            enabled=os.environ.get(ENABLED_ENV, "1").lower() not in ("0", "false", "no"),
+        )
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prefetch")
+            self._executor_pid = pid
+            self._pending = set()
+        return self._executor
+
+    def prefetch(self, material_ids: Iterable[str], base_url: str):
+        """
+        Queue summary fetches for the materials that are not cached yet. Returns immediately.
+
+        Args:
+            material_ids: Materials to warm, in priority order
+            base_url: Summary endpoint; get_api_base_url() needs the request, which the
+                prefetch threads do not have
+        """
+        if not self.enabled:
+            return
+        for material_id in material_ids:
+            if summary_cache.get(material_id) is not None:
+                self.stats["cached"] += 1
+                continue
+            with self._lock:
+                executor = self.executor
+                if material_id in self._pending:
+                    self.stats["duplicate"] += 1
+                    continue
+                if len(self._pending) >= self.max_pending:
+                    self.stats["dropped"] += 1
+                    continue
+                self._pending.add(material_id)
+                self.stats["queued"] += 1
+            executor.submit(self._warm, material_id, base_url)
+
+    def _warm(self, material_id: str, base_url: str):
+        try:
+            self.limiter.acquire()
+            summary_cache.get_or_fetch(material_id, lambda: api_client.get_summary(material_id, base_url=base_url))
+            self.stats["fetched"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.debug("Prefetching %s failed: %s", material_id, e)
+        finally:
+            with self._lock:
+                self._pending.discard(material_id)
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending))
+
+
+# Shared prefetcher used by the pages
+prefetcher = Prefetcher.from_env()
+instrumentation.register_stats("prefetch", prefetcher.metrics)
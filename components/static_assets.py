@@ -0,0 +1,113 @@
+"""
+Serving of the production CSS bundle built by scripts/build_assets.py.
+
+With STATIC_BUNDLE=1 the page loads one purged, minified stylesheet instead of the separate
+files of assets/css:
+    - the bundle and its fonts are served from /bundles/ with content-hash file names, so
+      they are cached as immutable for a year
+    - precompressed .br/.gz variants are sent to clients that accept them
+    - the woff2 fonts the bundle uses are preloaded from the page head
+
+Environment:
+    STATIC_BUNDLE: Serve the bundle (default off, serving assets/css as before)
+    STATIC_BUNDLE_DIR: Build output directory (default dist/ in the repo)
+"""
+import json
+import logging
+import mimetypes
+import os
+from typing import List, Optional
+
+from flask import abort, request, send_from_directory
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+BUNDLE_URL_PATH = "/bundles"
+BUNDLE_DIR = os.environ.get(
+    "STATIC_BUNDLE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dist"),
+)
+BUNDLE_ENABLED = os.environ.get("STATIC_BUNDLE", "").lower() in ("1", "true", "yes")
+
+# Stylesheets crystal_toolkit adds from a CDN; assets/css already has both libraries
+CRYSTAL_TOOLKIT_CDN_STYLESHEETS = (
+    "https://cdnjs.cloudflare.com/ajax/libs/bulma/",
+    "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/",
+)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def load_manifest(bundle_dir: str = BUNDLE_DIR) -> Optional[dict]:
+    path = os.path.join(bundle_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+manifest = load_manifest() if BUNDLE_ENABLED else None
+if BUNDLE_ENABLED and manifest is None:
+    logger.warning(
+        "STATIC_BUNDLE is set but %s has no %s; run scripts/build_assets.py. Serving assets/css instead.",
+        BUNDLE_DIR, MANIFEST_NAME,
+    )
+
+# Keep Dash from adding the unbundled stylesheets when the bundle is served
+ASSETS_IGNORE = r".*\.css$" if manifest else ""
+
+
+def bundle_stylesheets(theme: str) -> List[str]:
+    """
+    External stylesheets of the app.
+
+    Args:
+        theme: Bootstrap theme URL, left out when the bundle includes Bootstrap
+    """
+    if manifest is None:
+        return [theme]
+    stylesheets = [] if manifest.get("includes_bootstrap") else [theme]
+    return stylesheets + [f"{BUNDLE_URL_PATH}/{manifest['css']}"]
+
+
+def _preload_links() -> str:
+    return "".join(
+        f'<link rel="preload" href="{BUNDLE_URL_PATH}/{font}" as="font" type="font/woff2" crossorigin>'
+        for font in manifest.get("preload_fonts", ())
+    )
+
+
+def init_app(app):
+    """
+    Drop the CDN stylesheets crystal_toolkit registers and, when the bundle is served,
+    add its route and font preloads. Call after the pages are imported.
+    """
+    app.config.external_stylesheets = [
+        stylesheet for stylesheet in app.config.external_stylesheets
+        # crystal_toolkit adds its URLs as pydantic HttpUrl objects
+        if isinstance(stylesheet, dict) or not str(stylesheet).startswith(CRYSTAL_TOOLKIT_CDN_STYLESHEETS)
+    ]
+    if manifest is None:
+        return
+
+    app.index_string = app.index_string.replace("{%css%}", _preload_links() + "{%css%}", 1)
+
+    @app.server.route(f"{BUNDLE_URL_PATH}/<path:filename>")
+    def serve_bundle_file(filename):
+        if filename == MANIFEST_NAME:
+            abort(404)
+        accepted = request.headers.get("Accept-Encoding", "")
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.exists(os.path.join(BUNDLE_DIR, filename + suffix)):
+                # The mimetype follows the original name, not the .br/.gz suffix
+                response = send_from_directory(BUNDLE_DIR, filename + suffix,
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                response.headers["Content-Encoding"] = encoding
+                break
+        else:
+            response = send_from_directory(BUNDLE_DIR, filename)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
@@ -0,0 +1,200 @@
+"""
+Cached graph and scene pipeline of the crystal_toolkit structure viewer.
+
+crystal_toolkit turns the structure sent to the viewer into a bonded StructureGraph
+(neighbor finding, the slow part for large cells), sends it to the browser, and gets it
+back to build the 3D scene and the legend, each from its own callback. It memoizes those
+callbacks with a per-process cache whose key includes the previously displayed graph, so a
+material viewed after any other one is rebuilt from scratch.
+
+CachedStructureMoleculeComponent hands crystal_toolkit a SceneCache instead:
+    - entries are keyed by a digest of the structure (or graph) and the display settings
+      (bonding strategy, unit cell, radii, colors), not by the previous graph
+    - a hit returns the stored JSON without decoding the graph or finding neighbors
+    - with the disk backend the entries are shared by all workers, and
+      scripts/prerender_materials.py can fill them ahead of time with warm()
+    - the scene and the legend callbacks share one scene build: whichever runs first
+      stores the other's result too
+    - structures above LARGE_STRUCTURE_SITES sites skip neighbor finding and render
+      without bonds, polyhedra or periodic image atoms
+
+Environment:
+    STRUCTURE_SCENE_CACHE_BACKEND: "memory" (default) or "disk"
+    STRUCTURE_SCENE_CACHE_DIR: Directory of the disk backend
+    STRUCTURE_SCENE_CACHE_MAX_ENTRIES: LRU bound (default 256)
+    STRUCTURE_SCENE_CACHE_TTL: Seconds an entry is kept (default 1 day)
+    LARGE_STRUCTURE_SITES: Sites above which bonds are not computed (default 500)
+"""
+import functools
+import inspect
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict
+
+import crystal_toolkit.components as ctc
+from crystal_toolkit.components.structure import DEFAULTS
+from crystal_toolkit.core.plugin import CrystalToolkitPlugin
+from plotly.utils import PlotlyJSONEncoder
+from pymatgen.analysis.graphs import StructureGraph
+from pymatgen.core import Structure
+
+from components.instrumentation import instrumentation
+from components.summary_cache import DiskBackend, MemoryBackend
+from components.utility_functions import content_digest
+
+BACKEND_ENV = "STRUCTURE_SCENE_CACHE_BACKEND"
+DIR_ENV = "STRUCTURE_SCENE_CACHE_DIR"
+MAX_ENTRIES_ENV = "STRUCTURE_SCENE_CACHE_MAX_ENTRIES"
+TTL_ENV = "STRUCTURE_SCENE_CACHE_TTL"
+LARGE_STRUCTURE_SITES_ENV = "LARGE_STRUCTURE_SITES"
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "dash-mp-app", "structure-scenes")
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 24 * 3600
+
+LARGE_STRUCTURE_SITES = int(os.environ.get(LARGE_STRUCTURE_SITES_ENV, 500))
+
+# Callback arguments that say nothing about the result: the graph currently displayed
+IGNORED_ARGUMENTS = {"current_graph"}
+# crystal_toolkit callbacks built from the same get_scene_and_legend call, and the part each returns
+SCENE_CALLBACKS = {"update_scene": 0, "update_legend_and_colors": 1}
+
+
+class SceneCache:
+    """
+    Stand-in for the flask_caching Cache crystal_toolkit memoizes its callbacks with.
+
+    Memoized callbacks are also kept by name, so warm() can run the same pipeline
+    outside a request.
+    """
+
+    def __init__(self, backend, ttl: float = DEFAULT_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.shared = isinstance(backend, DiskBackend)
+        self.stats = {"hits": 0, "misses": 0}
+        self.functions: Dict[str, Callable] = {}
+        # Argument digest of the memoized callback running in this thread
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls) -> "SceneCache":
+        """Create a cache configured from the STRUCTURE_SCENE_CACHE_* environment variables"""
+        max_entries = int(os.environ.get(MAX_ENTRIES_ENV, DEFAULT_MAX_ENTRIES))
+        if os.environ.get(BACKEND_ENV, "memory").lower() == "disk":
+            backend = DiskBackend(os.environ.get(DIR_ENV, DEFAULT_CACHE_DIR), max_entries)
+        else:
+            backend = MemoryBackend(max_entries)
+        return cls(backend, ttl=float(os.environ.get(TTL_ENV, DEFAULT_TTL)))
+
+    def memoize(self, *args, **kwargs):
+        """Decorator caching a callback's JSON result by its name and JSON arguments"""
+        def decorator(function):
+            parameters = list(inspect.signature(function).parameters)
+
+            @functools.wraps(function)
+            def wrapper(*call_args):
+                key_arguments = [
+                    value for name, value in zip(parameters, call_args) if name not in IGNORED_ARGUMENTS
+                ]
+                key = f"{function.__name__}:{content_digest(key_arguments)}"
+                value = self.backend.get(key)
+                if value is not None:
+                    self.stats["hits"] += 1
+                    instrumentation.cache_lookup("structure_scene", True)
+                    return value
+                self.stats["misses"] += 1
+                instrumentation.cache_lookup("structure_scene", False)
+                self._local.digest = key.split(":", 1)[1]
+                try:
+                    value = self.set(function.__name__, self._local.digest, function(*call_args))
+                finally:
+                    self._local.digest = None
+                return value
+
+            self.functions[function.__name__] = wrapper
+            return wrapper
+        return decorator
+
+    def set(self, name: str, digest: str, value: Any) -> Any:
+        # Store what Dash would send, so hits from either backend look the same
+        value = json.loads(json.dumps(value, cls=PlotlyJSONEncoder))
+        self.backend.set(f"{name}:{digest}", value, self.ttl)
+        return value
+
+    def store_scene_and_legend(self, scene_and_legend: tuple):
+        """Store both parts of a scene build made by a memoized scene or legend callback"""
+        digest = getattr(self._local, "digest", None)
+        if digest is None:
+            return
+        for name, index in SCENE_CALLBACKS.items():
+            self.set(name, digest, scene_and_legend[index])
+
+    def clear(self):
+        self.backend.clear()
+
+
+scene_cache = SceneCache.from_env()
+instrumentation.register_stats("structure_scene_cache", lambda: scene_cache.stats)
+
+
+class CachedStructureMoleculeComponent(ctc.StructureMoleculeComponent):
+    """StructureMoleculeComponent whose graph, scene and legend callbacks use scene_cache"""
+
+    def generate_callbacks(self, app, cache) -> None:
+        super().generate_callbacks(app, scene_cache)
+
+    @staticmethod
+    def _preprocess_input_to_graph(input, bonding_strategy=DEFAULTS["bonding_strategy"], bonding_strategy_kwargs=None):
+        # Fast path: neighbor finding and polyhedra dominate the render time of large cells
+        if isinstance(input, Structure) and len(input) > LARGE_STRUCTURE_SITES:
+            return StructureGraph.from_empty_graph(input)
+        return ctc.StructureMoleculeComponent._preprocess_input_to_graph(
+            input, bonding_strategy=bonding_strategy, bonding_strategy_kwargs=bonding_strategy_kwargs
+        )
+
+    def get_scene_and_legend(self, graph, **kwargs):
+        if graph is not None and len(self._get_struct_or_mol(graph)) > LARGE_STRUCTURE_SITES:
+            # Periodic images of every boundary site are the other large-cell cost
+            kwargs.update(draw_image_atoms=False, bonded_sites_outside_unit_cell=False)
+        scene_and_legend = super().get_scene_and_legend(graph, **kwargs)
+        scene_cache.store_scene_and_legend(scene_and_legend)
+        return scene_and_legend
+
+    def warm(self, structure: Dict[str, Any]):
+        """
+        Build and cache the graph, scene and legend of a structure with the viewer's
+        initial settings, as its callbacks will request them. Needs the app's callbacks
+        to be generated, i.e. the app to be imported.
+
+        Args:
+            structure: Structure dict as sent to the viewer's data
+        """
+        functions = scene_cache.functions
+        graph = functions["update_graph"](self.initial_data["graph_generation_options"], structure, None)
+        display_options = self.initial_data["display_options"]
+        scene_additions = self.initial_data["scene_additions"]
+        functions["update_scene"](graph, display_options, scene_additions)
+        functions["update_legend_and_colors"](graph, display_options, scene_additions)
+
+
+def register_crystal_toolkit(app, layout):
+    """
+    Add crystal_toolkit's stores to a page layout and generate the callbacks of the
+    components created so far.
+
+    Stands in for ctc.register_crystal_toolkit, which also makes the page the app layout
+    and adds CDN stylesheets, so it cannot run once the app is set up, as a page loaded
+    with LAZY_PAGES is (see lazy_pages.py). Callbacks not cached by scene_cache use
+    crystal_toolkit's default in-memory cache.
+
+    Args:
+        app: Dash app the callbacks are registered with
+        layout: Page layout the stores are added to
+    """
+    plugin = CrystalToolkitPlugin(layout=layout, use_default_css=False)
+    plugin.app = app
+    plugin.cache.init_app(app.server)
+    plugin.crystal_toolkit_layout(layout)
@@ -0,0 +1,350 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from components.instrumentation import instrumentation
+
+# Environment variables used to configure the shared summary cache
+CACHE_BACKEND_ENV = "SUMMARY_CACHE_BACKEND"          # "memory" (default) or "disk"
+CACHE_TTL_ENV = "SUMMARY_CACHE_TTL"                  # seconds a document stays fresh
+CACHE_MAX_ENTRIES_ENV = "SUMMARY_CACHE_MAX_ENTRIES"  # LRU bound per backend
+CACHE_DIR_ENV = "SUMMARY_CACHE_DIR"                  # directory for the disk backend
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "dash-mp-app", "summary-cache")
+
+
+class MemoryBackend:
+    """In-process LRU store with a per-entry expiry time."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def lock(self, key: str):
+        """Cross-process lock for a key; a no-op for the in-process backend"""
+        return _NullLock()
+
+
+class DiskBackend:
+    """
+    On-disk store shared by every worker process on the host.
+
+    Each document is written to its own JSON file with an atomic rename, so readers
+    never see partial writes. The file modification time doubles as the LRU recency
+    marker: hits touch the file and pruning removes the least recently used files.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 lock_timeout: float = 30.0):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.lock_timeout = lock_timeout
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str, suffix: str = ".json") -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + suffix)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None if it is missing or expired"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as fp:
+                entry = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires", 0) < time.time():
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def set(self, key: str, value: Any, ttl: float):
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                json.dump({"key": key, "expires": time.time() + ttl, "value": value}, fp)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            return
+        self._prune()
+
+    def delete(self, key: str):
+        self._remove(self._path(key))
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                self._remove(os.path.join(self.directory, name))
+
+    def lock(self, key: str):
+        """Cross-process lock so that only one worker fetches a given key"""
+        return _FileLock(self._path(key, ".lock"), self.lock_timeout)
+
+    def _prune(self):
+        """Remove the least recently used documents above max_entries"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        except OSError:
+            return
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:excess]:
+            self._remove(entry.path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class _NullLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _FileLock:
+    """
+    Portable lock file created with O_EXCL.
+
+    Locks older than the timeout are treated as stale (e.g. left behind by a killed
+    worker) and broken. If the lock cannot be acquired within the timeout the caller
+    proceeds without it rather than failing the request.
+    """
+
+    def __init__(self, path: str, timeout: float, poll_interval: float = 0.05):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.acquired = False
+
+    def __enter__(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                self.acquired = True
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.timeout:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+            except OSError:
+                return self
+            if time.time() >= deadline:
+                return self
+            time.sleep(self.poll_interval)
+
+    def __exit__(self, *exc_info):
+        if self.acquired:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.acquired = False
+        return False
+
+
+class SummaryCache:
+    """
+    Cache of material summary documents keyed by material_id.
+
+    Concurrent misses for the same material_id share a single upstream fetch: threads
+    in the same process wait on a per-key lock, and workers sharing the disk backend
+    wait on a lock file. Cached documents are shared between requests and must be
+    treated as read-only by callers.
+    """
+
+    def __init__(self, backend, ttl: float = DEFAULT_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "fetches": 0}
+        self._key_locks: Dict[str, list] = {}
+        self._key_locks_guard = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SummaryCache":
+        """Create a cache configured from the SUMMARY_CACHE_* environment variables"""
+        max_entries = int(os.environ.get(CACHE_MAX_ENTRIES_ENV, DEFAULT_MAX_ENTRIES))
+        if os.environ.get(CACHE_BACKEND_ENV, "memory").lower() == "disk":
+            backend = DiskBackend(os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR), max_entries)
+        else:
+            backend = MemoryBackend(max_entries)
+        return cls(backend, ttl=float(os.environ.get(CACHE_TTL_ENV, DEFAULT_TTL)))
+
+    def get(self, material_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached document without fetching it"""
+        return self.backend.get(material_id)
+
+    def set(self, material_id: str, document: Dict[str, Any]):
+        self.backend.set(material_id, document, self.ttl)
+
+    def invalidate(self, material_id: str):
+        self.backend.delete(material_id)
+
+    def get_or_fetch(self, material_id: str, fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the cached document for material_id, calling fetch() on a miss.
+
+        Args:
+            material_id: Material ID used as the cache key
+            fetch: Zero-argument callable returning the upstream document
+
+        Returns:
+            dict: The material summary document
+        """
+        document = self.backend.get(material_id)
+        if document is not None:
+            self.stats["hits"] += 1
+            instrumentation.cache_lookup("summary", True)
+            return document
+
+        self.stats["misses"] += 1
+        instrumentation.cache_lookup("summary", False)
+        key_lock = self._acquire_key_lock(material_id)
+        try:
+            with key_lock[0]:
+                # Another thread may have filled the cache while we were waiting
+                document = self.backend.get(material_id)
+                if document is not None:
+                    return document
+                with self.backend.lock(material_id):
+                    document = self.backend.get(material_id)
+                    if document is not None:
+                        return document
+                    self.stats["fetches"] += 1
+                    document = fetch()
+                    self.backend.set(material_id, document, self.ttl)
+                    return document
+        finally:
+            self._release_key_lock(material_id)
+
+    def get_many(self, material_ids: Iterable[str],
+                 fetch_many: Callable[[List[str]], Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Return the documents of several materials, fetching all the missing ones with a
+        single fetch_many() call.
+
+        Duplicate IDs are looked up once. Misses hold their per-key locks, taken in sorted
+        order, during the fetch, so get_or_fetch() calls for the same materials in this
+        process wait for it instead of fetching them again. The disk backend's lock files
+        are not taken: across workers the batch may overlap another fetch.
+
+        Args:
+            material_ids: Material IDs used as the cache keys
+            fetch_many: Callable taking the missing material_ids and returning
+                {material_id: document} for those the upstream knows
+
+        Returns:
+            dict: {material_id: document} in the order of material_ids; unknown materials
+            are left out
+        """
+        material_ids = list(dict.fromkeys(material_ids))
+        documents = {}
+        missing = []
+        for material_id in material_ids:
+            document = self.backend.get(material_id)
+            instrumentation.cache_lookup("summary", document is not None)
+            if document is None:
+                missing.append(material_id)
+            else:
+                documents[material_id] = document
+        self.stats["hits"] += len(documents)
+        self.stats["misses"] += len(missing)
+
+        key_locks = [self._acquire_key_lock(material_id) for material_id in sorted(missing)]
+        acquired = []
+        try:
+            for key_lock in key_locks:
+                key_lock[0].acquire()
+                acquired.append(key_lock[0])
+            # Some may have been filled while we were waiting
+            to_fetch = []
+            for material_id in missing:
+                document = self.backend.get(material_id)
+                if document is None:
+                    to_fetch.append(material_id)
+                else:
+                    documents[material_id] = document
+            if to_fetch:
+                self.stats["fetches"] += len(to_fetch)
+                for material_id, document in fetch_many(to_fetch).items():
+                    self.backend.set(material_id, document, self.ttl)
+                    documents[material_id] = document
+        finally:
+            for lock in acquired:
+                lock.release()
+            for material_id in missing:
+                self._release_key_lock(material_id)
+        return {material_id: documents[material_id] for material_id in material_ids if material_id in documents}
+
+    def _acquire_key_lock(self, key: str) -> list:
+        # [lock, number of threads using it] so that idle locks can be discarded
+        with self._key_locks_guard:
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+            return key_lock
+
+    def _release_key_lock(self, key: str):
+        with self._key_locks_guard:
+            key_lock = self._key_locks[key]
+            key_lock[1] -= 1
+            if key_lock[1] == 0:
+                del self._key_locks[key]
+
+
+# Shared cache used by the material pages
+summary_cache = SummaryCache.from_env()
+instrumentation.register_stats("summary_cache", lambda: summary_cache.stats)
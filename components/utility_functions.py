@@ -1,4 +1,10 @@
+import hashlib
+import json
+import os
 from fractions import Fraction
+from functools import lru_cache
+from html import escape
+from typing import Any, Optional
 
 from dash import html
 import re
@@ -14,10 +20,52 @@ def get_api_base_url():
         return "http://127.0.0.1:8000/summary"
     
     # For production - use the same host as the app
-
-    print(f"http://{host}:8000/summary")
     return f"http://{host}:8000/summary"
 
+def get_formula_autocomplete_url():
+    """
+    Get the formula autocomplete endpoint of the local summary service, next to the summary
+    API. Set FORMULA_AUTOCOMPLETE_URL to use another endpoint.
+    """
+    url = os.environ.get("FORMULA_AUTOCOMPLETE_URL")
+    if url:
+        return url
+    host = request.host.split(':')[0]
+    if host in ['127.0.0.1', 'localhost']:
+        return "http://127.0.0.1:8000/materials/formula_autocomplete/"
+    return f"http://{host}:8000/materials/formula_autocomplete/"
+
+def content_digest(raw_data: Any) -> str:
+    """
+    Short digest of JSON-serializable data, identical in every process (unlike hash(),
+    which PYTHONHASHSEED randomizes per process).
+    """
+    encoded = json.dumps(raw_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=8).hexdigest()
+
+def stable_component_id(prefix: str, slot: Optional[str] = None, content_key: Any = None) -> Optional[str]:
+    """
+    Deterministic component id built from the section slot it fills and, optionally, a digest
+    of the raw data it shows, e.g. "data-box-chem_env-3f2a...".
+
+    Args:
+        prefix: Component kind, e.g. "data-box"
+        slot: Name of the page section the component fills
+        content_key: Raw data (a material_id, the unformatted rows) whose digest is added so
+            the id changes with the content; never the built Dash components
+
+    Returns:
+        str: The id, or None when neither slot nor content_key is given
+    """
+    if slot is None and content_key is None:
+        return None
+    parts = [prefix]
+    if slot is not None:
+        parts.append(slot)
+    if content_key is not None:
+        parts.append(content_digest(content_key))
+    return '-'.join(parts)
+
 def format_formula_charge(formula_string: str) -> str:
     """
     Convert formula charge strings into proper superscript format.
@@ -62,6 +110,83 @@ def format_formula_charge(formula_string: str) -> str:
     
     return formula + superscript_charge
 
+# Single-pass formula scanner. Numeric runs are classified by context in formula_tokens:
+# after an element or ")" they are subscripts, at the start of a part or after a hydrate
+# dot they are coefficients, anywhere else they are dropped.
+_FORMULA_TOKEN_RE = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<dot>[·•])
+  | (?P<open>\()
+  | (?P<close>\))
+  | (?P<element>[A-Z][a-z]?)
+  | _(?:\{(?P<braced_var>[^}]*)\}|(?P<var>[a-z0-9.]+))
+  | (?P<number>[0-9.{}\-]+)
+""", re.VERBOSE)
+
+_UNICODE_SUBSCRIPTS = str.maketrans(
+    "0123456789+-=()aehklmnopstx",
+    "₀₁₂₃₄₅₆₇₈₉₊₋₌₍₎ₐₑₕₖₗₘₙₒₚₛₜₓ",
+)
+
+@lru_cache(maxsize=4096)
+def formula_tokens(formula_str: str) -> tuple:
+    """
+    Tokenize a chemical formula into a tuple of (kind, text) pairs.
+
+    kind is "text" for element symbols, coefficients and parentheses, "sub" for
+    subscripts and "dot" for the hydrate separator. The result is cached per
+    formula string and shared by all the renderers below.
+    See format_chemical_formula for the supported formats.
+    """
+    tokens = []
+    previous = None           # kind of the last matched group
+    expect_coefficient = True  # at the start of a part or right after a hydrate dot
+    depth = 0
+
+    def append(kind, text):
+        if kind == "text" and tokens and tokens[-1][0] == "text":
+            tokens[-1] = ("text", tokens[-1][1] + text)
+        else:
+            tokens.append((kind, text))
+
+    for match in _FORMULA_TOKEN_RE.finditer(formula_str):
+        group = match.lastgroup
+        if group == "space":
+            expect_coefficient = True
+            previous = None
+            continue
+        if group == "dot":
+            append("dot", "·")
+            expect_coefficient = True
+            previous = group
+            continue
+        if group == "number":
+            number = match.group()
+            if previous in ("element", "close", "var", "braced_var"):
+                append("sub", number.strip("{}"))
+            elif expect_coefficient and number[0].isdigit():
+                append("text", number)
+        elif group in ("var", "braced_var"):
+            append("sub", match.group(group))
+        elif group == "open":
+            depth += 1
+            append("text", "(")
+        elif group == "close":
+            if depth == 0:
+                previous = None
+                continue
+            depth -= 1
+            append("text", ")")
+        elif group == "element":
+            append("text", match.group())
+        expect_coefficient = False
+        previous = group
+
+    # Close any parenthesis left open
+    for _ in range(depth):
+        append("text", ")")
+    return tuple(tokens)
+
 def format_chemical_formula(formula_str: str) -> html.Span:
     """
     Convert chemical formula string to formatted HTML with subscripts.
@@ -82,105 +207,40 @@ def format_chemical_formula(formula_str: str) -> html.Span:
     Returns:
         html.Span: Formatted chemical formula with proper subscripts
     """
-    
-    def format_number(num_str: str) -> html.Sub:
-        """Format a number/expression as subscript"""
-        # Handle curly braces
-        num_str = num_str.strip('{}')
-        return html.Sub(num_str)
+    children = []
+    for kind, text in formula_tokens(formula_str):
+        if kind == "sub":
+            children.append(html.Sub(text))
+        elif kind == "dot":
+            children.append(html.Span(text, style={'margin': '0 2px'}))
+        else:
+            children.append(text)
+    return html.Span(children)
 
-    def parse_formula(formula: str, is_start: bool = True) -> list:
-        """Parse chemical formula recursively"""
-        result = []
-        i = 0
-        # Handle leading coefficient at the start of the formula
-        if is_start and formula[0].isdigit():
-            coefficient = ''
-            while i < len(formula) and (formula[i].isdigit() or formula[i] in '._{}-'):
-                coefficient += formula[i]
-                i += 1
-            if coefficient:
-                result.append(coefficient)
-        
-        while i < len(formula):
-            # Handle dot operator for hydrates
-            if formula[i] in ['·', '•']:
-                result.append(html.Span('·', style={'margin': '0 2px'}))
-                i += 1
-                # Handle leading coefficient at the start of the formula
-                if formula[0].isdigit():
-                    coefficient = ''
-                    while i < len(formula) and (formula[i].isdigit() or formula[i] in '._{}-'):
-                        coefficient += formula[i]
-                        i += 1
-                    if coefficient:
-                        result.append(coefficient)
-                continue
-                
-            if formula[i] == '(':
-                # Find matching parenthesis
-                paren_count = 1
-                j = i + 1
-                while j < len(formula) and paren_count > 0:
-                    if formula[j] == '(':
-                        paren_count += 1
-                    elif formula[j] == ')':
-                        paren_count -= 1
-                    j += 1
-                
-                # Parse inside parentheses
-                inner_formula = formula[i+1:j-1]
-                inner_result = parse_formula(inner_formula, False)
-                
-                # Look for subscript after parentheses
-                k = j
-                subscript = ''
-                while k < len(formula) and (formula[k].isdigit() or formula[k] in '._{}-'):
-                    subscript += formula[k]
-                    k += 1
-                
-                result.extend(['(', *inner_result, ')'])
-                if subscript:
-                    result.append(format_number(subscript))
-                
-                i = k
-                continue
-            
-            # Match element symbol (capital letter followed by optional lowercase letter)
-            if formula[i].isupper():
-                element = formula[i]
-                i += 1
-                if i < len(formula) and formula[i].islower():
-                    element += formula[i]
-                    i += 1
-                
-                # Look for subscript
-                subscript = ''
-                while i < len(formula) and (formula[i].isdigit() or formula[i] in '._{}-'):
-                    subscript += formula[i]
-                    i += 1
-                
-                result.append(element)
-                if subscript:
-                    result.append(format_number(subscript))
-                continue
-            
-            i += 1
-        
-        return result
+@lru_cache(maxsize=4096)
+def format_chemical_formula_html(formula_str: str) -> str:
+    """
+    Render a chemical formula as an HTML string, e.g. "Ca(OH)2" -> "Ca(OH)<sub>2</sub>".
+    Uses the same tokens as format_chemical_formula, for non-Dash consumers.
+    """
+    parts = []
+    for kind, text in formula_tokens(formula_str):
+        if kind == "sub":
+            parts.append(f"<sub>{escape(text)}</sub>")
+        else:
+            parts.append(escape(text))
+    return "".join(parts)
 
-    # Pre-process the formula
-    formula_str = formula_str.replace('_', '')  # Remove underscores
-    
-    # Handle spaced formulas
-    if ' ' in formula_str:
-        parts = formula_str.split()
-        result = []
-        for i, part in enumerate(parts):
-            result.extend(parse_formula(part))
-        return html.Span(result)
-    
-    return html.Span(parse_formula(formula_str))
+@lru_cache(maxsize=4096)
+def format_chemical_formula_unicode(formula_str: str) -> str:
+    """
+    Render a chemical formula as plain text with Unicode subscripts, e.g. "H2O" -> "H₂O".
+    Characters without a Unicode subscript form (such as ".") are kept as they are.
+    """
+    return "".join(
+        text.translate(_UNICODE_SUBSCRIPTS) if kind == "sub" else text
+        for kind, text in formula_tokens(formula_str)
+    )
 
 def format_decimal_to_fraction(decimal_value: float) -> html.Span:
     """
@@ -221,23 +281,26 @@ def format_decimal_to_fraction(decimal_value: float) -> html.Span:
         html.Sub(str(frac.denominator))
     ])
 
+# Example formulas covering the supported formats, used by the demo below and scripts/bench_formula.py
+EXAMPLE_FORMULAS = [
+    "2KAl(SO4)2·12H2O",    # Potassium alum with coefficient
+    "3CuSO4·5H2O",         # Copper sulfate pentahydrate with coefficient
+    "0.5CaSO4·2H2O",       # Gypsum with decimal coefficient
+    "2.5Na2CO3·10H2O",     # Sodium carbonate decahydrate with decimal coefficient
+    "MgSO4·7H2O",          # Epsom salt without coefficient
+    # Previous test cases
+    "A2 B3 O4",
+    "2A2B3O4",
+    "1.5A1.4B3.5",
+    "2Na_x Cl_y",
+    "3Na_{1-1.4}ClO4",
+    "4Ca(OH)2",
+    "2.5Zn(HCO3)2",
+]
+
 # Test function
 if __name__ == "__main__":
-    test_formulas = [
-        "2KAl(SO4)2·12H2O",    # Potassium alum with coefficient
-        "3CuSO4·5H2O",         # Copper sulfate pentahydrate with coefficient
-        "0.5CaSO4·2H2O",       # Gypsum with decimal coefficient
-        "2.5Na2CO3·10H2O",     # Sodium carbonate decahydrate with decimal coefficient
-        "MgSO4·7H2O",          # Epsom salt without coefficient
-        # Previous test cases
-        "A2 B3 O4",
-        "2A2B3O4",
-        "1.5A1.4B3.5",
-        "2Na_x Cl_y",
-        "3Na_{1-1.4}ClO4",
-        "4Ca(OH)2",
-        "2.5Zn(HCO3)2",
-    ]
+    test_formulas = EXAMPLE_FORMULAS
     
     from dash import Dash
     import dash_bootstrap_components as dbc
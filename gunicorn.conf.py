@@ -0,0 +1,56 @@
+"""
+gunicorn settings for the Dash app, read from the environment:
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+    APP_BIND: Address to listen on (default 0.0.0.0:8050)
+    WEB_CONCURRENCY: Worker processes (default: number of CPUs)
+    APP_THREADS: Threads per worker (default 4). Callbacks mostly wait on the summary API,
+        so threads keep a worker busy while requests are in flight.
+    APP_PRELOAD: Import the app, pages and crystal_toolkit once in the master before forking
+        (default true). Set to false to load the app separately in each worker.
+    LAZY_PAGES: Leave crystal_toolkit and the material page out of the app import; each worker
+        loads them in a warm-up thread once it is up (see components/lazy_pages.py)
+    APP_TIMEOUT: Seconds before a silent worker is restarted (default 60)
+    APP_MAX_REQUESTS: Restart a worker after this many requests to bound memory growth
+        (default 0, never)
+    SUMMARY_CACHE_BACKEND: Defaults to "disk" with more than one worker, so the material
+        page's section callbacks find the document whichever worker fetched it
+        (see components/summary_cache.py)
+"""
+import multiprocessing
+import os
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+bind = os.environ.get("APP_BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("APP_THREADS", 4))
+worker_class = "gthread"
+preload_app = _env_flag("APP_PRELOAD", True)
+timeout = int(os.environ.get("APP_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.environ.get("APP_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+# The material page's section callbacks read the summary the structure callback fetched,
+# and each may be served by a different worker: share the cache between them. Set before
+# the app, and with it the cache, is imported.
+if workers > 1:
+    os.environ.setdefault("SUMMARY_CACHE_BACKEND", "disk")
+accesslog = os.environ.get("APP_ACCESS_LOG") or None
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    # Start loading the pages deferred with LAZY_PAGES while the worker already serves
+    from components.lazy_pages import page_loader
+
+    page_loader.start_warmup()
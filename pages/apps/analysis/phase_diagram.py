@@ -0,0 +1,14 @@
+import dash
+
+from components.lazy_pages import page_loader
+
+# Phase diagram app, e.g. /apps/analysis/phase?chemsys=Li-Fe-O. Its layout and callbacks
+# are in phase_diagram_app.py, which brings in NumPy, SciPy and Plotly; page_loader imports
+# it now or, with LAZY_PAGES, on first use.
+dash.register_page(
+    __name__,
+    path='/apps/analysis/phase',
+    title='Phase Diagram - Materials Project',
+    name='Phase Diagram',
+    layout=page_loader.page_layout(__name__, 'pages.apps.analysis.phase_diagram_app'),
+)
@@ -0,0 +1,202 @@
+"""
+Body of the phase diagram app registered in phase_diagram.py: the convex hull of a chemical
+system, its stable phases and the energy above hull and decomposition of every material.
+Imported with the app, or with LAZY_PAGES when first needed (see components/lazy_pages.py).
+
+The hull is built by components/phase_diagram.py and cached per chemical system. Binary
+systems are plotted as formation energy against composition, ternary and quaternary ones as
+the composition triangle or tetrahedron with the hull's tie lines; the unstable materials
+are WebGL markers coloured by their energy above hull, so thousands of them stay responsive.
+"""
+from urllib.parse import parse_qs, urlencode
+
+import dash_bootstrap_components as dbc
+import numpy as np
+import plotly.graph_objects as go
+import requests
+from dash import dcc, html, Input, Output, State, callback
+from dash.exceptions import PreventUpdate
+
+from components.app_header import create_app_header
+from components.data_box import DataBox
+from components.instrumentation import instrumentation
+from components.phase_diagram import phase_diagrams
+from components.utility_functions import get_api_base_url, format_chemical_formula_unicode
+
+# Rows of the materials table; the plot shows every material
+TABLE_MAX_ROWS = 500
+# Energy above hull (eV/atom) at the top of the unstable markers' colour scale
+COLOR_MAX_E_ABOVE_HULL = 0.5
+
+# Corners of the composition triangle and tetrahedron
+SIMPLEX_VERTICES = {
+    3: np.array([[0, 0], [1, 0], [0.5, np.sqrt(3) / 2]]),
+    4: np.array([[0, 0, 0], [1, 0, 0], [0.5, np.sqrt(3) / 2, 0], [0.5, np.sqrt(3) / 6, np.sqrt(6) / 3]]),
+}
+
+breadcrumb_items = [
+    {"label": "Home", "href": "/", "external_link": True},
+    {"label": "Apps", "href": "/apps", "external_link": True},
+    {"label": "Phase Diagram", "active": True},
+]
+
+layout = html.Div([
+    create_app_header(breadcrumb_items, "Phase Diagram", "icon-fontastic-phase-diagram"),
+    html.Div([
+        html.Div([
+            dbc.Input(id='phase_chemsys', placeholder="e.g. Li-Fe-O", debounce=True,
+                      style={'maxWidth': '20rem'}),
+            dbc.Button("Generate", id='phase_submit', color="primary", className="ml-2"),
+        ], className="d-flex mb-3"),
+        html.P(id='phase_diagram_message', className="text-muted mb-3"),
+        dcc.Loading(html.Div(id='phase_diagram_plot'), type="circle"),
+        html.Div(id='phase_stable_table', className="mb-4"),
+        html.Div(id='phase_entries_table'),
+    ], className="app-content", style={'backgroundColor': '#f5f5f5', 'paddingTop': '1rem'}),
+])
+
+def get_chemsys(search):
+    return parse_qs((search or '').lstrip('?')).get('chemsys', [''])[0].strip()
+
+def energy_text(values):
+    return [f"{value:.3f} eV/atom" for value in values]
+
+def decomposition_text(diagram, index):
+    products = diagram.decompositions[index]
+    if products == [(index, 1.0)]:
+        return "Stable"
+    return " + ".join(f"{amount:.2f} {format_chemical_formula_unicode(diagram.formulas[product])}"
+                      for product, amount in products)
+
+def tie_line_coordinates(coordinates, lines):
+    # All tie lines as one trace: the segments' end points with NaN gaps between them
+    segments = np.full((len(lines), 3, coordinates.shape[1]), np.nan)
+    segments[:, 0] = coordinates[lines[:, 0]]
+    segments[:, 1] = coordinates[lines[:, 1]]
+    return segments.reshape(-1, coordinates.shape[1]).T
+
+@instrumentation.timed()
+def build_hull_figure(diagram):
+    """Plot of the hull for 2 to 4 elements, None otherwise"""
+    n = len(diagram.elements)
+    if n not in (2, 3, 4):
+        return None
+    stable = np.flatnonzero(diagram.stable)
+    unstable = np.flatnonzero(~diagram.stable)
+    labels = [format_chemical_formula_unicode(formula) for formula in diagram.formulas]
+    hover = np.array([
+        f"{label} ({material_id or 'reference'})<br>{energy:.3f} eV/atom above hull"
+        for label, material_id, energy in zip(labels, diagram.material_ids, diagram.e_above_hull)
+    ])
+    if n == 2:
+        coordinates = np.column_stack([diagram.fractions[:, 1], diagram.formation_energies])
+        stable = stable[np.argsort(coordinates[stable, 0])]
+        lines = np.column_stack([stable[:-1], stable[1:]])
+    else:
+        coordinates = diagram.fractions @ SIMPLEX_VERTICES[n]
+        lines = diagram.tie_lines()
+    marker = dict(size=6, color=diagram.e_above_hull[unstable], colorscale="Reds", cmin=0,
+                  cmax=COLOR_MAX_E_ABOVE_HULL, colorbar=dict(title="eV/atom above hull"))
+    stable_marker = dict(size=9, color="#004d00")
+
+    if n == 4:
+        x, y, z = tie_line_coordinates(coordinates, lines)
+        traces = [
+            go.Scatter3d(x=x, y=y, z=z, mode="lines", line=dict(color="#004d00"), hoverinfo="skip", name="Tie lines"),
+            go.Scatter3d(x=coordinates[unstable, 0], y=coordinates[unstable, 1], z=coordinates[unstable, 2],
+                         mode="markers", marker=dict(marker, size=3), hovertext=hover[unstable],
+                         hoverinfo="text", name="Unstable"),
+            go.Scatter3d(x=coordinates[stable, 0], y=coordinates[stable, 1], z=coordinates[stable, 2],
+                         mode="markers+text", marker=dict(stable_marker, size=5), text=[labels[i] for i in stable],
+                         hovertext=hover[stable], hoverinfo="text", name="Stable"),
+        ]
+        hidden = dict(visible=False)
+        figure_layout = dict(scene=dict(xaxis=hidden, yaxis=hidden, zaxis=hidden, aspectmode="data"))
+    else:
+        x, y = tie_line_coordinates(coordinates, lines)
+        traces = [
+            go.Scattergl(x=x, y=y, mode="lines", line=dict(color="#004d00"), hoverinfo="skip", name="Tie lines"),
+            go.Scattergl(x=coordinates[unstable, 0], y=coordinates[unstable, 1], mode="markers", marker=marker,
+                         hovertext=hover[unstable], hoverinfo="text", name="Unstable"),
+            go.Scatter(x=coordinates[stable, 0], y=coordinates[stable, 1], mode="markers+text",
+                       marker=stable_marker, text=[labels[i] for i in stable], textposition="top center",
+                       hovertext=hover[stable], hoverinfo="text", name="Stable"),
+        ]
+        if n == 2:
+            figure_layout = dict(xaxis=dict(title=f"Atomic fraction of {diagram.elements[1]}"),
+                                 yaxis=dict(title="Formation energy (eV/atom)"))
+        else:
+            hidden = dict(visible=False)
+            figure_layout = dict(xaxis=hidden, yaxis=dict(hidden, scaleanchor="x"))
+    return go.Figure(traces, layout=dict(figure_layout, height=600, showlegend=False,
+                                         margin=dict(l=20, r=20, t=20, b=20), plot_bgcolor="white"))
+
+@instrumentation.timed()
+def build_phase_tables(diagram):
+    """Stable phases and materials by energy above hull, as compact tables built from columns"""
+    stable = [index for index in np.flatnonzero(diagram.stable) if diagram.material_ids[index] is not None]
+    stable_table = DataBox.from_columns({
+        "Material ID": [diagram.material_ids[index] for index in stable],
+        "Formula": [format_chemical_formula_unicode(diagram.formulas[index]) for index in stable],
+        "Formation Energy": energy_text(diagram.formation_energies[stable]),
+    }, title="Stable Phases", slot="phase_stable", content_key=diagram.chemsys)
+
+    order = [index for index in np.argsort(diagram.e_above_hull, kind="stable")
+             if diagram.material_ids[index] is not None][:TABLE_MAX_ROWS]
+    entries_table = DataBox.from_columns({
+        "Material ID": [diagram.material_ids[index] for index in order],
+        "Formula": [format_chemical_formula_unicode(diagram.formulas[index]) for index in order],
+        "Formation Energy": energy_text(diagram.formation_energies[order]),
+        "Energy Above Hull": energy_text(diagram.e_above_hull[order]),
+        "Decomposes to": [decomposition_text(diagram, index) for index in order],
+    }, title="Materials", slot="phase_entries", content_key=diagram.chemsys)
+    return stable_table.children, entries_table.children
+
+@callback(
+    Output('url', 'search'),
+    Input('phase_submit', 'n_clicks'),
+    Input('phase_chemsys', 'n_submit'),
+    State('phase_chemsys', 'value'),
+)
+def submit_chemsys(n_clicks, n_submit, chemsys):
+    if not chemsys or not chemsys.strip():
+        raise PreventUpdate
+    return '?' + urlencode({'chemsys': chemsys.strip()})
+
+@callback(
+    Output('phase_diagram_plot', 'children'),
+    Output('phase_diagram_message', 'children'),
+    Output('phase_stable_table', 'children'),
+    Output('phase_entries_table', 'children'),
+    Output('phase_chemsys', 'value'),
+    Input('url', 'pathname'),
+    Input('url', 'search'),
+    # The page is usually opened with its query string already set
+    prevent_initial_call=False,
+)
+def update_phase_diagram(pathname, search):
+    chemsys = get_chemsys(search)
+    if not chemsys:
+        return None, "Enter a chemical system, e.g. Li-Fe-O.", None, None, ""
+    try:
+        diagram = phase_diagrams.get(chemsys, get_api_base_url())
+    except ValueError as e:
+        return None, str(e), None, None, chemsys
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 400:
+            return None, e.response.json().get("detail", "Invalid chemical system"), None, None, chemsys
+        return None, "The materials could not be loaded, please try again later.", None, None, chemsys
+    except requests.RequestException:
+        return None, "The materials could not be loaded, please try again later.", None, None, chemsys
+
+    materials = sum(material_id is not None for material_id in diagram.material_ids)
+    stable = sum(diagram.stable[index] for index, material_id in enumerate(diagram.material_ids) if material_id)
+    message = f"{diagram.chemsys}: {materials} materials, {stable} on the hull."
+    if materials > TABLE_MAX_ROWS:
+        message += f" The table lists the {TABLE_MAX_ROWS} closest to the hull."
+    figure = build_hull_figure(diagram)
+    if figure is None:
+        message += " Plots are drawn for systems of 2 to 4 elements."
+    stable_table, entries_table = build_phase_tables(diagram)
+    plot = dcc.Graph(figure=figure, config={"displaylogo": False}) if figure is not None else None
+    return plot, message, stable_table, entries_table, diagram.chemsys
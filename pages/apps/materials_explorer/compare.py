@@ -0,0 +1,15 @@
+import dash
+
+from components.lazy_pages import page_loader
+
+# Side-by-side view of the materials selected in the explorer, e.g.
+# /compare?material_ids=mp-149,mp-1. Its layout and callbacks are in material_compare.py,
+# which reuses the material page's builders and so needs crystal_toolkit; page_loader
+# imports it now or, with LAZY_PAGES, on first use.
+dash.register_page(
+    __name__,
+    path='/compare',
+    title='Compare Materials - Materials Project',
+    name='Compare Materials',
+    layout=page_loader.page_layout(__name__, 'pages.apps.materials_explorer.material_compare'),
+)
@@ -1,13 +1,14 @@
 import dash
 import dash_mp_components
-from dash import html, callback, Output, Input
+from dash import html, dcc, callback, clientside_callback, Output, Input, ALL
 import dash_bootstrap_components as dbc
 
-import json
 from dash.exceptions import PreventUpdate
 from dash.dependencies import Input, Output, State
 from components.app_header import create_app_header
-from components.utility_functions import get_api_base_url
+from components.prefetch import prefetcher
+from components.utility_functions import get_api_base_url, get_formula_autocomplete_url
+from pages.apps.materials_explorer.explorer_config import SORT_FIELDS, get_columns, get_filter_groups
 
 dash.register_page(
     __name__,
@@ -16,14 +17,33 @@ dash.register_page(
     name='Materials Explorer'
 )
 
+def export_controls():
+  # Download the results of the current search, or the selected rows, see explorer_export.py
+  return html.Div([
+      html.Span("Export results:", className="mr-2"),
+      dbc.ButtonGroup([
+          dbc.Button(label, id={"type": "explorer-export", "format": export_format},
+                     color="secondary", outline=True, size="sm")
+          for export_format, label in (("csv", "CSV"), ("jsonl", "JSON lines"), ("parquet", "Parquet"))
+      ]),
+      dbc.Checkbox(id="explorer-export-selected", label="Selected rows only", value=False,
+                   className="ml-3 d-inline-block"),
+      dcc.Store(id="explorer-export-url"),
+  ], className="mb-3 d-flex align-items-center")
+
+def compare_link():
+  # Opens the selected rows side by side on the compare page, see material_compare.py
+  return html.Div([
+      dbc.Button("Compare selected", id="explorer-compare", href="/compare", disabled=True,
+                 color="secondary", outline=True, size="sm"),
+  ], className="mb-3")
+
 def layout():
   api_base_url = get_api_base_url()
 
-  with open('pages/apps/materials_explorer/columns.json','r') as fp:
-    columns = json.load(fp)
-
-  with open('pages/apps/materials_explorer/filterGroups.json','r') as fp:
-    filterGroups = json.load(fp)
+  # Loaded and validated once at import, see explorer_config.py
+  columns = get_columns()
+  filterGroups = get_filter_groups()
 
   breadcrumb_items = [
       {"label": "Home", "href": "/", "external_link": True},
@@ -45,7 +65,11 @@ def layout():
       html.Div([
           app_description,
           html.Div(id="selected-rows"),
+          export_controls(),
+          compare_link(),
           html.Div(id="clicked-filter-groups"),
+          # material_ids of the result page on screen, prefetched into the summary cache
+          dcc.Store(id="explorer-result-ids"),
           dash_mp_components.SearchUIContainer(
 
             [
@@ -94,16 +118,17 @@ def layout():
               ),
               dash_mp_components.SearchUIGrid()
             ],
+            id="search-ui-demo",
             view="table",
             columns=columns,
             filterGroups=filterGroups,
             apiEndpoint=api_base_url,
-            autocompleteFormulaUrl="https://api.materialsproject.org/materials/formula_autocomplete/",
+            autocompleteFormulaUrl=get_formula_autocomplete_url(),
             apiKey="os.environ['MP_API_KEY']",
             resultLabel="material",
             hasSortMenu=True,
             selectableRows=True,
-            sortFields=['-energy_above_hull', 'formula_pretty'],
+            sortFields=SORT_FIELDS,
             conditionalRowStyles=[
               {
                 'selector': 'is_stable',
@@ -132,5 +157,64 @@ def showNumberOfSelectedRows(selectedRows):
     Input('materials-input', 'submitButtonClicks')
 )
 def click_filter_group(n_clicks):
-    print(n_clicks)
     return n_clicks
+
+# Only the IDs of the result rows travel to the server, not the rows themselves
+clientside_callback(
+    """
+    function(results) {
+        if (!results || results.length === 0) {
+            return window.dash_clientside.no_update;
+        }
+        return results.map(function(row) { return row.material_id; }).filter(Boolean);
+    }
+    """,
+    Output('explorer-result-ids', 'data'),
+    Input('search-ui-demo', 'results')
+)
+
+@callback(
+    Input('explorer-result-ids', 'data')
+)
+def prefetch_result_page(material_ids):
+    # Opening a row of the grid then reads the summary from the cache
+    prefetcher.prefetch(material_ids or [], get_api_base_url())
+
+# The explorer keeps its search in the page's query string; the export takes the same
+# parameters, read at click time since the grid updates the URL without a Dash callback
+clientside_callback(
+    """
+    function(n_clicks, selectedOnly, selectedRows) {
+        const triggered = window.dash_clientside.callback_context.triggered;
+        if (!triggered.length || !triggered[0].value) {
+            return window.dash_clientside.no_update;
+        }
+        const format = JSON.parse(triggered[0].prop_id.split('.')[0]).format;
+        let params = new URLSearchParams(window.location.search);
+        if (selectedOnly && selectedRows && selectedRows.length) {
+            params = new URLSearchParams({
+                material_ids: selectedRows.map(function(row) { return row.material_id; }).join(',')
+            });
+        }
+        const url = '/export/materials.' + format + '?' + params.toString();
+        window.location.assign(url);
+        return url;
+    }
+    """,
+    Output('explorer-export-url', 'data'),
+    Input({"type": "explorer-export", "format": ALL}, 'n_clicks'),
+    State('explorer-export-selected', 'value'),
+    State('search-ui-demo', 'selectedRows')
+)
+
+clientside_callback(
+    """
+    function(selectedRows) {
+        const ids = (selectedRows || []).map(function(row) { return row.material_id; }).filter(Boolean);
+        return ['/compare?' + new URLSearchParams({material_ids: ids.join(',')}).toString(), ids.length < 2];
+    }
+    """,
+    Output('explorer-compare', 'href'),
+    Output('explorer-compare', 'disabled'),
+    Input('search-ui-demo', 'selectedRows')
+)
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict
+
+import jsonschema
+
+logger = logging.getLogger(__name__)
+
+CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
+COLUMNS_PATH = os.path.join(CONFIG_DIR, 'columns.json')
+FILTER_GROUPS_PATH = os.path.join(CONFIG_DIR, 'filterGroups.json')
+
+# Default sort of the explorer grid, also applied to exports without a sort
+SORT_FIELDS = ['-energy_above_hull', 'formula_pretty']
+
+# Hot reload of the config files is only enabled in dev mode (same flag as Dash's debug mode)
+DEV_MODE = os.environ.get('DASH_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+COLUMNS_SCHEMA = {
+    "type": "array",
+    "minItems": 1,
+    "items": {
+        "type": "object",
+        "required": ["title", "selector"],
+        "properties": {
+            "title": {"type": "string"},
+            "selector": {"type": "string", "minLength": 1},
+            "formatType": {"enum": [
+                "BOOLEAN", "BOOLEAN_CLASS", "FIXED_DECIMAL", "FORMULA",
+                "LINK", "SIGNIFICANT_FIGURES", "SPACEGROUP_SYMBOL",
+            ]},
+            "formatOptions": {"type": "object"},
+            "units": {"type": "string"},
+            "omit": {"type": "boolean"},
+            "right": {"type": "boolean"},
+            "hideName": {"type": "boolean"},
+            "conversionFactor": {"type": "number"},
+        },
+    },
+}
+
+FILTER_GROUPS_SCHEMA = {
+    "type": "array",
+    "minItems": 1,
+    "items": {
+        "type": "object",
+        "required": ["name", "filters"],
+        "properties": {
+            "name": {"type": "string"},
+            "expanded": {"type": "boolean"},
+            "filters": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "required": ["name", "params", "type"],
+                    "properties": {
+                        "name": {"type": "string"},
+                        "params": {"type": "array", "minItems": 1, "items": {"type": "string"}},
+                        "overrides": {"type": "array", "items": {"type": "string"}},
+                        "type": {"enum": [
+                            "CHECKBOX_LIST", "MATERIALS_INPUT", "SELECT", "SELECT_CRYSTAL_SYSTEM",
+                            "SELECT_SPACEGROUP_NUMBER", "SELECT_SPACEGROUP_SYMBOL", "SLIDER",
+                            "THREE_STATE_BOOLEAN_SELECT",
+                        ]},
+                        "props": {"type": "object"},
+                        "isSearchBarField": {"type": "boolean"},
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+class FrozenDict(dict):
+    """Read-only dict; still a dict so Dash serializes it like any other prop value"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("explorer config is read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts to FrozenDict and lists to tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class ConfigRegistry:
+    """
+    Registry of JSON config files that are loaded, validated and frozen once.
+
+    Lookups are served from memory. With hot_reload enabled, a lookup checks the
+    file's modification time and reloads it when it changed.
+    """
+
+    def __init__(self, hot_reload: bool = DEV_MODE):
+        self.hot_reload = hot_reload
+        self._configs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path: str, schema: dict):
+        """Load, validate and freeze a config file; raises if it does not match the schema"""
+        with self._lock:
+            self._configs[name] = self._load(path, schema)
+
+    @staticmethod
+    def _load(path: str, schema: dict) -> dict:
+        mtime = os.path.getmtime(path)
+        with open(path, 'r', encoding='utf-8') as fp:
+            data = json.load(fp)
+        try:
+            jsonschema.validate(data, schema)
+        except jsonschema.ValidationError as e:
+            raise ValueError(f"Invalid config file {path}: {e.message} at {list(e.absolute_path)}") from e
+        return {"path": path, "schema": schema, "mtime": mtime, "data": freeze(data)}
+
+    def get(self, name: str) -> Any:
+        config = self._configs[name]
+        if self.hot_reload:
+            try:
+                mtime = os.path.getmtime(config["path"])
+            except OSError:
+                mtime = config["mtime"]
+            if mtime != config["mtime"]:
+                with self._lock:
+                    # Keep serving the previous version if the edited file is invalid
+                    try:
+                        config = self._load(config["path"], config["schema"])
+                    except (OSError, ValueError) as e:
+                        logger.warning("Not reloading %s: %s", config["path"], e)
+                        config = dict(config, mtime=mtime)
+                    self._configs[name] = config
+        return config["data"]
+
+
+explorer_config = ConfigRegistry()
+explorer_config.register('columns', COLUMNS_PATH, COLUMNS_SCHEMA)
+explorer_config.register('filterGroups', FILTER_GROUPS_PATH, FILTER_GROUPS_SCHEMA)
+
+
+def get_columns():
+    """Frozen contents of columns.json"""
+    return explorer_config.get('columns')
+
+
+def get_filter_groups():
+    """Frozen contents of filterGroups.json"""
+    return explorer_config.get('filterGroups')
@@ -0,0 +1,106 @@
+"""
+Body of the compare page registered in compare.py: the materials selected in the explorer
+side by side, one row each. Imported with the app, or with LAZY_PAGES when first needed
+(see components/lazy_pages.py).
+
+The summaries of all compared materials come from one call to summary_cache.get_many:
+cached documents are reused and the missing ones are fetched together, in one search
+request per api_client.SUMMARY_BATCH_SIZE materials, rather than one request each. The
+values are formatted by the material page's own helpers and sent as a compact DataBox
+built from columns, so the table is rendered in the browser.
+"""
+from urllib.parse import parse_qs
+
+import requests
+from dash import dcc, html, Input, Output, callback
+
+from components.api_client import api_client
+from components.app_header import create_app_header
+from components.data_box import DataBox
+from components.instrumentation import instrumentation
+from components.summary_cache import summary_cache
+from components.utility_functions import get_api_base_url, format_chemical_formula_unicode
+from pages.apps.materials_explorer.material_summary import lattice_constants, summary_values
+
+# Materials compared at most; further ones are left out
+MAX_COMPARED = 50
+
+# Columns taken from the summary box and the lattice box, in the order shown
+SUMMARY_COLUMNS = ['Space Group', 'Band Gap', 'Predicted Formation Energy', 'Energy Above Hull',
+                   'Magnetic Ordering', 'Total Magnetization']
+LATTICE_COLUMNS = ['a', 'b', 'c', 'α', 'β', 'ɣ', 'Volume']
+
+breadcrumb_items = [
+    {"label": "Home", "href": "/", "external_link": True},
+    {"label": "Apps", "href": "/apps", "external_link": True},
+    {"label": "Materials Explorer", "href": "/materials", "external_link": True},
+    {"label": "Compare", "active": True},
+]
+
+layout = html.Div([
+    create_app_header(breadcrumb_items, "Compare Materials", "fas fa-table-columns"),
+    html.Div([
+        html.P(id='compare_message', className="text-muted mb-3"),
+        html.Div(id='compare_table'),
+    ], className="app-content", style={'backgroundColor': '#f5f5f5', 'paddingTop': '1rem'}),
+])
+
+def get_compared_material_ids(search):
+    """Distinct material_ids of the page's query string, ?material_ids=mp-149,mp-1"""
+    params = parse_qs((search or '').lstrip('?'))
+    material_ids = [mid.strip() for value in params.get('material_ids', []) for mid in value.split(',')]
+    return list(dict.fromkeys(mid for mid in material_ids if mid))
+
+@instrumentation.timed()
+def fetch_material_summaries(material_ids):
+    """Summaries of the materials, cached or fetched in one batch; unknown ones are left out"""
+    API_base_url = get_api_base_url()
+    return summary_cache.get_many(material_ids, lambda missing: api_client.get_summaries(missing, API_base_url))
+
+@instrumentation.timed()
+def build_comparison_columns(documents):
+    """{header: [value per material]} of the compare table"""
+    summaries = [summary_values(document) for document in documents]
+    lattices = [lattice_constants(document["structure"]["lattice"]) for document in documents]
+    columns = {
+        "Material ID": [document["material_id"] for document in documents],
+        "Formula": [format_chemical_formula_unicode(document["formula_pretty"]) for document in documents],
+        "Crystal System": [document["symmetry"].get("crystal_system") for document in documents],
+    }
+    for header in SUMMARY_COLUMNS:
+        columns[header] = [summary[header] for summary in summaries]
+    for header in LATTICE_COLUMNS:
+        columns[header] = [lattice[header] for lattice in lattices]
+    return columns
+
+@callback(
+    Output('compare_table', 'children'),
+    Output('compare_message', 'children'),
+    Input('url', 'pathname'),
+    Input('url', 'search'),
+    # The page is usually opened with its query string already set
+    prevent_initial_call=False,
+)
+def update_comparison(pathname, search):
+    material_ids = get_compared_material_ids(search)
+    if not material_ids:
+        return None, [
+            "Select materials in the ",
+            dcc.Link("Materials Explorer", href="/materials", className="text-primary"),
+            " to compare them.",
+        ]
+    notes = []
+    if len(material_ids) > MAX_COMPARED:
+        notes.append(f"Showing the first {MAX_COMPARED} of {len(material_ids)} materials.")
+        material_ids = material_ids[:MAX_COMPARED]
+    try:
+        documents = fetch_material_summaries(material_ids)
+    except requests.RequestException:
+        return None, "The materials could not be loaded, please try again later."
+    unknown = [material_id for material_id in material_ids if material_id not in documents]
+    if unknown:
+        notes.append(f"Not found: {', '.join(unknown)}.")
+    if not documents:
+        return None, " ".join(notes)
+    columns = build_comparison_columns(list(documents.values()))
+    return DataBox.from_columns(columns, slot="compare", content_key=list(documents)).children, " ".join(notes)
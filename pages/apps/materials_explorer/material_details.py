@@ -0,0 +1,15 @@
+import dash
+
+from components.lazy_pages import page_loader
+
+# Register the page with a dynamic parameter. Its layout and callbacks are in
+# material_summary.py, which needs crystal_toolkit; page_loader imports it now or, with
+# LAZY_PAGES, on first use.
+dash.register_page(
+    __name__,
+    path='/materials/:material_id',  # :material_id is a path parameter
+    path_template='/materials/<material_id>',  # Alternative syntax
+    title='Material Details - Materials Project',
+    name='Material Details',
+    layout=page_loader.page_layout(__name__, 'pages.apps.materials_explorer.material_summary'),
+)
@@ -1,16 +1,27 @@
+"""
+Body of the material detail page registered in material_details.py: layout, section
+builders and callbacks. Imported with the app, or with LAZY_PAGES when first needed (see
+components/lazy_pages.py).
+"""
 from typing import List
 import dash_mp_components
 import dash
 
 from dash import dcc, html, Input, Output, callback
+from components.api_client import api_client
 from components.app_header import create_page_header
+from components.background_jobs import background_jobs
 from components.bibtex_list import BibList
 from components.data_box import DataBox
+from components.instrumentation import instrumentation
+from components.material_sources import material_sources, TAB_SOURCES
+from components.page_snapshots import material_snapshots
+from components.prefetch import prefetcher
+from components.structure_scene import CachedStructureMoleculeComponent, register_crystal_toolkit
+from components.summary_cache import summary_cache
 from components.utility_functions import get_api_base_url, format_formula_charge, format_chemical_formula, format_decimal_to_fraction
 import dash_bootstrap_components as dbc
-import requests
-import crystal_toolkit.components as ctc
-from urllib.parse import urlparse, parse_qs 
+from urllib.parse import urlencode, urlparse, parse_qs 
 
 from dash_mp_components import (
     Tabs,
@@ -28,25 +39,29 @@ from crystal_toolkit.helpers.layouts import (
     Reveal,
 )
 
-# Register the page with a dynamic parameter
-dash.register_page(
-    __name__,
-    path='/materials/:material_id',  # :material_id is a path parameter
-    path_template='/materials/<material_id>',  # Alternative syntax
-    title='Material Details - Materials Project',
-    name='Material Details'
-)
+# The upstream fetch and the builders below are timed as spans of the calling callback,
+# see instrumentation.py
+@instrumentation.timed()
+def fetch_material_summary(API_base_url, material_id):
+    # Start the property tab sources, then fetch the summary while they load; their callbacks
+    # find them in the cache or join the fetch in flight, see material_sources.py. The
+    # summary has one path, the client with its retries and circuit breaker.
+    material_sources.prefetch(material_id, API_base_url, TAB_SOURCES)
+    return api_client.get_summary(material_id, base_url=API_base_url)
 
 def get_material_summary(material_id):
+    # The returned document is shared through the summary cache, do not modify it in place
     API_base_url = get_api_base_url()
-    response = requests.get(f"{API_base_url}/{material_id}")
-    response.raise_for_status()
-    return response.json()
+    return summary_cache.get_or_fetch(material_id, lambda: fetch_material_summary(API_base_url, material_id))
 
-structure_viewer = ctc.StructureMoleculeComponent(id='ctc_structure_viewer')
+# Graph and scene callbacks cached by structure and settings, see structure_scene.py
+structure_viewer = CachedStructureMoleculeComponent(id='ctc_structure_viewer')
 structure_viewer_layout = structure_viewer.layout()
 
 
+# Shown while the literature job waits for a worker
+LITERATURE_PENDING = "Loading references…"
+
 # app header with breadcrumb
 breadcrumb_items = [
     {"label": "Home", "href": "/", "external_link": True},
@@ -106,7 +121,7 @@ def properties_tab_layout():
                             ]),
                             html.P([
                                 "To further explore the impact of different mixing schemes of functionals on the phase diagrams, please go to the ",
-                                html.A("Phase Diagram", href="#", className="text-primary"),
+                                html.A("Phase Diagram", href="/apps/analysis/phase", id="phase_diagram_link", className="text-primary"),
                                 " App."
                             ])
                         ])
@@ -196,6 +211,7 @@ scrollspy_layout = html.Div(className='scrollspy', children=[
         properties_tab_layout(),
         html.Div(id='literature_references', children=[
             html.H3('Literature References'),
+            html.P(LITERATURE_PENDING, id='literature_progress', className='text-muted', style={"display": "none"}),
             html.Div(id='literature_list'),
             ], 
             className='mt-3'
@@ -205,6 +221,8 @@ scrollspy_layout = html.Div(className='scrollspy', children=[
 
 layout = html.Div([
     app_header, 
+    # material_id of the summary fetched for this page, read by the section callbacks
+    dcc.Store(id='material_summary_store'),
     html.Section([
         html.Div([  # Added container div with max-width
             scrollspy_layout
@@ -222,15 +240,16 @@ layout = html.Div([
     })
     ])
 
-ctc.register_crystal_toolkit(app = dash.get_app(), layout = layout)
+register_crystal_toolkit(dash.get_app(), layout)
 
 def get_url_query_params(search_string):
     if not search_string:
         return {}
     return {k: v[0] for k, v in parse_qs(search_string.replace('?', '')).items()}
 
-def generate_lattice_constants_box(lattice_data):
-    lattice_constants ={
+def lattice_constants(lattice_data):
+    """Formatted lattice constants, shared by the lattice box and the compare page"""
+    return {
         'a': f"{lattice_data['a']:.2f} Å",
         'b': f"{lattice_data['b']:.2f} Å",
         'c': f"{lattice_data['c']:.2f} Å",
@@ -239,37 +258,50 @@ def generate_lattice_constants_box(lattice_data):
         'ɣ': f"{lattice_data['gamma']:.2f} º",
         'Volume': f"{lattice_data['volume']:.2f} Å³",
     }
-    return DataBox(title="Lattice", data=lattice_constants).children
 
-def generate_summary_box(mpr_response):
-    magnetic_ordering = {
-        'NM': 'Non-magnetic', 
-        'FM': 'Ferro-magnetic', 
-        'FiM': 'Ferrimagnetic'
-    }
-    summary_data = {
+@instrumentation.timed()
+def generate_lattice_constants_box(lattice_data):
+    return DataBox(title="Lattice", data=lattice_constants(lattice_data), slot="lattice_constants").children
+
+MAGNETIC_ORDERING = {
+    'NM': 'Non-magnetic', 
+    'FM': 'Ferro-magnetic', 
+    'FiM': 'Ferrimagnetic',
+    'AFM': 'Antiferromagnetic',
+}
+
+def summary_values(mpr_response):
+    """Formatted values of the summary box, shared by the box and the compare page"""
+    return {
       'Energy Above Hull': f"{mpr_response.get('energy_above_hull'):.3f} eV/atom",
       'Space Group': f"{mpr_response.get('symmetry')['symbol']}",
       'Band Gap': f"{mpr_response.get('band_gap'):.2f} eV",
       'Predicted Formation Energy': f"{mpr_response.get('formation_energy_per_atom'):.3f} eV/atom",
-      'Magnetic Ordering': magnetic_ordering[mpr_response.get('ordering')],
+      'Magnetic Ordering': MAGNETIC_ORDERING.get(mpr_response.get('ordering'), mpr_response.get('ordering')),
       'Total Magnetization': f"{mpr_response.get('total_magnetization'):.2f} µB/f.u.",
       'Experimentally Observed': 'No' if mpr_response.get('theoretical') else 'Yes',
     }
-    return DataBox(data=summary_data).children
 
+@instrumentation.timed()
+def generate_summary_box(mpr_response):
+    return DataBox(data=summary_values(mpr_response), slot="summary").children
+
+@instrumentation.timed()
 def generate_symmetry_box(sym_data):
-    return DataBox(title="Symmetry", data=sym_data).children
+    return DataBox(title="Symmetry", data=sym_data, slot="symmetry_details").children
 
+@instrumentation.timed()
 def generate_atomic_posistions_box(wyckoff_sites_data):
-    return DataBox(title="Atomic Positions", data=wyckoff_sites_data).children
+    return DataBox(title="Atomic Positions", data=wyckoff_sites_data, slot="atomic_positions", compact=True).children
 
+@instrumentation.timed()
 def generate_scrollspy_menu_title(mp_id, formula_pretty):
     return [
         html.Div(format_chemical_formula(formula_pretty), style={"font-size": "2.5rem"}),
         html.Span(mp_id, style={"fontSize":"1.5rem", "fontWeight": 400}), 
         ]
 
+@instrumentation.timed()
 def generate_chemical_environment(chem_env_data):
     chem_env_table = []
     for ce in chem_env_data:
@@ -280,12 +312,15 @@ def generate_chemical_environment(chem_env_data):
                 "IUPAC": ce['IUPAC'],
                 "CSM": ce['CSM'],
         })
-    return DataBox(title="Chemical Environment", data=chem_env_table).children
+    return DataBox(title="Chemical Environment", data=chem_env_table, slot="chem_env", compact=True).children
 
+@instrumentation.timed()
 def generate_literature_list(literature_references):
-    return BibList(data = literature_references).children
+    return BibList(data = literature_references, slot="literature").children
 
+@instrumentation.timed()
 def generate_phase_stability_box(thermostability_info):
+    thermostability_info = dict(thermostability_info)
     if (thermostability_info['Predicted Stable']):
         thermostability_info['Predicted Stable'] = html.I(className="fas fa-circle-check fa-lg", style={"color": "green"})
     else:
@@ -314,55 +349,208 @@ def generate_phase_stability_box(thermostability_info):
     else:
         thermostability_info['Decomposes to'] = 'Not predicted to decompose'
     # return html.Div()
-    return DataBox(data=thermostability_info).children
+    return DataBox(data=thermostability_info, slot="phase_stability").children
+
+# Fields of the property tab sources: field -> (label, unit)
+ELECTRONIC_STRUCTURE_FIELDS = {
+    "band_gap": ("Band Gap", "eV"),
+    "is_gap_direct": ("Direct Gap", None),
+    "is_metal": ("Metallic", None),
+    "cbm": ("Conduction Band Minimum", "eV"),
+    "vbm": ("Valence Band Maximum", "eV"),
+    "efermi": ("Fermi Energy", "eV"),
+}
+MAGNETIC_PROPERTIES_FIELDS = {
+    "ordering": ("Magnetic Ordering", None),
+    "total_magnetization": ("Total Magnetization", "µB/f.u."),
+    "num_magnetic_sites": ("Magnetic Sites", None),
+    "types_of_magnetic_species": ("Magnetic Species", None),
+}
+
+def format_source_value(value, unit):
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, float):
+        value = f"{value:.2f}"
+    elif isinstance(value, list):
+        value = ", ".join(str(item) for item in value)
+    return f"{value} {unit}" if unit else str(value)
+
+@instrumentation.timed()
+def generate_source_box(document, fields, slot):
+    data = {
+        label: format_source_value(document[field], unit)
+        for field, (label, unit) in fields.items()
+        if document is not None and document.get(field) is not None
+    }
+    if not data:
+        return html.P("Not available for this material.", className="text-muted")
+    return DataBox(data=data, slot=slot).children
 
-@callback(
-    Output(structure_viewer.id(), 'data'),
-    Output('_breadcrumb_explorer', 'items'),
-    Output('summary_box', 'children'),
-    Output('robocrys_box', 'data'),
-    Output('lattice_constants', 'children'),
-    Output('symmetry_details', 'children'),
-    Output('atomic_positions', 'children'),
-    Output('more_details', 'children'),
-    Output('scrollspy_menu_title', 'children'),
-    Output('chem_env', 'children'),
-    Output('literature_list', 'children'),
-    Output('phase_stability_databox', 'children'),
-    Input('url', 'pathname'),
-    Input('url', 'search')
-)
-def update_structure(pathname, search):
-    query_params = get_url_query_params(search)
-    material_id = urlparse(pathname).path.split('/')[-1]
-    material_summary = get_material_summary(material_id)
+@instrumentation.timed()
+def build_structure_section(material_id, material_summary):
     breadcrumb_items = [
         {"label": "Home", "href": "/", "external_link": True},
         {"label": "Apps", "href": "/apps", "external_link": True},
         {"label": "Materials Explorer", "href": "/materials", "external_link": True},
         {"label": material_id, "active": True},
     ]
-    robocrys_block_data = material_summary["description"]
+    robocrys_block_data = dict(material_summary["description"])
     robocrys_block_data['title'] = "Description"
 
+    return  material_summary.get("structure"), \
+            breadcrumb_items, \
+            generate_summary_box(material_summary), \
+            robocrys_block_data, \
+            generate_scrollspy_menu_title(material_id, material_summary['formula_pretty']), \
+            {"material_id": material_id, "chemsys": material_summary.get("chemsys"),
+             "linked_material_ids": linked_material_ids(material_summary)}
+
+@instrumentation.timed()
+def build_crystal_structure_section(material_id, material_summary):
     more_details_block = DataBox(data = {
         "Number of Atoms": material_summary["nsites"],
         "Density": f"{material_summary["density"]:.2f} g·cm⁻³",
         "Possible Oxidation States": " ".join([format_formula_charge(specie) for specie in material_summary["possible_species"]]),
-    }).children
-
-    generate_literature_list(material_summary['literature'])
+    }, slot="more_details").children
 
-    return  material_summary.get("structure"), \
-            breadcrumb_items, \
-            generate_summary_box(material_summary), \
-            robocrys_block_data, \
-            generate_lattice_constants_box(material_summary["structure"]["lattice"]), \
+    return  generate_lattice_constants_box(material_summary["structure"]["lattice"]), \
             generate_symmetry_box(material_summary['symmetry_detail']), \
             generate_atomic_posistions_box(material_summary["wyckoff_sites"]), \
-            more_details_block, \
-            generate_scrollspy_menu_title(material_id, material_summary['formula_pretty']), \
-            generate_chemical_environment(material_summary['chemical_environment']), \
-            generate_literature_list(material_summary['literature']), \
-            generate_phase_stability_box(material_summary['thermostability'])
+            more_details_block
+
+@instrumentation.timed()
+def build_phase_stability_section(material_id, material_summary):
+    return generate_phase_stability_box(material_summary['thermostability'])
+
+@instrumentation.timed()
+def build_chemical_environment_section(material_id, material_summary):
+    return generate_chemical_environment(material_summary['chemical_environment'])
+
+@instrumentation.timed()
+def build_literature_section(material_id, material_summary):
+    return generate_literature_list(material_summary['literature'])
+
+# Builders of each section's callback outputs from the summary document. The callbacks run
+# them live; scripts/prerender_materials.py runs them ahead of time for the most viewed
+# materials and stores the outputs in page_snapshots.
+SECTION_BUILDERS = {
+    "structure": build_structure_section,
+    "crystal_structure": build_crystal_structure_section,
+    "phase_stability": build_phase_stability_section,
+    "chemical_environment": build_chemical_environment_section,
+    "literature": build_literature_section,
+}
+
+def linked_material_ids(material_summary):
+    """Material IDs the page links to: the decomposition products of the phase stability box"""
+    decomposes_to = material_summary.get('thermostability', {}).get('Decomposes to')
+    if not isinstance(decomposes_to, list):
+        return []
+    return [component['material_id'] for component in decomposes_to if component.get('material_id')]
+
+def prefetch_linked_materials(summary_store):
+    """Warm the summary cache for the materials the page links to, in the background"""
+    # The IDs come with the store, so pages served from a snapshot prefetch them as well
+    prefetcher.prefetch(summary_store.get("linked_material_ids", []), get_api_base_url())
+
+def render_section(section, material_id):
+    """Outputs of a section, from its pre-rendered snapshot when there is one"""
+    outputs = material_snapshots.get_section(material_id, section)
+    if outputs is None:
+        outputs = SECTION_BUILDERS[section](material_id, get_material_summary(material_id))
+    return outputs
+
+# The first callback fetches the summary and paints the viewer and summary box. It then
+# publishes the material_id, chemsys and linked materials to material_summary_store, and the
+# remaining sections are filled in by their own callbacks, which read the same document from
+# the summary cache.
+@callback(
+    Output(structure_viewer.id(), 'data'),
+    Output('_breadcrumb_explorer', 'items'),
+    Output('summary_box', 'children'),
+    Output('robocrys_box', 'data'),
+    Output('scrollspy_menu_title', 'children'),
+    Output('material_summary_store', 'data'),
+    Input('url', 'pathname'),
+    Input('url', 'search')
+)
+def update_structure(pathname, search):
+    query_params = get_url_query_params(search)
+    material_id = urlparse(pathname).path.split('/')[-1]
+    outputs = render_section("structure", material_id)
+    # A snapshot skips the summary fetch that starts the tab sources; start them here so
+    # the tab callbacks join them. Sources already cached or in flight are left alone.
+    material_sources.prefetch(material_id, get_api_base_url(), TAB_SOURCES)
+    prefetch_linked_materials(outputs[-1])
+    return outputs
+
+@callback(
+    Output('lattice_constants', 'children'),
+    Output('symmetry_details', 'children'),
+    Output('atomic_positions', 'children'),
+    Output('more_details', 'children'),
+    Input('material_summary_store', 'data')
+)
+def update_crystal_structure_details(summary_store):
+    return render_section("crystal_structure", summary_store["material_id"])
 
+@callback(
+    Output('phase_stability_databox', 'children'),
+    Input('material_summary_store', 'data')
+)
+def update_phase_stability(summary_store):
+    return render_section("phase_stability", summary_store["material_id"])
+
+@callback(
+    Output('chem_env', 'children'),
+    Input('material_summary_store', 'data')
+)
+def update_chemical_environment(summary_store):
+    return render_section("chemical_environment", summary_store["material_id"])
+
+# Parsing the BibTeX references is the slowest section: it runs as a background job, out
+# of the request threads, and is cancelled when the user leaves the page, see
+# background_jobs.py
+@background_jobs.callback(
+    Output('literature_list', 'children'),
+    Input('material_summary_store', 'data'),
+    progress=[Output('literature_progress', 'children')],
+    progress_default=[LITERATURE_PENDING],
+    running=[(Output('literature_progress', 'style'), {"display": "block"}, {"display": "none"})],
+    cancel=[Input('url', 'pathname')],
+)
+def update_literature(set_progress, summary_store):
+    material_id = summary_store["material_id"]
+    set_progress([f"Formatting the references of {material_id}…"])
+    return render_section("literature", material_id)
+
+# The property tabs read their own sources, fetched along with the summary. They stay out
+# of SECTION_BUILDERS: a source that failed is retried here rather than frozen in a snapshot.
+@callback(
+    Output('electronic_structure_databox', 'children'),
+    Input('material_summary_store', 'data')
+)
+def update_electronic_structure(summary_store):
+    document = material_sources.get(summary_store["material_id"], "electronic_structure", get_api_base_url())
+    return generate_source_box(document, ELECTRONIC_STRUCTURE_FIELDS, "electronic_structure")
+
+@callback(
+    Output('magnetic_properties_databox', 'children'),
+    Input('material_summary_store', 'data')
+)
+def update_magnetic_properties(summary_store):
+    document = material_sources.get(summary_store["material_id"], "magnetism", get_api_base_url())
+    return generate_source_box(document, MAGNETIC_PROPERTIES_FIELDS, "magnetic_properties")
+
+# Opens the phase diagram app on the material's chemical system, which the structure
+# section publishes in the store: pages served from a snapshot or by another worker have it too
+@callback(
+    Output('phase_diagram_link', 'href'),
+    Input('material_summary_store', 'data')
+)
+def update_phase_diagram_link(summary_store):
+    chemsys = summary_store.get("chemsys")
+    if not chemsys:
+        return dash.no_update
+    return f"/apps/analysis/phase?{urlencode({'chemsys': chemsys})}"
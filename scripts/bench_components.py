@@ -0,0 +1,103 @@
+"""
+Microbenchmark of the DataBox and BibList constructors.
+
+Builds chemical-environment tables and reference lists of increasing size and compares the
+former default id, hash(str(data)), which stringifies the whole payload including nested
+Dash components, with the slot-based ids of components.utility_functions.stable_component_id.
+Prints the mean time of the id alone and of the whole constructor per size.
+
+Usage:
+    python scripts/bench_components.py [--rows 20 200 2000] [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dash import html  # noqa: E402
+
+from components.bibtex_list import BibList  # noqa: E402
+from components.data_box import DataBox  # noqa: E402
+from components.utility_functions import format_chemical_formula, stable_component_id  # noqa: E402
+
+BIBTEX_ENTRY = """@article{{Ref{index},
+    author = "Anubhav Jain and Shyue Ping Ong and Geoffroy Hautier",
+    title = "Commentary: The Materials Project {index}",
+    journal = "APL Materials",
+    volume = "1",
+    pages = "011002",
+    year = "2013"
+}}"""
+
+
+def chemical_environment_rows(count: int) -> list:
+    """Rows shaped like the Chemical Environment table, with a component column"""
+    return [
+        {
+            "Wyckoff": f"{index % 48 + 1}a",
+            "Species": format_chemical_formula(f"Si{index % 4 + 1}"),
+            "Environment": "Tetrahedral",
+            "IUPAC": "T-4",
+            "CSM": f"{index / 100:.2f}",
+        }
+        for index in range(count)
+    ]
+
+
+def legacy_data_box(rows: list):
+    return DataBox(title="Chemical Environment", data=rows, id=f"data-box-{hash(str(rows))}")
+
+
+def slot_data_box(rows: list):
+    return DataBox(title="Chemical Environment", data=rows, slot="chem_env")
+
+
+def legacy_bib_list(references: list):
+    return BibList(data=references, id=f"bib-list-{hash(str(references))}")
+
+
+def slot_bib_list(references: list):
+    return BibList(data=references, slot="literature")
+
+
+def legacy_id(data) -> str:
+    return f"data-box-{hash(str(data))}"
+
+
+def slot_id(data) -> str:
+    return stable_component_id("data-box", "chem_env")
+
+
+def mean_ms(function, argument, repeat: int) -> float:
+    return min(timeit.repeat(lambda: function(argument), number=repeat, repeat=3)) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DataBox and BibList constructor benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 200, 2000], help="Table sizes")
+    parser.add_argument("--repeat", type=int, default=50, help="Constructions per measurement")
+    args = parser.parse_args()
+
+    print(f"{'':<18} {'rows':>6} {'hash(str) ms':>13} {'slot id ms':>11}")
+    for count in args.rows:
+        rows = chemical_environment_rows(count)
+        references = [BIBTEX_ENTRY.format(index=index) for index in range(count)]
+        # Parsed references are cached, so the BibList runs measure the components and the id
+        BibList(data=references, slot="literature")
+        measurements = [
+            ("DataBox id", legacy_id, slot_id, rows),
+            ("DataBox", legacy_data_box, slot_data_box, rows),
+            ("BibList id", legacy_id, slot_id, references),
+            ("BibList", legacy_bib_list, slot_bib_list, references),
+        ]
+        for name, legacy, slot, argument in measurements:
+            print(
+                f"{name:<18} {count:>6} {mean_ms(legacy, argument, args.repeat):>13.3f} "
+                f"{mean_ms(slot, argument, args.repeat):>11.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Time to first paint of the material detail page, for a running instance of the app.
+
+Replays the callbacks the browser sends when a material page opens: the structure callback,
+whose outputs (structure viewer, summary box, description) are the first paint, then every
+callback on material_summary_store at once, as Dash fires them when the store is set. The
+literature section is a background callback and is polled until its job is done. Each
+material is visited once, so the first visits of a cold app measure the upstream fetch and
+the later ones the cache.
+
+    python scripts/bench_first_paint.py --url http://127.0.0.1:8050 --ids mp-149 mp-13 mp-22862
+
+Run it against gunicorn with several workers to check that the section callbacks, which may
+land on another worker than the structure callback, read the document from the shared
+summary cache instead of fetching it again: the summary API's access log should show one
+summary request per material.
+"""
+import argparse
+import threading
+import time
+from typing import Dict, List
+
+import requests
+
+from bench_throughput import callback_payload, find_callback, percentile
+
+STORE_INPUT = "material_summary_store.data"
+# Seconds between polls of a background callback, as the browser's default interval
+POLL_INTERVAL = 0.5
+
+
+def run_callback(session: requests.Session, url: str, payload: dict) -> float:
+    """Seconds until a callback answers with its outputs, polling background callbacks"""
+    start = time.perf_counter()
+    response = session.post(url, json=payload, timeout=60)
+    response.raise_for_status()
+    body = response.json()
+    while "cacheKey" in body and "response" not in body:
+        time.sleep(POLL_INTERVAL)
+        params = {"cacheKey": body["cacheKey"], "job": body.get("job")}
+        response = session.post(url, params=params, json=payload, timeout=60)
+        response.raise_for_status()
+        if response.status_code == 204:
+            break
+        body = dict(response.json(), cacheKey=body["cacheKey"], job=body.get("job"))
+    return time.perf_counter() - start
+
+
+def visit(base_url: str, dependencies: List[dict], material_id: str) -> Dict[str, float]:
+    """Seconds to the first paint and to the last section of one page visit"""
+    url = f"{base_url}/_dash-update-component"
+    session = requests.Session()
+    structure = find_callback(dependencies, STORE_INPUT)
+    sections = [
+        dependency for dependency in dependencies
+        if any(f"{item['id']}.{item['property']}" == STORE_INPUT for item in dependency["inputs"])
+    ]
+    store = {"material_id": material_id}
+
+    start = time.perf_counter()
+    first_paint = run_callback(session, url, callback_payload(structure, {
+        "url.pathname": f"/materials/{material_id}",
+        "url.search": "",
+    }))
+
+    def section(dependency: dict):
+        # A session each: the browser sends the section callbacks over parallel connections
+        run_callback(requests.Session(), url, callback_payload(dependency, {STORE_INPUT: store}))
+
+    threads = [threading.Thread(target=section, args=(dependency,)) for dependency in sections]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"first_paint": first_paint, "complete": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first paint of the material detail page")
+    parser.add_argument("--url", default="http://127.0.0.1:8050", help="Base URL of the app")
+    parser.add_argument("--ids", nargs="+", default=["mp-149"], help="Materials to open, each once")
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    dependencies = requests.get(f"{base_url}/_dash-dependencies", timeout=30).json()
+    results = []
+    print(f"{'material':<16} {'first paint ms':>15} {'complete ms':>12}")
+    for material_id in args.ids:
+        result = visit(base_url, dependencies, material_id)
+        results.append(result)
+        print(f"{material_id:<16} {result['first_paint'] * 1000:>15.1f} {result['complete'] * 1000:>12.1f}")
+    for name in ("first_paint", "complete"):
+        values = [result[name] for result in results]
+        print(f"{name}: p50 {percentile(values, 0.50) * 1000:.1f} ms, p95 {percentile(values, 0.95) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
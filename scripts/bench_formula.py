@@ -0,0 +1,72 @@
+"""
+Microbenchmark of the chemical formula renderers in components.utility_functions.
+
+Runs the EXAMPLE_FORMULAS through the tokenizer (cold and cached) and through each
+renderer, and prints the mean time per formula.
+
+Usage:
+    python scripts/bench_formula.py [--repeat 2000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.utility_functions import (  # noqa: E402
+    EXAMPLE_FORMULAS,
+    format_chemical_formula,
+    format_chemical_formula_html,
+    format_chemical_formula_unicode,
+    formula_tokens,
+)
+
+
+def tokenize_cold():
+    formula_tokens.cache_clear()
+    for formula in EXAMPLE_FORMULAS:
+        formula_tokens(formula)
+
+
+def tokenize_cached():
+    for formula in EXAMPLE_FORMULAS:
+        formula_tokens(formula)
+
+
+def render_dash():
+    for formula in EXAMPLE_FORMULAS:
+        format_chemical_formula(formula)
+
+
+def render_html():
+    for formula in EXAMPLE_FORMULAS:
+        format_chemical_formula_html(formula)
+
+
+def render_unicode():
+    for formula in EXAMPLE_FORMULAS:
+        format_chemical_formula_unicode(formula)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="passes over the example formulas")
+    args = parser.parse_args()
+
+    cases = [
+        ("tokenize (cold cache)", tokenize_cold),
+        ("tokenize (cached)", tokenize_cached),
+        ("format_chemical_formula (Dash)", render_dash),
+        ("format_chemical_formula_html", render_html),
+        ("format_chemical_formula_unicode", render_unicode),
+    ]
+    calls = args.repeat * len(EXAMPLE_FORMULAS)
+    print(f"{len(EXAMPLE_FORMULAS)} formulas x {args.repeat} passes")
+    for name, fn in cases:
+        seconds = timeit.timeit(fn, number=args.repeat)
+        print(f"{name:<34} {seconds / calls * 1e6:8.2f} µs/formula")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Startup benchmark: import-time profile and cold start of the app, eager and with LAZY_PAGES.
+
+    python scripts/bench_startup.py                       # both modes, 3 runs each
+    python scripts/bench_startup.py --runs 5 --top 30
+    python scripts/bench_startup.py --modes lazy --profile-only
+
+Each run is a fresh interpreter (bytecode caches warm, nothing imported) that measures:
+    - import: "import app", what a gunicorn worker without preload_app pays before it
+      accepts connections
+    - first page: import plus the first GET /, the page shell
+    - interactive: first page plus the first _dash-dependencies, the callback graph the
+      browser needs before any page works; with LAZY_PAGES the deferred pages load here
+      unless the warm-up thread got to them first
+
+The import-time profile is python -X importtime of "import app" in each mode, reported as
+the imports with the largest cumulative and self times. Run it on an otherwise idle
+machine: the timings are single runs of a one-off process.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {"eager": {"LAZY_PAGES": "0"}, "lazy": {"LAZY_PAGES": "1", "LAZY_PAGES_WARMUP": "0"}}
+
+COLD_START = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.server.test_client()
+assert client.get("/").status_code == 200
+first_page = time.perf_counter()
+assert client.get("/_dash-dependencies").status_code == 200
+interactive = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "first page": first_page - start,
+    "interactive": interactive - start,
+}))
+"""
+
+
+def run_python(args: List[str], env: Dict[str, str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        env=dict(os.environ, PYTHONPATH=ROOT, **env),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_profile(env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) of each import of "import app" """
+    stderr = run_python(["-X", "importtime", "-c", "import app"], env).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        imports.append((module.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def print_profile(mode: str, imports: List[Tuple[str, int, int]], top: int):
+    total = next((cumulative for module, _, cumulative in imports if module == "app"), 0)
+    print(f"\n{mode}: import app {total / 1e6:.2f} s, {len(imports)} modules imported")
+    print(f"  {'cumulative s':>12}  {'self s':>8}  module")
+    for module, self_us, cumulative_us in sorted(imports, key=lambda item: -item[2])[:top]:
+        print(f"  {cumulative_us / 1e6:12.3f}  {self_us / 1e6:8.3f}  {module}")
+    print("  largest self times: " + ", ".join(
+        f"{module} {self_us / 1e6:.2f} s" for module, self_us, _ in sorted(imports, key=lambda item: -item[1])[:5]
+    ))
+
+
+def cold_start(env: Dict[str, str], runs: int) -> Dict[str, List[float]]:
+    timings: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        result = json.loads(run_python(["-c", COLD_START], env).stdout.strip().splitlines()[-1])
+        for phase, seconds in result.items():
+            timings.setdefault(phase, []).append(seconds)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile and cold start of the app")
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=["eager", "lazy"])
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts per mode")
+    parser.add_argument("--top", type=int, default=20, help="Imports listed in the profile")
+    parser.add_argument("--profile-only", action="store_true", help="Skip the cold start runs")
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        print_profile(mode, import_profile(MODES[mode]), args.top)
+
+    if args.profile_only:
+        return
+    print(f"\nCold start, median of {args.runs} runs (s):")
+    print(f"  {'mode':<8}{'import':>10}{'first page':>12}{'interactive':>13}")
+    for mode in args.modes:
+        timings = cold_start(MODES[mode], args.runs)
+        print(f"  {mode:<8}" + "".join(
+            f"{statistics.median(timings[phase]):{width}.2f}"
+            for phase, width in (("import", 10), ("first page", 12), ("interactive", 13))
+        ))
+
+
+if __name__ == "__main__":
+    main()
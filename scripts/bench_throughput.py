@@ -0,0 +1,163 @@
+"""
+HTTP throughput benchmark for a running instance of the app.
+
+Start the server under test in another shell, for example
+
+    python app.py                                         # development server
+    DASH_DEBUG=1 python app.py                            # development server with debug tooling
+    gunicorn -c gunicorn.conf.py wsgi:server              # production profile
+    python wsgi.py                                        # waitress (Windows)
+
+then drive it with a fixed number of concurrent clients for a fixed duration:
+
+    python scripts/bench_throughput.py --url http://127.0.0.1:8050 --concurrency 16 --duration 30
+
+Each client loops over a request mix modelled on a page visit: the page shell, _dash-layout,
+_dash-dependencies and, with --material-id, the material page's structure callback, which
+also exercises the summary API and its cache. Requests per second and latency percentiles
+are printed per request type and overall.
+
+Methodology for comparing servers:
+    - run the summary API (or summary_service) on the same machine for every server, so the
+      callback measures the app, not the network
+    - warm each server with one short run, then take the median of three runs
+    - run the benchmark on a different core/machine than the server where possible; the
+      client is Python and its own GIL caps the request rate it can generate
+"""
+import argparse
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import requests
+
+
+def find_callback(dependencies: List[dict], output_contains: str) -> dict:
+    for dependency in dependencies:
+        if output_contains in dependency["output"]:
+            return dependency
+    raise KeyError(f"No callback with an output matching {output_contains!r}")
+
+
+def callback_payload(dependency: dict, values: Dict[str, object]) -> dict:
+    """
+    Body of a _dash-update-component request for a callback.
+
+    Args:
+        dependency: Callback entry of _dash-dependencies
+        values: "<id>.<property>" -> value of the inputs
+    """
+    def spec(output: str) -> dict:
+        component_id, prop = output.rsplit(".", 1)
+        return {"id": component_id, "property": prop}
+
+    output = dependency["output"]
+    if output.startswith(".."):
+        outputs = [spec(part) for part in output.strip(".").split("...")]
+    else:
+        outputs = spec(output)
+    inputs = [dict(item, value=values.get(f"{item['id']}.{item['property']}")) for item in dependency["inputs"]]
+    return {
+        "output": output,
+        "outputs": outputs,
+        "inputs": inputs,
+        "changedPropIds": [f"{inputs[0]['id']}.{inputs[0]['property']}"],
+        "state": [dict(item, value=None) for item in dependency["state"]],
+    }
+
+
+def build_mix(base_url: str, material_id: Optional[str]) -> List[tuple]:
+    """(name, method, url, json body) of each request of the mix"""
+    mix = [
+        ("page", "GET", f"{base_url}/materials", None),
+        ("layout", "GET", f"{base_url}/_dash-layout", None),
+        ("dependencies", "GET", f"{base_url}/_dash-dependencies", None),
+    ]
+    if material_id:
+        dependencies = requests.get(f"{base_url}/_dash-dependencies", timeout=30).json()
+        dependency = find_callback(dependencies, "material_summary_store.data")
+        payload = callback_payload(dependency, {
+            "url.pathname": f"/materials/{material_id}",
+            "url.search": "",
+        })
+        mix.append(("structure_callback", "POST", f"{base_url}/_dash-update-component", payload))
+    return mix
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(mix: List[tuple], concurrency: int, duration: float) -> Dict[str, dict]:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset: int):
+        session = requests.Session()
+        position = offset
+        while time.perf_counter() < deadline:
+            name, method, url, body = mix[position % len(mix)]
+            position += 1
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, json=body, timeout=60)
+                failed = response.status_code >= 400
+            except requests.RequestException:
+                failed = True
+            elapsed = time.perf_counter() - start
+            with lock:
+                if failed:
+                    errors[name] += 1
+                else:
+                    latencies[name].append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = {}
+    for name in [entry[0] for entry in mix] + ["total"]:
+        values = sum(latencies.values(), []) if name == "total" else latencies[name]
+        failed = sum(errors.values()) if name == "total" else errors[name]
+        results[name] = {
+            "requests": len(values),
+            "errors": failed,
+            "rps": len(values) / duration,
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP throughput benchmark for a running app instance")
+    parser.add_argument("--url", default="http://127.0.0.1:8050", help="Base URL of the app")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--material-id", help="Include the material page callback for this material")
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    mix = build_mix(base_url, args.material_id)
+    results = run(mix, args.concurrency, args.duration)
+
+    print(f"{args.url}: {args.concurrency} clients, {args.duration:g} s")
+    print(f"{'request':<20} {'count':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, result in results.items():
+        print(
+            f"{name:<20} {result['requests']:>8} {result['errors']:>7} {result['rps']:>8.1f} "
+            f"{result['p50'] * 1000:>8.1f} {result['p95'] * 1000:>8.1f} {result['p99'] * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
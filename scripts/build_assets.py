@@ -0,0 +1,407 @@
+"""
+Build the production CSS bundle served by components.static_assets.
+
+Steps:
+    1. Read the stylesheets of assets/css in the order Dash includes them (alphabetical).
+    2. Purge rules whose class or id selectors appear nowhere in the app: the Python, JSON
+       and JS sources of this repo and the Python/JS of the component packages that render
+       class names (dash_mp_components, crystal_toolkit, dash_bootstrap_components).
+       @font-face and @keyframes rules are kept only if a remaining rule uses them.
+    3. Minify and concatenate into one bundle, copying the fonts it still references.
+    4. Name every output file by a hash of its content, write gzip (and, if the brotli
+       package is installed, Brotli) variants next to it, and write manifest.json, listing
+       the woff2 fonts used by this repo's layouts for preloading.
+
+Usage:
+    python scripts/build_assets.py [--output dist] [--bootstrap path/to/bootstrap.min.css]
+                                   [--safelist "^is-" --safelist "^has-"]
+
+--bootstrap bundles a local copy of the Bootstrap theme instead of loading it from the CDN.
+Serve the result with STATIC_BUNDLE=1 (see components/static_assets.py).
+"""
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import shutil
+import sys
+from typing import Iterable, List, Optional, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from components.static_assets import MANIFEST_NAME  # noqa: E402
+
+ASSETS_DIR = os.path.join(ROOT, "assets")
+CSS_DIR = os.path.join(ASSETS_DIR, "css")
+
+# Packages whose components add their own class names to the page
+COMPONENT_PACKAGES = ("dash_mp_components", "crystal_toolkit", "dash_bootstrap_components")
+
+# Class names built at runtime (e.g. "is-" + color) that never appear literally
+DEFAULT_SAFELIST = (r"^is-", r"^has-")
+
+SOURCE_EXTENSIONS = (".py", ".json", ".js")
+COMPRESSIBLE_EXTENSIONS = (".css", ".ttf", ".woff", ".svg")
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_LICENSE_RE = re.compile(r"/\*!.*?\*/", re.S)
+_CLASS_RE = re.compile(r"\.(-?[_a-zA-Z][\w-]*)")
+_ID_RE = re.compile(r"#(-?[_a-zA-Z][\w-]*)")
+_NOT_RE = re.compile(r":not\([^()]*\)")
+_TOKEN_RE = re.compile(r"[A-Za-z_][\w-]*")
+_URL_RE = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+_FONT_FAMILY_RE = re.compile(r"font-family\s*:\s*([^;}]+)")
+_KEYFRAMES_NAME_RE = re.compile(r"@(?:-\w+-)?keyframes\s+([\w-]+)")
+
+
+# Parsing
+
+def is_keyframes(prelude: str) -> bool:
+    return prelude.startswith("@") and "keyframes" in prelude
+
+
+def split_top_level(text: str, separator: str) -> List[str]:
+    """Split on a separator outside brackets and strings"""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote and text[i - 1] != "\\":
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def parse_blocks(css: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Split a stylesheet into top-level (prelude, body) pairs. Statements without a block,
+    like @charset or @import, have a body of None.
+
+    A stray "}" outside any block makes browsers drop the rule that follows it, so that
+    rule is dropped here too.
+    """
+    blocks, depth, quote, start, prelude_end, stray = [], 0, None, 0, None, False
+    for i, char in enumerate(css):
+        if quote:
+            if char == quote and css[i - 1] != "\\":
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "{":
+            if depth == 0:
+                prelude_end = i
+            depth += 1
+        elif char == "}":
+            if depth == 0:
+                stray = True
+                start = i + 1
+                continue
+            depth -= 1
+            if depth == 0:
+                if not stray:
+                    blocks.append((css[start:prelude_end].strip(), css[prelude_end + 1:i]))
+                start, stray = i + 1, False
+        elif char == ";" and depth == 0:
+            if not stray:
+                blocks.append((css[start:i].strip(), None))
+            start, stray = i + 1, False
+    return [(prelude, body) for prelude, body in blocks if prelude or body]
+
+
+# Purging
+
+def collect_tokens(paths: Iterable[str]) -> Set[str]:
+    """Every identifier-like token of the given source files or directories"""
+    tokens = set()
+    for path in paths:
+        if os.path.isfile(path):
+            files = [path]
+        else:
+            files = [
+                os.path.join(folder, name)
+                for folder, dirs, names in os.walk(path)
+                if not any(part in (".git", "__pycache__", "node_modules") for part in folder.split(os.sep))
+                for name in names
+                if name.endswith(SOURCE_EXTENSIONS)
+            ]
+        for name in files:
+            with open(name, "r", encoding="utf-8", errors="ignore") as fp:
+                tokens.update(_TOKEN_RE.findall(fp.read()))
+    return tokens
+
+
+def package_dirs(names: Iterable[str]) -> List[str]:
+    dirs = []
+    for name in names:
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.submodule_search_locations:
+            print(f"warning: package {name} not found, its class names are not scanned")
+            continue
+        dirs.extend(spec.submodule_search_locations)
+    return dirs
+
+
+class Purger:
+    """Removes the rules of a stylesheet whose selectors can't match anything in the app"""
+
+    def __init__(self, used: Set[str], safelist: Iterable[str]):
+        self.used = used
+        self.safelist = [re.compile(pattern) for pattern in safelist]
+
+    def is_used(self, name: str) -> bool:
+        return name in self.used or any(pattern.search(name) for pattern in self.safelist)
+
+    def keep_selector(self, selector: str) -> bool:
+        # Classes inside :not() exclude elements, so they needn't be used
+        selector = _NOT_RE.sub("", selector)
+        names = _CLASS_RE.findall(selector) + _ID_RE.findall(selector)
+        return all(self.is_used(name) for name in names)
+
+    def purge(self, css: str) -> List[Tuple[str, Optional[str]]]:
+        """Blocks to keep; nested @media/@supports blocks are purged recursively"""
+        kept = []
+        for prelude, body in parse_blocks(css):
+            if body is None or prelude.startswith(("@font-face", "@page")) or is_keyframes(prelude):
+                kept.append((prelude, body))
+            elif prelude.startswith("@"):
+                children = self.purge(body)
+                if children:
+                    kept.append((prelude, children))
+            else:
+                selectors = [selector.strip() for selector in split_top_level(prelude, ",")]
+                selectors = [selector for selector in selectors if self.keep_selector(selector)]
+                if selectors:
+                    kept.append((",".join(selectors), body))
+        return kept
+
+
+def drop_unused_at_rules(blocks: list, referenced_text: str) -> list:
+    """Drop @font-face and @keyframes rules whose font family or name isn't referenced"""
+    kept = []
+    for prelude, body in blocks:
+        if prelude.startswith("@font-face"):
+            families = [family.strip().strip("'\"") for family in _FONT_FAMILY_RE.findall(body)]
+            if families and not any(family in referenced_text for family in families):
+                continue
+        elif is_keyframes(prelude):
+            match = _KEYFRAMES_NAME_RE.match(prelude)
+            if match and not re.search(rf"\b{re.escape(match.group(1))}\b", referenced_text):
+                continue
+        elif isinstance(body, list):
+            body = drop_unused_at_rules(body, referenced_text)
+            if not body:
+                continue
+        kept.append((prelude, body))
+    return kept
+
+
+# Minifying
+
+def minify_declarations(body: str) -> str:
+    declarations = []
+    for declaration in split_top_level(body, ";"):
+        declaration = " ".join(declaration.split())
+        if not declaration:
+            continue
+        if ":" in declaration:
+            name, value = declaration.split(":", 1)
+            declaration = f"{name.strip()}:{value.strip()}"
+        declarations.append(declaration)
+    return ";".join(declarations)
+
+
+def minify_selector(prelude: str) -> str:
+    prelude = " ".join(prelude.split())
+    return re.sub(r"\s*([,>~])\s*", r"\1", prelude)
+
+
+def serialize(blocks: list) -> str:
+    out = []
+    for prelude, body in blocks:
+        if body is None:
+            out.append(" ".join(prelude.split()) + ";")
+        elif isinstance(body, list):
+            out.append(f"{' '.join(prelude.split())}{{{serialize(body)}}}")
+        elif is_keyframes(prelude):
+            out.append(f"{' '.join(prelude.split())}{{{serialize(parse_blocks(body))}}}")
+        else:
+            out.append(f"{minify_selector(prelude)}{{{minify_declarations(body)}}}")
+    return "".join(out)
+
+
+# Output
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(name: str, data: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{content_hash(data)}{ext}"
+
+
+def write_compressed(path: str, data: bytes, brotli_module) -> dict:
+    """Write path, and its .gz/.br variants when they are smaller; returns the sizes"""
+    with open(path, "wb") as fp:
+        fp.write(data)
+    sizes = {"raw": len(data)}
+    if not path.endswith(COMPRESSIBLE_EXTENSIONS):
+        return sizes
+    variants = [("gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli_module is not None:
+        variants.append(("br", brotli_module.compress(data, quality=11)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data) * 0.9:
+            with open(f"{path}.{suffix}", "wb") as fp:
+                fp.write(compressed)
+            sizes[suffix] = len(compressed)
+    return sizes
+
+
+class FontCopier:
+    """Rewrites url() references to local files into content-hashed copies in the output"""
+
+    def __init__(self, output: str, brotli_module):
+        self.output = output
+        self.brotli_module = brotli_module
+        self.copied = {}
+
+    def rewrite(self, css: str, source_dir: str) -> str:
+        def replace(match):
+            url = match.group(2).strip()
+            if url.startswith(("data:", "http:", "https:", "//")):
+                return match.group(0)
+            path, suffix = re.match(r"([^?#]*)(.*)", url).groups()
+            if path.startswith("/assets/"):
+                local = os.path.join(ASSETS_DIR, path[len("/assets/"):])
+            elif path.startswith("/"):
+                return match.group(0)
+            else:
+                local = os.path.normpath(os.path.join(source_dir, path))
+            if not os.path.isfile(local):
+                return match.group(0)
+            return f"url(../{self.copy(local)}{suffix})"
+
+        return _URL_RE.sub(replace, css)
+
+    def copy(self, local: str) -> str:
+        if local not in self.copied:
+            with open(local, "rb") as fp:
+                data = fp.read()
+            folder = os.path.basename(os.path.dirname(local))
+            relative = f"{folder}/{hashed_name(os.path.basename(local), data)}"
+            os.makedirs(os.path.join(self.output, folder), exist_ok=True)
+            write_compressed(os.path.join(self.output, relative), data, self.brotli_module)
+            self.copied[local] = relative
+        return self.copied[local]
+
+
+def layout_fonts(bundle: str, layout_purger: Purger) -> List[str]:
+    """
+    woff2 files of the font families used by rules that match this repo's own layouts,
+    as opposed to rules only kept for class names found in the component packages
+    """
+    blocks = parse_blocks(bundle)
+    # Rules without a class or id, like :root{--fa-font-brands:...}, use no font by themselves
+    layout_text = serialize([
+        (prelude, body) for prelude, body in layout_purger.purge(bundle)
+        if isinstance(body, list) or _CLASS_RE.search(prelude) or _ID_RE.search(prelude)
+    ])
+    fonts = set()
+    for prelude, body in blocks:
+        if not prelude.startswith("@font-face"):
+            continue
+        families = [family.strip().strip("'\"") for family in _FONT_FAMILY_RE.findall(body)]
+        if any(family in layout_text for family in families):
+            fonts.update(
+                url[len("../"):] for _, url in _URL_RE.findall(body)
+                if url.startswith("../") and url.endswith(".woff2")
+            )
+    return sorted(fonts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the purged, minified and precompressed CSS bundle")
+    parser.add_argument("--output", default=os.path.join(ROOT, "dist"), help="Output directory (replaced)")
+    parser.add_argument("--bootstrap", help="Local Bootstrap theme CSS to bundle instead of loading it from the CDN")
+    parser.add_argument("--safelist", action="append", default=list(DEFAULT_SAFELIST),
+                        help="Regular expression of class names to keep; repeatable")
+    args = parser.parse_args()
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("brotli is not installed; writing gzip variants only")
+
+    sources = sorted(
+        os.path.join(CSS_DIR, name) for name in os.listdir(CSS_DIR) if name.endswith(".css")
+    )
+    if args.bootstrap:
+        # Dash puts external stylesheets like the theme before the assets
+        sources.insert(0, os.path.abspath(args.bootstrap))
+
+    repo_tokens = collect_tokens([ROOT])
+    purger = Purger(repo_tokens | collect_tokens(package_dirs(COMPONENT_PACKAGES)), args.safelist)
+
+    if os.path.isdir(args.output):
+        shutil.rmtree(args.output)
+    os.makedirs(os.path.join(args.output, "css"))
+    fonts = FontCopier(args.output, brotli)
+
+    purged, licenses, source_bytes = [], [], 0
+    for source in sources:
+        with open(source, "r", encoding="utf-8") as fp:
+            css = fp.read()
+        source_bytes += len(css.encode("utf-8"))
+        # License comments are kept, at the top of the bundle
+        licenses.extend(_LICENSE_RE.findall(css))
+        purged.append((source, purger.purge(_COMMENT_RE.sub("", css))))
+
+    # Font families and animations count as used when a kept style rule refers to them
+    referenced = "".join(
+        serialize([
+            (prelude, body) for prelude, body in blocks
+            if not prelude.startswith("@font-face") and not is_keyframes(prelude)
+        ])
+        for _, blocks in purged
+    )
+    # Only fonts of the remaining @font-face rules are copied
+    rules = "".join(
+        fonts.rewrite(serialize(drop_unused_at_rules(blocks, referenced)), os.path.dirname(source))
+        for source, blocks in purged
+    )
+    bundle = "\n".join(licenses + [rules]).encode("utf-8")
+
+    css_name = f"css/{hashed_name('bundle.css', bundle)}"
+    sizes = write_compressed(os.path.join(args.output, css_name), bundle, brotli)
+    preload_fonts = layout_fonts(rules, Purger(repo_tokens, args.safelist))
+
+    manifest = {
+        "css": css_name,
+        "preload_fonts": preload_fonts,
+        "includes_bootstrap": bool(args.bootstrap),
+        "sources": [os.path.relpath(source, ROOT) for source in sources],
+    }
+    with open(os.path.join(args.output, MANIFEST_NAME), "w", encoding="utf-8") as fp:
+        json.dump(manifest, fp, indent=2)
+
+    print(f"{len(sources)} stylesheets, {source_bytes} bytes -> {css_name}: " +
+          ", ".join(f"{kind} {size}" for kind, size in sizes.items()))
+    print(f"Preloaded fonts: {', '.join(preload_fonts) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
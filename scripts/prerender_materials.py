@@ -0,0 +1,140 @@
+"""
+Pre-render the material detail page for the most viewed materials.
+
+Runs the page's section builders (SECTION_BUILDERS in material_summary.py: summary box,
+lattice and symmetry boxes, chemical environment, phase stability, literature) for a hot
+set of material_ids and stores their serialized callback outputs in the snapshot store of
+components.page_snapshots, which the page serves without contacting the summary API.
+
+The hot set is given as IDs, a file with one ID per line, or the --top most requested
+/materials/<material_id> pages of an access log (e.g. gunicorn's APP_ACCESS_LOG). A
+snapshot is rebuilt only when the digest of its upstream document changed; unchanged ones
+are only re-stamped so they do not expire. With STRUCTURE_SCENE_CACHE_BACKEND=disk the
+structure viewer's scene is built into the shared scene cache as well.
+
+Usage:
+    python scripts/prerender_materials.py --ids mp-149 mp-13
+    python scripts/prerender_materials.py --access-log access.log --top 500 --prune
+    python scripts/prerender_materials.py --ids-file hot.txt --interval 3600   # background job
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from typing import Iterable, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Importing the app registers the pages the section builders live in
+import app  # noqa: E402,F401
+from components.api_client import api_client  # noqa: E402
+from components.lazy_pages import page_loader  # noqa: E402
+from components.page_snapshots import material_snapshots  # noqa: E402
+from components.structure_scene import scene_cache  # noqa: E402
+from components.utility_functions import content_digest  # noqa: E402
+
+# Deferred with LAZY_PAGES; the app is not serving here, so load it now
+page_loader.ensure_loaded("prerender")
+from pages.apps.materials_explorer import material_summary  # noqa: E402
+
+_MATERIAL_PATH_RE = re.compile(r"/materials/([A-Za-z0-9][\w.-]*)(?=[\s?\"/]|$)")
+
+
+def most_viewed(access_log: str, top: int) -> List[str]:
+    """The top material_ids by number of /materials/<material_id> requests in the log"""
+    views = Counter()
+    with open(access_log, "r", encoding="utf-8", errors="replace") as fp:
+        for line in fp:
+            match = _MATERIAL_PATH_RE.search(line)
+            if match:
+                views[match.group(1)] += 1
+    return [material_id for material_id, _ in views.most_common(top)]
+
+
+def hot_set(args) -> List[str]:
+    material_ids = list(args.ids or [])
+    if args.ids_file:
+        with open(args.ids_file, "r", encoding="utf-8") as fp:
+            material_ids += [line.strip() for line in fp if line.strip() and not line.startswith("#")]
+    if args.access_log:
+        material_ids += most_viewed(args.access_log, args.top)
+    # Keep the first occurrence of each ID
+    return list(dict.fromkeys(material_ids))
+
+
+def prerender(material_id: str, api_url: str, force: bool = False) -> str:
+    """
+    Build or refresh the snapshot of one material.
+
+    Returns:
+        str: "built", "unchanged" or "failed"
+    """
+    try:
+        document = api_client.get_summary(material_id, base_url=api_url)
+    except Exception as e:
+        print(f"{material_id}: fetching the summary failed: {e}")
+        return "failed"
+    digest = content_digest(document)
+    if scene_cache.shared:
+        try:
+            material_summary.structure_viewer.warm(document["structure"])
+        except Exception as e:
+            print(f"{material_id}: building the structure scene failed: {e}")
+    existing = material_snapshots.read(material_id)
+    if not force and existing is not None and existing.get("document_digest") == digest:
+        # Same document: keep the outputs and only reset the snapshot's age
+        material_snapshots.save(material_id, digest, existing["sections"])
+        return "unchanged"
+    try:
+        sections = {
+            section: builder(material_id, document)
+            for section, builder in material_summary.SECTION_BUILDERS.items()
+        }
+        material_snapshots.save(material_id, digest, sections)
+    except Exception as e:
+        print(f"{material_id}: rendering failed: {e}")
+        return "failed"
+    return "built"
+
+
+def run_once(material_ids: Iterable[str], api_url: str, force: bool, prune: bool):
+    start = time.perf_counter()
+    outcomes = Counter(prerender(material_id, api_url, force) for material_id in material_ids)
+    removed = material_snapshots.prune(material_ids) if prune else 0
+    print(
+        f"{sum(outcomes.values())} materials in {time.perf_counter() - start:.1f} s: "
+        f"{outcomes['built']} built, {outcomes['unchanged']} unchanged, {outcomes['failed']} failed, "
+        f"{removed} pruned ({material_snapshots.directory})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render material detail page snapshots")
+    parser.add_argument("--ids", nargs="+", help="Material IDs to pre-render")
+    parser.add_argument("--ids-file", help="File with one material ID per line")
+    parser.add_argument("--access-log", help="Access log to pick the most viewed materials from")
+    parser.add_argument("--top", type=int, default=100, help="Materials taken from the access log")
+    parser.add_argument("--api-url", default=os.environ.get("SUMMARY_API_URL", "http://127.0.0.1:8000/summary"),
+                        help="Summary API endpoint (default $SUMMARY_API_URL or the local summary service)")
+    parser.add_argument("--force", action="store_true", help="Rebuild snapshots whose document did not change")
+    parser.add_argument("--prune", action="store_true",
+                        help="Delete snapshots outside the hot set and those of older versions")
+    parser.add_argument("--interval", type=float, help="Repeat every INTERVAL seconds instead of running once")
+    args = parser.parse_args()
+
+    if not (args.ids or args.ids_file or args.access_log):
+        parser.error("give --ids, --ids-file or --access-log")
+
+    while True:
+        # Re-read the hot set each round, the access log keeps growing
+        run_once(hot_set(args), args.api_url.rstrip("/"), args.force, args.prune)
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Formula autocomplete over the reduced formulas of a summary dataset.
+
+Every distinct reduced composition is stored once with its number of materials, in two
+sorted arrays searched with bisect:
+    - by formula_pretty, so "LiFe" completes to "LiFePO4"
+    - by the alphabetical composition key, so "FeLi" or "PFeLi" also find it
+
+A prefix is the contiguous range [bisect_left(prefix), bisect_left(prefix + MAX_CHAR)) of a
+sorted array; the top results are the entries of that range with the most materials.
+
+The index can be built at startup from the dataset or loaded from a prebuilt file:
+    python -m summary_service.autocomplete --dataset summary.jsonl --output autocomplete.json
+"""
+import argparse
+import json
+import re
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from summary_service.chemistry import ELEMENT_INDEX, composition_key, document_composition
+from summary_service.dataset import iter_documents
+
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 100
+INDEX_VERSION = 1
+
+_PREFIX_END = "\U0010ffff"
+_ELEMENT_TOKEN_RE = re.compile(r"([A-Z][a-z]?)(\d*\.?\d*)")
+
+
+def normalize_prefix(text: str) -> str:
+    """
+    Reorder the element tokens of typed text alphabetically, like composition_key, e.g.
+    "OLi2" -> "Li2O". Text that isn't a sequence of element tokens is returned unchanged.
+    """
+    tokens = _ELEMENT_TOKEN_RE.findall(text)
+    if "".join(symbol + amount for symbol, amount in tokens) != text:
+        return text
+    if any(symbol not in ELEMENT_INDEX for symbol, _ in tokens):
+        return text
+    return "".join(symbol + amount for symbol, amount in sorted(tokens))
+
+
+class FormulaAutocomplete:
+    """Prefix search over reduced formulas, ranked by number of materials"""
+
+    def __init__(self, entries: Iterable[Tuple[str, str, int]]):
+        """
+        Args:
+            entries: (formula_pretty, composition key, number of materials) per reduced formula
+        """
+        entries = list(entries)
+        self.formulas = [formula for formula, _, _ in entries]
+        self.keys = [key for _, key, _ in entries]
+        self.counts = np.array([count for _, _, count in entries], dtype=np.int64)
+
+        pretty_order = sorted(range(len(entries)), key=lambda i: self.formulas[i])
+        key_order = sorted(range(len(entries)), key=lambda i: self.keys[i])
+        self._pretty_sorted = [self.formulas[i] for i in pretty_order]
+        self._pretty_rows = np.array(pretty_order, dtype=np.int64)
+        self._keys_sorted = [self.keys[i] for i in key_order]
+        self._key_rows = np.array(key_order, dtype=np.int64)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[dict]) -> "FormulaAutocomplete":
+        counts: Counter = Counter()
+        pretty: Dict[str, Counter] = {}
+        for document in documents:
+            try:
+                key = composition_key(document_composition(document))
+            except ValueError:
+                continue
+            if not key:
+                continue
+            counts[key] += 1
+            formula = document.get("formula_pretty") or key
+            pretty.setdefault(key, Counter())[formula] += 1
+        # Show the most common formula_pretty of each composition
+        return cls(
+            (pretty[key].most_common(1)[0][0], key, count) for key, count in counts.items()
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FormulaAutocomplete":
+        """Load an index written by save()"""
+        with open(path, "r", encoding="utf-8") as fp:
+            data = json.load(fp)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported autocomplete index version in {path}")
+        return cls(tuple(entry) for entry in data["formulas"])
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump({
+                "version": INDEX_VERSION,
+                "formulas": [list(entry) for entry in zip(self.formulas, self.keys, self.counts.tolist())],
+            }, fp, separators=(",", ":"))
+
+    def __len__(self) -> int:
+        return len(self.formulas)
+
+    @staticmethod
+    def _prefix_rows(sorted_values: List[str], rows: np.ndarray, prefix: str) -> np.ndarray:
+        start = bisect_left(sorted_values, prefix)
+        stop = bisect_left(sorted_values, prefix + _PREFIX_END, lo=start)
+        return rows[start:stop]
+
+    def complete(self, text: str, limit: int = DEFAULT_SUGGESTIONS) -> List[Tuple[str, int]]:
+        """
+        Formulas starting with the typed text, most materials first.
+
+        Args:
+            text: Typed formula prefix, e.g. "LiFe"
+            limit: Maximum number of results
+
+        Returns:
+            list: (formula_pretty, number of materials) tuples
+        """
+        text = re.sub(r"[\s()]", "", text or "")
+        if not text or limit <= 0:
+            return []
+        rows = np.concatenate([
+            self._prefix_rows(self._pretty_sorted, self._pretty_rows, text),
+            self._prefix_rows(self._keys_sorted, self._key_rows, normalize_prefix(text)),
+        ])
+        if not len(rows):
+            return []
+        rows = np.unique(rows)
+        if len(rows) > limit:
+            # Keep rows at least as common as the limit-th most common (ties included)
+            # before the final, small sort
+            counts = self.counts[rows]
+            threshold = np.partition(counts, len(counts) - limit)[len(counts) - limit]
+            rows = rows[counts >= threshold]
+        ranked = sorted(rows.tolist(), key=lambda row: (-self.counts[row], len(self.formulas[row]), self.formulas[row]))
+        return [(self.formulas[row], int(self.counts[row])) for row in ranked[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a formula autocomplete index from a summary dataset")
+    parser.add_argument("--dataset", required=True, help="JSON-lines, JSON or Parquet file of summary documents")
+    parser.add_argument("--output", required=True, help="Path of the index file to write")
+    args = parser.parse_args()
+
+    index = FormulaAutocomplete.from_documents(iter_documents(args.dataset))
+    index.save(args.output)
+    print(f"Wrote {len(index)} formulas to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Formula and chemical system helpers shared by the summary service modules."""
+import re
+from collections import defaultdict
+from math import gcd
+from typing import Dict, Iterable, List, Tuple
+
+ELEMENTS = (
+    "H", "He", "Li", "Be", "B", "C", "N", "O", "F", "Ne", "Na", "Mg", "Al", "Si", "P", "S",
+    "Cl", "Ar", "K", "Ca", "Sc", "Ti", "V", "Cr", "Mn", "Fe", "Co", "Ni", "Cu", "Zn", "Ga",
+    "Ge", "As", "Se", "Br", "Kr", "Rb", "Sr", "Y", "Zr", "Nb", "Mo", "Tc", "Ru", "Rh", "Pd",
+    "Ag", "Cd", "In", "Sn", "Sb", "Te", "I", "Xe", "Cs", "Ba", "La", "Ce", "Pr", "Nd", "Pm",
+    "Sm", "Eu", "Gd", "Tb", "Dy", "Ho", "Er", "Tm", "Yb", "Lu", "Hf", "Ta", "W", "Re", "Os",
+    "Ir", "Pt", "Au", "Hg", "Tl", "Pb", "Bi", "Po", "At", "Rn", "Fr", "Ra", "Ac", "Th", "Pa",
+    "U", "Np", "Pu", "Am", "Cm", "Bk", "Cf", "Es", "Fm", "Md", "No", "Lr", "Rf", "Db", "Sg",
+    "Bh", "Hs", "Mt", "Ds", "Rg", "Cn", "Nh", "Fl", "Mc", "Lv", "Ts", "Og",
+)
+ELEMENT_INDEX = {element: i for i, element in enumerate(ELEMENTS)}
+
+_FORMULA_TOKEN_RE = re.compile(r"\s*(?:([A-Z][a-z]?|\*)|(\()|(\)))\s*(\d+(?:\.\d+)?)?")
+
+
+def parse_formula(formula: str, allow_wildcards: bool = False) -> Tuple[Dict[str, float], List[float]]:
+    """
+    Parse a formula such as "Ca(OH)2" or, with wildcards, "LiFe*2*".
+
+    Args:
+        formula: Chemical formula; "*" stands for any element not listed
+        allow_wildcards: Whether "*" is accepted
+
+    Returns:
+        tuple: (element -> amount, list of wildcard amounts)
+
+    Raises:
+        ValueError: The formula can't be parsed or contains unknown elements
+    """
+    stack = [(defaultdict(float), [])]
+    pos = 0
+    formula = formula.strip()
+    if not formula:
+        raise ValueError("Empty formula")
+    while pos < len(formula):
+        match = _FORMULA_TOKEN_RE.match(formula, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"Invalid formula {formula!r}")
+        symbol, open_paren, close_paren, amount = match.groups()
+        amount = float(amount) if amount else 1.0
+        if open_paren:
+            if match.group(4):
+                raise ValueError(f"Invalid formula {formula!r}")
+            stack.append((defaultdict(float), []))
+        elif close_paren:
+            if len(stack) == 1:
+                raise ValueError(f"Unbalanced parentheses in {formula!r}")
+            composition, wildcards = stack.pop()
+            for element, element_amount in composition.items():
+                stack[-1][0][element] += element_amount * amount
+            stack[-1][1].extend(wildcard * amount for wildcard in wildcards)
+        elif symbol == "*":
+            if not allow_wildcards:
+                raise ValueError(f"Wildcards are not allowed in {formula!r}")
+            stack[-1][1].append(amount)
+        else:
+            if symbol not in ELEMENT_INDEX:
+                raise ValueError(f"Unknown element {symbol!r} in {formula!r}")
+            stack[-1][0][symbol] += amount
+        pos = match.end()
+    if len(stack) != 1:
+        raise ValueError(f"Unbalanced parentheses in {formula!r}")
+    composition, wildcards = stack[0]
+    return dict(composition), wildcards
+
+
+def reduce_amounts(composition: Dict[str, float], wildcards: Iterable[float] = ()) -> Tuple[Dict[str, float], List[float]]:
+    """Divide integer amounts (including wildcard amounts) by their greatest common divisor"""
+    wildcards = list(wildcards)
+    amounts = list(composition.values()) + wildcards
+    if not amounts or any(abs(amount - round(amount)) > 1e-8 for amount in amounts):
+        return dict(composition), wildcards
+    divisor = 0
+    for amount in amounts:
+        divisor = gcd(divisor, int(round(amount)))
+    divisor = divisor or 1
+    return (
+        {element: round(amount) / divisor for element, amount in composition.items()},
+        [round(amount) / divisor for amount in wildcards],
+    )
+
+
+def format_amount(amount: float) -> str:
+    if abs(amount - 1) < 1e-8:
+        return ""
+    if abs(amount - round(amount)) < 1e-8:
+        return str(int(round(amount)))
+    return f"{amount:g}"
+
+
+def composition_key(composition: Dict[str, float]) -> str:
+    """
+    Normalized reduced formula with alphabetically ordered elements, e.g. "FeLiO4P" for
+    LiFePO4. Two formulas describe the same reduced composition iff their keys are equal.
+    """
+    reduced, _ = reduce_amounts(composition)
+    return "".join(f"{element}{format_amount(reduced[element])}" for element in sorted(reduced))
+
+
+def formula_key(formula: str) -> str:
+    """composition_key of a formula string"""
+    composition, _ = parse_formula(formula)
+    return composition_key(composition)
+
+
+def parse_chemsys(chemsys: str) -> Tuple[Tuple[str, ...], int]:
+    """
+    Parse a chemical system such as "Li-Fe-O" or "Li-Fe-*-*".
+
+    Returns:
+        tuple: (sorted known elements, number of wildcard elements)
+    """
+    known = []
+    wildcards = 0
+    for part in chemsys.split("-"):
+        part = part.strip()
+        if part == "*":
+            wildcards += 1
+        elif part in ELEMENT_INDEX:
+            known.append(part)
+        else:
+            raise ValueError(f"Unknown element {part!r} in chemical system {chemsys!r}")
+    return tuple(sorted(set(known))), wildcards
+
+
+def parse_element_list(elements: str) -> Tuple[str, ...]:
+    """Parse a comma (or dash) separated element list such as "Li,Fe" """
+    parsed = []
+    for part in re.split(r"[,\-\s]+", elements.strip()):
+        if not part:
+            continue
+        if part not in ELEMENT_INDEX:
+            raise ValueError(f"Unknown element {part!r}")
+        parsed.append(part)
+    return tuple(parsed)
+
+
+def document_composition(document: dict) -> Dict[str, float]:
+    """Reduced composition of a summary document"""
+    composition = document.get("composition_reduced")
+    if isinstance(composition, dict) and composition:
+        return {element: float(amount) for element, amount in composition.items() if element in ELEMENT_INDEX}
+    composition, _ = parse_formula(document.get("formula_pretty", ""))
+    return reduce_amounts(composition)[0]
+
+
+def match_wildcard_formula(composition: Dict[str, float], known: Dict[str, float], wildcards: List[float]) -> bool:
+    """
+    Whether a reduced composition matches a reduced wildcard formula: every known element
+    has the same amount, and the remaining elements' amounts equal the wildcard amounts.
+    """
+    if len(composition) != len(known) + len(wildcards):
+        return False
+    for element, amount in known.items():
+        if abs(composition.get(element, -1) - amount) > 1e-6:
+            return False
+    rest = sorted(amount for element, amount in composition.items() if element not in known)
+    return all(abs(a - b) <= 1e-6 for a, b in zip(rest, sorted(wildcards)))
@@ -0,0 +1,82 @@
+"""Loading of local summary datasets (JSON-lines, JSON or Parquet)."""
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def _to_builtin(value: Any) -> Any:
+    """Convert the numpy values and arrays produced by Parquet readers to JSON types"""
+    if isinstance(value, dict):
+        return {key: _to_builtin(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(item) for item in value]
+    if hasattr(value, "tolist"):
+        return _to_builtin(value.tolist())
+    return value
+
+
+def iter_documents(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield summary documents from a dataset file.
+
+    Supported formats, chosen by extension:
+        .jsonl / .jsonl.gz: one JSON document per line
+        .json / .json.gz: a JSON list of documents
+        .parquet: one document per row (requires pandas with pyarrow)
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".parquet"):
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError("Reading Parquet datasets requires pandas and pyarrow") from e
+        for record in pd.read_parquet(path).to_dict(orient="records"):
+            yield _to_builtin(record)
+    elif name.endswith(".json"):
+        with _open_text(path) as fp:
+            yield from json.load(fp)
+    else:
+        with _open_text(path) as fp:
+            for line in fp:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+class SummaryDataset:
+    """In-memory summary documents with an index by material_id"""
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = []
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        positions = {}
+        for document in documents:
+            material_id = document.get("material_id")
+            if not material_id:
+                continue
+            if material_id in positions:
+                # Keep the last copy of a material listed twice
+                self.documents[positions[material_id]] = document
+            else:
+                positions[material_id] = len(self.documents)
+                self.documents.append(document)
+            self.by_id[material_id] = document
+
+    @classmethod
+    def load(cls, path: str) -> "SummaryDataset":
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Summary dataset {path} does not exist")
+        return cls(iter_documents(path))
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def get(self, material_id: str) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(material_id)
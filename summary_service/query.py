@@ -0,0 +1,260 @@
+"""Parsing of the summary search parameters sent by the explorer's SearchUIContainer."""
+from typing import Any, Dict, List, Optional, Tuple
+
+from summary_service.chemistry import (
+    document_composition,
+    match_wildcard_formula,
+    parse_chemsys,
+    parse_element_list,
+    parse_formula,
+    reduce_amounts,
+)
+
+DEFAULT_LIMIT = 15
+MAX_LIMIT = 1000
+
+# Filter parameter names (without _min/_max) whose document field has another name
+FIELD_ALIASES = {
+    "crystal_system": "symmetry.crystal_system",
+    "spacegroup_symbol": "symmetry.symbol",
+    "spacegroup_number": "symmetry.number",
+    "k_voigt": "bulk_modulus.voigt",
+    "k_reuss": "bulk_modulus.reuss",
+    "k_vrh": "bulk_modulus.vrh",
+    "g_voigt": "shear_modulus.voigt",
+    "g_reuss": "shear_modulus.reuss",
+    "g_vrh": "shear_modulus.vrh",
+    "piezo_modulus": "e_ij_max",
+}
+
+# Parameters that are not field filters
+CONTROL_PARAMS = {"_limit", "_skip", "_page", "_per_page", "_sort_fields", "_fields", "_all_fields"}
+COMPOSITION_PARAMS = {"material_ids", "formula", "chemsys", "elements", "exclude_elements", "nelements_min", "nelements_max"}
+
+
+class QueryError(ValueError):
+    """Invalid search parameters, reported to the client as a 400"""
+
+
+def get_field(document: dict, path: str) -> Any:
+    """Value of a dotted field path such as "symmetry.crystal_system", or None"""
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def project(document: dict, fields: List[str]) -> dict:
+    """Copy of document restricted to the given (possibly dotted) fields"""
+    result = {}
+    for path in fields:
+        value = get_field(document, path)
+        if value is None:
+            continue
+        target = result
+        parts = path.split(".")
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return result
+
+
+def parse_value(value: str) -> Any:
+    lowered = value.strip().lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value.strip()
+
+
+class SearchQuery:
+    """
+    Search parameters in the shape of the materials summary API, e.g.
+    elements=Li,Fe&energy_above_hull_max=0.1&_sort_fields=-band_gap&_skip=0&_limit=15
+    """
+
+    def __init__(self):
+        self.material_ids: Optional[set] = None
+        self.formulas: List[Tuple[Dict[str, float], List[float]]] = []
+        self.chemsys: List[Tuple[Tuple[str, ...], int]] = []
+        self.elements: Tuple[str, ...] = ()
+        self.exclude_elements: Tuple[str, ...] = ()
+        self.nelements: Tuple[Optional[float], Optional[float]] = (None, None)
+        self.ranges: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+        self.equals: Dict[str, List[Any]] = {}
+        self.has_props: Tuple[str, ...] = ()
+        self.sort: List[Tuple[str, bool]] = []
+        self.skip = 0
+        self.limit = DEFAULT_LIMIT
+        self.fields: Optional[List[str]] = None
+
+    @classmethod
+    def from_params(cls, params: Dict[str, str], max_limit: int = MAX_LIMIT) -> "SearchQuery":
+        """
+        Build a query from request parameters.
+
+        Raises:
+            QueryError: A parameter value is invalid
+        """
+        query = cls()
+        try:
+            query._parse(params, max_limit)
+        except ValueError as e:
+            raise QueryError(str(e)) from e
+        return query
+
+    def _parse(self, params: Dict[str, str], max_limit: int):
+        params = {key: value for key, value in params.items() if value not in (None, "")}
+
+        if "material_ids" in params:
+            self.material_ids = {mid.strip() for mid in params["material_ids"].split(",") if mid.strip()}
+        if "formula" in params:
+            for formula in params["formula"].split(","):
+                composition, wildcards = parse_formula(formula, allow_wildcards=True)
+                self.formulas.append(reduce_amounts(composition, wildcards))
+        if "chemsys" in params:
+            self.chemsys = [parse_chemsys(chemsys) for chemsys in params["chemsys"].split(",")]
+        if "elements" in params:
+            self.elements = parse_element_list(params["elements"])
+        if "exclude_elements" in params:
+            self.exclude_elements = parse_element_list(params["exclude_elements"])
+        self.nelements = (
+            float(params["nelements_min"]) if "nelements_min" in params else None,
+            float(params["nelements_max"]) if "nelements_max" in params else None,
+        )
+        if "has_props" in params:
+            self.has_props = tuple(prop.strip() for prop in params["has_props"].split(",") if prop.strip())
+
+        for key, value in params.items():
+            if key in CONTROL_PARAMS or key in COMPOSITION_PARAMS or key == "has_props":
+                continue
+            if key.endswith("_min") or key.endswith("_max"):
+                name, bound = key[:-4], key[-3:]
+                field = FIELD_ALIASES.get(name, name)
+                low, high = self.ranges.get(field, (None, None))
+                if bound == "min":
+                    low = float(value)
+                else:
+                    high = float(value)
+                self.ranges[field] = (low, high)
+            else:
+                field = FIELD_ALIASES.get(key, key)
+                self.equals[field] = [parse_value(part) for part in value.split(",")]
+
+        for sort_field in params.get("_sort_fields", "").split(","):
+            sort_field = sort_field.strip()
+            if sort_field:
+                descending = sort_field.startswith("-")
+                name = sort_field.lstrip("+-")
+                self.sort.append((FIELD_ALIASES.get(name, name), descending))
+
+        if "_page" in params or "_per_page" in params:
+            per_page = int(params.get("_per_page", DEFAULT_LIMIT))
+            self.limit = per_page
+            self.skip = (max(int(params.get("_page", 1)), 1) - 1) * per_page
+        else:
+            self.limit = int(params.get("_limit", DEFAULT_LIMIT))
+            self.skip = int(params.get("_skip", 0))
+        if self.limit < 0 or self.skip < 0:
+            raise ValueError("_limit and _skip must not be negative")
+        self.limit = min(self.limit, max_limit)
+
+        if str(params.get("_all_fields", "")).lower() != "true" and "_fields" in params:
+            self.fields = [field.strip() for field in params["_fields"].split(",") if field.strip()]
+
+    def matches(self, document: dict) -> bool:
+        """Whether a summary document satisfies every filter of the query"""
+        if self.material_ids is not None and document.get("material_id") not in self.material_ids:
+            return False
+
+        elements = set(document.get("elements") or ())
+        if self.formulas or self.chemsys or self.elements or self.exclude_elements or self.nelements != (None, None):
+            composition = document_composition(document)
+            elements = elements or set(composition)
+            if self.formulas and not any(
+                match_wildcard_formula(composition, known, wildcards) for known, wildcards in self.formulas
+            ):
+                return False
+            if self.chemsys and not any(
+                set(known) <= elements and len(elements) == len(known) + wildcards
+                for known, wildcards in self.chemsys
+            ):
+                return False
+            if not set(self.elements) <= elements:
+                return False
+            if elements & set(self.exclude_elements):
+                return False
+            low, high = self.nelements
+            if (low is not None and len(elements) < low) or (high is not None and len(elements) > high):
+                return False
+
+        for field, (low, high) in self.ranges.items():
+            value = get_field(document, field)
+            if not isinstance(value, (int, float)):
+                return False
+            if (low is not None and value < low) or (high is not None and value > high):
+                return False
+
+        for field, accepted in self.equals.items():
+            if get_field(document, field) not in accepted:
+                return False
+
+        return self.matches_props(document)
+
+    def matches_props(self, document: dict) -> bool:
+        """Whether the document has every property requested through has_props"""
+        if not self.has_props:
+            return True
+        has_props = document.get("has_props") or ()
+        if isinstance(has_props, dict):
+            has_props = [prop for prop, available in has_props.items() if available]
+        return set(self.has_props) <= set(has_props)
+
+    def shape(self, documents: List[dict]) -> List[dict]:
+        """Apply the requested field projection to a page of documents"""
+        if self.fields is None:
+            return documents
+        return [project(document, self.fields) for document in documents]
+
+
+def sortable(value: Any) -> tuple:
+    """Sort key that orders numbers before strings instead of failing on mixed types"""
+    if isinstance(value, (int, float)):
+        return (0, value)
+    return (1, str(value))
+
+
+def sort_documents(documents: List[dict], field: str, descending: bool) -> List[dict]:
+    """Stable sort of documents by field, documents missing the field last"""
+    present = [document for document in documents if get_field(document, field) is not None]
+    missing = [document for document in documents if get_field(document, field) is None]
+    present.sort(key=lambda document: sortable(get_field(document, field)), reverse=descending)
+    return present + missing
+
+
+class LinearSearch:
+    """Reference search implementation that scans every document"""
+
+    def __init__(self, documents: List[dict]):
+        self.documents = documents
+
+    def search(self, query: SearchQuery) -> Tuple[int, List[dict]]:
+        """
+        Run a query.
+
+        Returns:
+            tuple: (total number of matches, documents of the requested page)
+        """
+        matches = [document for document in self.documents if query.matches(document)]
+        # Stable sorts applied from the last sort field to the first
+        for field, descending in reversed(query.sort):
+            matches = sort_documents(matches, field, descending)
+        return len(matches), query.shape(matches[query.skip:query.skip + query.limit])
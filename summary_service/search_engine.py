@@ -0,0 +1,246 @@
+"""
+Indexed search over summary documents for the explorer grid.
+
+Documents are converted into a columnar in-memory table:
+    - element sets as two uint64 bitset columns (118 elements), so elements,
+      exclude_elements and chemsys filters are a few vectorized bitwise operations
+    - numeric fields as float columns with a precomputed argsort, so a range filter is
+      two binary searches on the sorted values
+    - categorical fields as integer codes
+    - reduced formulas in a hash index keyed by the normalized composition
+
+Field columns and sort orders are built on first use and kept for later queries.
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from summary_service.chemistry import ELEMENT_INDEX, composition_key, document_composition, match_wildcard_formula
+from summary_service.query import SearchQuery, get_field, sortable
+
+
+def element_bits(elements) -> Tuple[int, int]:
+    """(low, high) 64-bit masks of an element collection"""
+    low = high = 0
+    for element in elements:
+        index = ELEMENT_INDEX[element]
+        if index < 64:
+            low |= 1 << index
+        else:
+            high |= 1 << (index - 64)
+    return low, high
+
+
+class IndexedSearch:
+    """Search engine with the same interface as query.LinearSearch"""
+
+    def __init__(self, documents: List[dict]):
+        self.documents = documents
+        count = len(documents)
+        self.row_by_id: Dict[str, int] = {}
+        self.compositions: List[Dict[str, float]] = []
+        self.formula_rows: Dict[str, List[int]] = {}
+        self.element_low = np.zeros(count, dtype=np.uint64)
+        self.element_high = np.zeros(count, dtype=np.uint64)
+        self.nelements = np.zeros(count, dtype=np.int16)
+
+        for row, document in enumerate(documents):
+            self.row_by_id[document.get("material_id")] = row
+            try:
+                composition = document_composition(document)
+            except ValueError:
+                composition = {}
+            elements = [element for element in (document.get("elements") or composition) if element in ELEMENT_INDEX]
+            self.compositions.append(composition)
+            if composition:
+                self.formula_rows.setdefault(composition_key(composition), []).append(row)
+            low, high = element_bits(elements)
+            self.element_low[row] = low
+            self.element_high[row] = high
+            self.nelements[row] = len(set(elements))
+
+        self._numeric: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._categorical: Dict[str, Tuple[np.ndarray, Dict]] = {}
+        self._orders: Dict[Tuple[str, bool], np.ndarray] = {}
+        self._ranks: Dict[str, np.ndarray] = {}
+        self._props: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    # Column builders
+
+    def _numeric_column(self, field: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(values with NaN for missing, argsort of the values, sorted values)"""
+        column = self._numeric.get(field)
+        if column is None:
+            values = np.full(len(self.documents), np.nan)
+            for row, document in enumerate(self.documents):
+                value = get_field(document, field)
+                # Booleans count as 0 and 1, as in LinearSearch's range check
+                if isinstance(value, (int, float)):
+                    values[row] = value
+            order = np.argsort(values, kind="stable")
+            column = (values, order, values[order])
+            with self._lock:
+                self._numeric[field] = column
+        return column
+
+    def _categorical_column(self, field: str) -> Tuple[np.ndarray, Dict]:
+        """(integer code per row, value -> code); missing values get code -1"""
+        column = self._categorical.get(field)
+        if column is None:
+            codes = np.full(len(self.documents), -1, dtype=np.int32)
+            mapping = {}
+            for row, document in enumerate(self.documents):
+                value = get_field(document, field)
+                if value is None or isinstance(value, (dict, list)):
+                    continue
+                # Keyed by value alone: True and 1 share a code, as they compare equal in
+                # LinearSearch's `value in accepted`
+                codes[row] = mapping.setdefault(value, len(mapping))
+            column = (codes, mapping)
+            with self._lock:
+                self._categorical[field] = column
+        return column
+
+    def _rank_column(self, field: str) -> np.ndarray:
+        """Dense rank of each row's value in sort order; -1 for missing values"""
+        ranks = self._ranks.get(field)
+        if ranks is None:
+            values = [get_field(document, field) for document in self.documents]
+            present = sorted({sortable(value) for value in values if value is not None and not isinstance(value, (dict, list))})
+            rank_of = {key: rank for rank, key in enumerate(present)}
+            ranks = np.array(
+                [rank_of.get(sortable(value), -1) if value is not None and not isinstance(value, (dict, list)) else -1
+                 for value in values],
+                dtype=np.int64,
+            )
+            with self._lock:
+                self._ranks[field] = ranks
+        return ranks
+
+    def _sort_key(self, field: str, descending: bool) -> np.ndarray:
+        """Integer key sorting rows by field, missing values last in both directions"""
+        ranks = self._rank_column(field)
+        missing = np.int64(len(self.documents) + 1)
+        key = -ranks if descending else ranks.copy()
+        key[ranks < 0] = missing
+        return key
+
+    def _order(self, field: str, descending: bool) -> np.ndarray:
+        order = self._orders.get((field, descending))
+        if order is None:
+            order = np.argsort(self._sort_key(field, descending), kind="stable")
+            with self._lock:
+                self._orders[(field, descending)] = order
+        return order
+
+    def _prop_column(self, prop: str) -> np.ndarray:
+        """Whether each row lists prop in has_props"""
+        column = self._props.get(prop)
+        if column is None:
+            probe = SearchQuery()
+            probe.has_props = (prop,)
+            column = np.fromiter((probe.matches_props(document) for document in self.documents),
+                                 dtype=bool, count=len(self.documents))
+            with self._lock:
+                self._props[prop] = column
+        return column
+
+    # Filters
+
+    def _rows_mask(self, rows) -> np.ndarray:
+        mask = np.zeros(len(self.documents), dtype=bool)
+        rows = [row for row in rows if row is not None]
+        if rows:
+            mask[np.fromiter(rows, dtype=np.int64)] = True
+        return mask
+
+    def _contains_all(self, elements) -> np.ndarray:
+        low, high = element_bits(elements)
+        low, high = np.uint64(low), np.uint64(high)
+        return ((self.element_low & low) == low) & ((self.element_high & high) == high)
+
+    def _formula_mask(self, known: Dict[str, float], wildcards: List[float]) -> np.ndarray:
+        if not wildcards:
+            return self._rows_mask(self.formula_rows.get(composition_key(known), ()))
+        candidates = np.flatnonzero(self._contains_all(known) & (self.nelements == len(known) + len(wildcards)))
+        return self._rows_mask(
+            row for row in candidates.tolist()
+            if match_wildcard_formula(self.compositions[row], known, wildcards)
+        )
+
+    def _range_mask(self, field: str, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        _, order, sorted_values = self._numeric_column(field)
+        # NaNs sort last, so the searchable part ends at the first NaN
+        end = int(np.searchsorted(sorted_values, np.inf, side="right"))
+        start = 0 if low is None else int(np.searchsorted(sorted_values[:end], low, side="left"))
+        stop = end if high is None else int(np.searchsorted(sorted_values[:end], high, side="right"))
+        mask = np.zeros(len(self.documents), dtype=bool)
+        mask[order[start:stop]] = True
+        return mask
+
+    def _equals_mask(self, field: str, accepted: list) -> np.ndarray:
+        codes, mapping = self._categorical_column(field)
+        return np.isin(codes, [mapping[value] for value in accepted if value in mapping])
+
+    def filter_mask(self, query: SearchQuery) -> np.ndarray:
+        """Boolean row mask of the documents matching every filter of the query"""
+        mask = np.ones(len(self.documents), dtype=bool)
+        if query.material_ids is not None:
+            mask &= self._rows_mask(self.row_by_id.get(material_id) for material_id in query.material_ids)
+        if query.formulas:
+            formula_mask = np.zeros_like(mask)
+            for known, wildcards in query.formulas:
+                formula_mask |= self._formula_mask(known, wildcards)
+            mask &= formula_mask
+        if query.chemsys:
+            chemsys_mask = np.zeros_like(mask)
+            for known, wildcards in query.chemsys:
+                if wildcards:
+                    chemsys_mask |= self._contains_all(known) & (self.nelements == len(known) + wildcards)
+                else:
+                    low, high = element_bits(known)
+                    chemsys_mask |= (self.element_low == np.uint64(low)) & (self.element_high == np.uint64(high))
+            mask &= chemsys_mask
+        if query.elements:
+            mask &= self._contains_all(query.elements)
+        if query.exclude_elements:
+            low, high = element_bits(query.exclude_elements)
+            mask &= ((self.element_low & np.uint64(low)) == 0) & ((self.element_high & np.uint64(high)) == 0)
+        low, high = query.nelements
+        if low is not None:
+            mask &= self.nelements >= low
+        if high is not None:
+            mask &= self.nelements <= high
+        for field, (low, high) in query.ranges.items():
+            mask &= self._range_mask(field, low, high)
+        for field, accepted in query.equals.items():
+            mask &= self._equals_mask(field, accepted)
+        for prop in query.has_props:
+            mask &= self._prop_column(prop)
+        return mask
+
+    def matching_rows(self, query: SearchQuery) -> np.ndarray:
+        """Row numbers of all matches in the query's sort order"""
+        mask = self.filter_mask(query)
+        if not query.sort:
+            return np.flatnonzero(mask)
+        if len(query.sort) == 1:
+            order = self._order(*query.sort[0])
+            return order[mask[order]]
+        rows = np.flatnonzero(mask)
+        # np.lexsort sorts by the last key first
+        keys = [self._sort_key(field, descending)[rows] for field, descending in reversed(query.sort)]
+        return rows[np.lexsort(keys)]
+
+    def search(self, query: SearchQuery) -> Tuple[int, List[dict]]:
+        """
+        Run a query.
+
+        Returns:
+            tuple: (total number of matches, documents of the requested page)
+        """
+        rows = self.matching_rows(query)
+        page = rows[query.skip:query.skip + query.limit]
+        return len(rows), query.shape([self.documents[row] for row in page.tolist()])
@@ -0,0 +1,150 @@
+"""
+Local stand-in for the materials summary API used by the Dash app.
+
+Serves the same document shape the material pages consume from a local dataset file,
+so the app can run offline and be load-tested end to end on one machine:
+
+    GET /summary/<material_id>    one summary document
+    GET /summary/?<params>        search used by the explorer grid, e.g.
+                                  ?elements=Li,Fe&_sort_fields=-energy_above_hull&_skip=0&_limit=15
+    GET /materials/formula_autocomplete/?formula=LiFe
+                                  formula suggestions for the explorer search bar
+    GET /materials/<source>/<material_id>
+                                  the fields of one data source (thermo, electronic_structure,
+                                  magnetism, provenance) taken from the summary document
+
+Usage:
+    python -m summary_service.server --dataset materials.jsonl [--autocomplete-index autocomplete.json]
+                                    [--host 0.0.0.0] [--port 8000]
+
+or with a WSGI server, taking the paths from SUMMARY_DATASET and SUMMARY_AUTOCOMPLETE_INDEX:
+    gunicorn "summary_service.server:create_app_from_env()" -b 0.0.0.0:8000
+"""
+import argparse
+import os
+from typing import Optional
+
+from flask import Flask, jsonify, request
+
+from summary_service.autocomplete import DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, FormulaAutocomplete
+from summary_service.dataset import SummaryDataset
+from summary_service.query import QueryError, SearchQuery
+from summary_service.search_engine import IndexedSearch
+
+DATASET_ENV = "SUMMARY_DATASET"
+AUTOCOMPLETE_INDEX_ENV = "SUMMARY_AUTOCOMPLETE_INDEX"
+
+# Fields of the per-source endpoints. The dataset only holds summary documents, so a source
+# serves the fields of its upstream endpoint that the summary document carries.
+SOURCE_FIELDS = {
+    "thermo": ("energy_above_hull", "formation_energy_per_atom", "is_stable", "thermostability"),
+    "electronic_structure": ("band_gap", "cbm", "vbm", "efermi", "is_gap_direct", "is_metal"),
+    "magnetism": ("ordering", "total_magnetization", "num_magnetic_sites", "types_of_magnetic_species"),
+    "provenance": ("theoretical", "database_IDs", "last_updated", "origins"),
+}
+
+
+def create_app(dataset: SummaryDataset, formula_autocomplete: Optional[FormulaAutocomplete] = None) -> Flask:
+    """
+    Create the Flask app serving a loaded dataset
+
+    Args:
+        dataset: Summary documents to serve
+        formula_autocomplete: Prebuilt autocomplete index; built from the dataset if not given
+    """
+    app = Flask(__name__)
+    app.json.sort_keys = False
+    search_engine = IndexedSearch(dataset.documents)
+    if formula_autocomplete is None:
+        formula_autocomplete = FormulaAutocomplete.from_documents(dataset.documents)
+
+    @app.after_request
+    def allow_cross_origin(response):
+        # The explorer grid queries the service directly from the browser
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type, X-API-KEY"
+        response.headers["Access-Control-Allow-Methods"] = "GET, OPTIONS"
+        return response
+
+    @app.route("/summary/<material_id>")
+    def get_summary(material_id):
+        document = dataset.get(material_id)
+        if document is None:
+            return jsonify({"detail": f"Material {material_id} not found"}), 404
+        return jsonify(document)
+
+    @app.route("/summary", strict_slashes=False)
+    def search_summary():
+        try:
+            query = SearchQuery.from_params(request.args.to_dict())
+        except QueryError as e:
+            return jsonify({"detail": str(e)}), 400
+        total, documents = search_engine.search(query)
+        return jsonify({
+            "data": documents,
+            "meta": {"total_doc": total, "max_limit": query.limit},
+        })
+
+    @app.route("/materials/formula_autocomplete", strict_slashes=False)
+    def complete_formula():
+        try:
+            limit = min(int(request.args.get("limit", DEFAULT_SUGGESTIONS)), MAX_SUGGESTIONS)
+        except ValueError:
+            return jsonify({"detail": "limit must be an integer"}), 400
+        suggestions = formula_autocomplete.complete(request.args.get("formula", ""), limit)
+        return jsonify({
+            "data": [{"formula_pretty": formula, "nmaterials": count} for formula, count in suggestions],
+            "meta": {"total_doc": len(suggestions)},
+        })
+
+    @app.route("/materials/<source>/<material_id>")
+    def get_source(source, material_id):
+        fields = SOURCE_FIELDS.get(source)
+        if fields is None:
+            return jsonify({"detail": f"Unknown source {source}"}), 404
+        document = dataset.get(material_id)
+        if document is None:
+            return jsonify({"detail": f"Material {material_id} not found"}), 404
+        return jsonify({"material_id": material_id, **{field: document[field] for field in fields if field in document}})
+
+    @app.route("/health")
+    def health():
+        return jsonify({"status": "ok", "documents": len(dataset)})
+
+    return app
+
+
+def load_autocomplete(path: Optional[str]) -> Optional[FormulaAutocomplete]:
+    return FormulaAutocomplete.load(path) if path else None
+
+
+def create_app_from_env() -> Flask:
+    """
+    Create the app for a WSGI server, loading the dataset named by SUMMARY_DATASET and, if
+    set, the prebuilt autocomplete index named by SUMMARY_AUTOCOMPLETE_INDEX
+    """
+    path = os.environ.get(DATASET_ENV)
+    if not path:
+        raise RuntimeError(f"Set {DATASET_ENV} to the path of the summary dataset")
+    return create_app(SummaryDataset.load(path), load_autocomplete(os.environ.get(AUTOCOMPLETE_INDEX_ENV)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local summary dataset")
+    parser.add_argument("--dataset", default=os.environ.get(DATASET_ENV),
+                        help="JSON-lines, JSON or Parquet file of summary documents")
+    parser.add_argument("--autocomplete-index", default=os.environ.get(AUTOCOMPLETE_INDEX_ENV),
+                        help="Prebuilt formula autocomplete index (built from the dataset if omitted)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    if not args.dataset:
+        parser.error(f"--dataset or {DATASET_ENV} is required")
+
+    dataset = SummaryDataset.load(args.dataset)
+    print(f"Loaded {len(dataset)} documents from {args.dataset}")
+    create_app(dataset, load_autocomplete(args.autocomplete_index)).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
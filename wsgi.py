@@ -0,0 +1,55 @@
+"""
+Production entry point.
+
+Importing this module loads the app, all pages and crystal_toolkit, then runs Dash's
+first-request setup (callback map, asset scan, page routing callback) so workers start
+ready to serve. With gunicorn's preload_app this happens once in the master, and the
+forked workers share the imported code. With LAZY_PAGES the material page and
+crystal_toolkit are left out and loaded by a warm-up thread in each worker instead (see
+components/lazy_pages.py):
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+On Windows, where gunicorn does not run, serve with waitress instead:
+
+    python wsgi.py
+
+Environment:
+    APP_HOST / APP_PORT: Address to listen on (default 0.0.0.0:8050)
+    APP_THREADS: waitress worker threads (default 8)
+    DASH_DEBUG: Enable Dash dev tools (error pop-ups, callback graph); off in production
+"""
+import os
+
+from app import app, debug, server
+from components.lazy_pages import page_loader
+
+if debug:
+    # Hot reload needs the development server's reloader
+    app.enable_dev_tools(debug=True, dev_tools_hot_reload=False)
+
+
+def warm_up():
+    """Run the before_request setup Dash otherwise performs on the first request"""
+    with server.test_request_context("/"):
+        server.preprocess_request()
+
+
+warm_up()
+
+
+def main():
+    from waitress import serve
+
+    page_loader.start_warmup()
+
+    serve(
+        server,
+        host=os.environ.get("APP_HOST", "0.0.0.0"),
+        port=int(os.environ.get("APP_PORT", 8050)),
+        threads=int(os.environ.get("APP_THREADS", 8)),
+    )
+
+
+if __name__ == "__main__":
+    main()